@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Avalam agents hosted in worker processes.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+Each agent runs in its own process for the whole game and talks with
+the game through its standard input and output:
+- once the agent is loaded, the worker writes a READY reply;
+- each request is a REQUEST (the kind: b"I" for initialize, b"P" for play
+  or b"Q" to quit, the player, the step, the time left or NaN, the
+  dimensions of the board and its maximum height) followed by the cells
+  of the board, one signed byte per cell;
+- each reply is a REPLY (b"A" with the action, or b"E" and an error
+  message of the given length, and the wall-clock and CPU times taken by
+  the agent).
+
+The times are measured in the worker around the call of the agent only,
+so that the work of the game, of the viewer or of the other agent is
+never charged to it.  A worker that overruns its time credit is killed.
+
+Usage (started by AgentProcess): python3 agentworker.py AGENT NAME
+
+"""
+
+import math
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+
+
+READY = b"R"
+REQUEST = struct.Struct("<cbHdBBB")  # kind, player, step, time left,
+                                     # rows, columns, max height
+REPLY = struct.Struct("<c4bddH")  # kind, action, wall time, CPU time,
+                                  # length of the error message
+
+
+class WorkerTimeout(Exception):
+
+    """Raised when a worker has been killed for overrunning its time."""
+
+
+class WorkerError(Exception):
+
+    """Raised when a worker fails or its agent raises an exception."""
+
+
+class AgentProcess:
+
+    """Agent running in a worker process, with the methods of an Agent.
+
+    After each call, measured gives the (wall, cpu) times in seconds
+    measured by the worker (see game.Game.timed_exec).
+
+    """
+
+    def __init__(self, path, name="Agent", margin=1.0):
+        """Start the worker of an agent and wait until it is loaded.
+
+        Arguments:
+        path -- path to the agent file
+        name -- name given to the agent
+        margin -- time in seconds granted to a worker beyond its time
+            credit before it is killed
+
+        """
+        self.name = name
+        self.margin = margin
+        self.measured = None
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), path, name],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        if self._read(len(READY), None) != READY:
+            raise WorkerError("invalid reply of the worker of %s" % path)
+
+    def _read(self, size, deadline):
+        """Read size bytes from the worker before deadline (as returned by
+        time.perf_counter, None: no limit)."""
+        out = self.process.stdout
+        data = b""
+        while len(data) < size:
+            if deadline is not None:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0 or not select.select([out], [], [],
+                                                     timeout)[0]:
+                    self.kill()
+                    raise WorkerTimeout()
+            chunk = out.read(size - len(data))
+            if not chunk:
+                raise WorkerError("the worker of %s has stopped" % self.name)
+            data += chunk
+        return data
+
+    def _call(self, kind, board, player, step, time_left):
+        """Send a request and return the action of the reply."""
+        if self.process.poll() is not None:
+            raise WorkerError("the worker of %s has stopped" % self.name)
+        cells = board.rows * board.columns
+        request = REQUEST.pack(kind, player, step,
+                               math.nan if time_left is None else time_left,
+                               board.rows, board.columns, board.max_height)
+        request += struct.pack("%db" % cells,
+                               *[x for row in board.m for x in row])
+        deadline = None
+        if time_left is not None:
+            deadline = time.perf_counter() + max(time_left, 0) + self.margin
+        try:
+            self.process.stdin.write(request)
+        except OSError as e:
+            raise WorkerError("the worker of %s has stopped: %s" %
+                              (self.name, e))
+        reply, i1, j1, i2, j2, wall, cpu, length = REPLY.unpack(
+            self._read(REPLY.size, deadline))
+        self.measured = (wall, cpu)
+        if reply != b"A":
+            message = self._read(length, deadline).decode("utf-8", "replace")
+            raise WorkerError(message)
+        return (i1, j1, i2, j2)
+
+    def initialize(self, percepts, players, time_left):
+        self._call(b"I", percepts, players[0], 0, time_left)
+
+    def play(self, percepts, player, step, time_left):
+        return self._call(b"P", percepts, player, step, time_left)
+
+    def kill(self):
+        """Stop the worker immediately."""
+        self.process.kill()
+        self.process.wait()
+
+    def close(self):
+        """Ask the worker to stop, killing it if it does not."""
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write(REQUEST.pack(b"Q", 0, 0, 0, 0, 0,
+                                                      0))
+                self.process.stdin.close()
+                self.process.wait(1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+        self.process.stdout.close()
+
+
+def _read_exactly(f, size):
+    """Read size bytes from f, or return None at the end of the file."""
+    data = b""
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def serve(path, name, fin, fout):
+    """Run the agent in file path, answering the requests read from the
+    binary file fin on fout until the end of fin or a b"Q" request."""
+    from avalam import Board
+    from game import import_from_path
+
+    agent = import_from_path(path, name).Agent(name)
+    fout.write(READY)
+    fout.flush()
+    while True:
+        data = _read_exactly(fin, REQUEST.size)
+        if data is None:
+            break
+        kind, player, step, time_left, rows, columns, max_height = \
+            REQUEST.unpack(data)
+        if kind == b"Q":
+            break
+        values = struct.unpack("%db" % (rows * columns),
+                               _read_exactly(fin, rows * columns))
+        board = Board([list(values[i:i + columns])
+                       for i in range(0, rows * columns, columns)],
+                      max_height)
+        if math.isnan(time_left):
+            time_left = None
+        start = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            if kind == b"I":
+                if hasattr(agent, "initialize"):
+                    agent.initialize(board, [player], time_left)
+                action = (0, 0, 0, 0)
+            else:
+                action = agent.play(board, player, step, time_left)
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            reply = REPLY.pack(b"A", *action, wall, cpu, 0)
+        except Exception as e:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            message = ("%s: %s" % (type(e).__name__, e)).encode("utf-8")
+            message = message[:65535]
+            reply = REPLY.pack(b"E", 0, 0, 0, 0, wall, cpu,
+                               len(message)) + message
+        fout.write(reply)
+        fout.flush()
+
+
+if __name__ == "__main__":
+    # the replies go to the original standard output, whereas whatever the
+    # agent prints goes to the standard error
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb", buffering=0)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    serve(sys.argv[1], sys.argv[2], sys.stdin.buffer, replies)
@@ -16,11 +16,77 @@ You should have received a copy of the GNU General Public License
 along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 """
-from random import shuffle
+from random import shuffle, Random
 
 PLAYER1 = 1
 PLAYER2 = -1
 
+_zobrist_tables = {}
+
+
+def get_zobrist_table(rows, columns, max_height):
+    """Return the Zobrist keys for a board of the given dimensions.
+
+    The key of a tower of signed height h at cell (i, j) is
+    table[i * columns + j][h + max_height], a 64-bit integer.  Empty cells
+    have a key of 0.  The keys are drawn from a fixed seed so that they are
+    the same in every process.
+
+    """
+    dims = (rows, columns, max_height)
+    if dims not in _zobrist_tables:
+        rnd = Random(0x41564c4d + rows * 1009 + columns * 31 + max_height)
+        table = []
+        for _ in range(rows * columns):
+            keys = [rnd.getrandbits(64) for _ in range(2 * max_height + 1)]
+            keys[max_height] = 0
+            table.append(keys)
+        _zobrist_tables[dims] = table
+    return _zobrist_tables[dims]
+
+
+_adjacency_tables = {}
+
+
+def get_adjacency_table(rows, columns):
+    """Return the neighbours of every cell of a board.
+
+    table[i * columns + j] is a tuple of the triplets (i2, j2, c2) of the
+    cells (i2, j2) adjacent to (i, j), c2 being i2 * columns + j2.  Cells
+    outside of the board are skipped.
+
+    """
+    dims = (rows, columns)
+    if dims not in _adjacency_tables:
+        table = []
+        for i in range(rows):
+            for j in range(columns):
+                table.append(tuple(
+                    (i2, j2, i2 * columns + j2)
+                    for i2 in range(max(0, i - 1), min(rows, i + 2))
+                    for j2 in range(max(0, j - 1), min(columns, j + 2))
+                    if i2 != i or j2 != j))
+        _adjacency_tables[dims] = table
+    return _adjacency_tables[dims]
+
+
+_compatibility_tables = {}
+
+
+def get_compatibility_table(max_height):
+    """Return the table of the towers that may be stacked.
+
+    table[x1 + max_height][x2 + max_height] tells whether the tower of signed
+    height x1 may be moved onto the adjacent tower of signed height x2.
+
+    """
+    if max_height not in _compatibility_tables:
+        heights = range(-max_height, max_height + 1)
+        _compatibility_tables[max_height] = [
+            [x1 != 0 and x2 != 0 and abs(x1) + abs(x2) <= max_height
+             for x2 in heights] for x1 in heights]
+    return _compatibility_tables[max_height]
+
 class InvalidAction(Exception):
 
     """Raised when an invalid action is played."""
@@ -38,6 +104,15 @@ class Board:
     is the color of the top-most counter (negative for red, positive for
     yellow).
 
+    self.adjacency and self.compatible are the tables of
+    get_adjacency_table and get_compatibility_table used to generate and
+    validate the actions.
+
+    self.moves[i * self.columns + j] is the number of valid actions moving
+    tower (i, j) and self.move_count the total number of valid actions.
+    Both are updated incrementally when an action is played, so that
+    is_tower_movable and is_finished take constant time.
+
     """
 
     # standard avalam
@@ -53,7 +128,7 @@ class Board:
                       [ 0,  0,  0,  0,  0, -1,  1,  0,  0] ]
 
     def __init__(self, percepts=initial_board, max_height=max_height,
-                       invert=False):
+                       invert=False, seed=None):
         """Initialize the board.
 
         Arguments:
@@ -61,13 +136,20 @@ class Board:
         invert -- whether to invert the sign of all values, inverting the
             players
         max_height -- maximum height of a tower
+        seed -- if not None, seed of the random order of get_actions (see
+            the seed method)
 
         """
+        self.rng = None if seed is None else Random(seed)
         self.m = percepts
         self.rows = len(self.m)
         self.columns = len(self.m[0])
         self.max_height = max_height
         self.m = self.get_percepts(invert)  # make a copy of the percepts
+        self.zobrist_table = get_zobrist_table(self.rows, self.columns,
+                                               self.max_height)
+        self._init_tables()
+        self._init_counters()
 
     def __str__(self):
         def str_cell(i, j):
@@ -81,7 +163,127 @@ class Board:
 
     def clone(self):
         """Return a clone of this object."""
-        return Board(self.m)
+        board = Board.__new__(Board)
+        board.rows = self.rows
+        board.columns = self.columns
+        board.max_height = self.max_height
+        board.m = [row[:] for row in self.m]
+        board.zobrist_table = self.zobrist_table
+        board.adjacency = self.adjacency
+        board.compatible = self.compatible
+        board.rng = self.rng
+        board._key = self._key
+        board.moves = self.moves[:]
+        board.move_count = self.move_count
+        return board
+
+    def __getstate__(self):
+        # the shared tables are rebuilt from the dimensions
+        state = self.__dict__.copy()
+        del state["zobrist_table"]
+        del state["adjacency"]
+        del state["compatible"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.zobrist_table = get_zobrist_table(self.rows, self.columns,
+                                               self.max_height)
+        self._init_tables()
+        # boards pickled by older versions (e.g. in old traces) lack these
+        self.__dict__.setdefault("rng", None)
+        if "moves" not in state:
+            self._init_counters()
+
+    def _init_counters(self):
+        """Compute the Zobrist key and the move counts from scratch."""
+        m = self.m
+        mh = self.max_height
+        key = 0
+        moves = []
+        for row in m:
+            for x in row:
+                if x:
+                    c = len(moves)
+                    key ^= self.zobrist_table[c][x + mh]
+                    compatible = self.compatible[x + mh]
+                    n = 0
+                    for i2, j2, c2 in self.adjacency[c]:
+                        if compatible[m[i2][j2] + mh]:
+                            n += 1
+                    moves.append(n)
+                else:
+                    moves.append(0)
+        self._key = key
+        self.moves = moves
+        self.move_count = sum(moves)
+
+    def seed(self, seed):
+        """Draw the random order of get_actions from a generator seeded
+        with seed instead of the random module.
+
+        The generator is shared with the clones of the board, so that a whole
+        search is reproducible.
+
+        """
+        self.rng = Random(seed)
+
+    def _init_tables(self):
+        """Set the adjacency and compatibility tables of the board."""
+        self.adjacency = get_adjacency_table(self.rows, self.columns)
+        self.compatible = get_compatibility_table(self.max_height)
+
+    @property
+    def zobrist_key(self):
+        """64-bit Zobrist hash of the position.
+
+        It is maintained incrementally by play_action, do_action and
+        undo_action; self.m must not be modified directly.
+
+        """
+        return self._key
+
+    def _update_key(self, i1, j1, x1, i2, j2, x2, x):
+        """Update the Zobrist key for tower x1 at (i1,j1) moved onto tower x2
+        at (i2,j2), yielding tower x."""
+        mh = self.max_height
+        self._key ^= self.zobrist_table[i1 * self.columns + j1][x1 + mh] ^ \
+            self.zobrist_table[i2 * self.columns + j2][x2 + mh] ^ \
+            self.zobrist_table[i2 * self.columns + j2][x + mh]
+
+    def _count_moves(self, i, j):
+        """Return the number of valid actions moving tower (i,j)."""
+        m = self.m
+        if not m[i][j]:
+            return 0
+        mh = self.max_height
+        compatible = self.compatible[m[i][j] + mh]
+        n = 0
+        for i2, j2, c2 in self.adjacency[i * self.columns + j]:
+            if compatible[m[i2][j2] + mh]:
+                n += 1
+        return n
+
+    def _update_moves(self, i1, j1, i2, j2):
+        """Recount the moves of the cells around (i1,j1) and (i2,j2).
+
+        Return the list of the (cell, old count) pairs that changed.
+
+        """
+        changed = []
+        moves = self.moves
+        for i in range(max(0, min(i1, i2) - 1),
+                       min(self.rows, max(i1, i2) + 2)):
+            for j in range(max(0, min(j1, j2) - 1),
+                           min(self.columns, max(j1, j2) + 2)):
+                c = i * self.columns + j
+                old = moves[c]
+                new = self._count_moves(i, j)
+                if new != old:
+                    changed.append((c, old))
+                    moves[c] = new
+                    self.move_count += new - old
+        return changed
 
     def get_percepts(self, invert=False):
         """Return the percepts corresponding to the current state.
@@ -114,45 +316,69 @@ class Board:
         """Return whether action is a valid action."""
         try:
             i1, j1, i2, j2 = action
-            if i1 < 0 or j1 < 0 or i2 < 0 or j2 < 0 or \
-               i1 >= self.rows or j1 >= self.columns or \
-               i2 >= self.rows or j2 >= self.columns or \
-               (i1 == i2 and j1 == j2) or (abs(i1-i2) > 1) or (abs(j1-j2) > 1):
-                return False
-            h1 = abs(self.m[i1][j1])
-            h2 = abs(self.m[i2][j2])
-            if h1 <= 0 or h1 >= self.max_height or h2 <= 0 or \
-                    h2 >= self.max_height or h1+h2 > self.max_height:
+            if i1 < 0 or j1 < 0 or i1 >= self.rows or j1 >= self.columns:
                 return False
-            return True
+            for i, j, c in self.adjacency[i1 * self.columns + j1]:
+                if i == i2 and j == j2:
+                    mh = self.max_height
+                    x1 = self.m[i1][j1]
+                    x2 = self.m[i2][j2]
+                    if abs(x1) > mh or abs(x2) > mh:
+                        return False # higher than any table entry
+                    return self.compatible[x1 + mh][x2 + mh]
+            return False
         except (TypeError, ValueError):
             return False
 
     def get_tower_actions(self, i, j):
         """Yield all actions with moving tower (i,j)"""
-        h = abs(self.m[i][j])
-        if h > 0 and h < self.max_height:
-            for di in (-1, 0, 1):
-                for dj in (-1, 0, 1):
-                    action = (i, j, i+di, j+dj)
-                    if self.is_action_valid(action):
-                        yield action
+        m = self.m
+        mh = self.max_height
+        compatible = self.compatible[m[i][j] + mh]
+        for i2, j2, c2 in self.adjacency[i * self.columns + j]:
+            if compatible[m[i2][j2] + mh]:
+                yield (i, j, i2, j2)
 
     def is_tower_movable(self, i, j):
         """Return wether tower (i,j) is movable"""
-        for action in self.get_tower_actions(i, j):
-            return True
-        return False
-
-    def get_actions(self):
-        """Yield all valid actions on this board."""
-        towers = []
-        for i, j, h in self.get_towers():
-            towers.append((i,j,h))
-        shuffle(towers)
-        for i,j,h in towers:
-            for action in self.get_tower_actions(i, j):
+        return self.moves[i * self.columns + j] > 0
+
+    def get_actions(self, order="random"):
+        """Yield all valid actions on this board.
+
+        Arguments:
+        order -- order of the actions:
+            "random" -- the towers in a random order, drawn from the
+                generator of the seed method if the board was seeded and
+                from the random module otherwise
+            "natural" -- the towers row by row, without building any list
+            a function -- key of the actions, which are yielded by
+                decreasing key (ties in the natural order)
+
+        """
+        columns = self.columns
+        if order == "natural":
+            for c, n in enumerate(self.moves):
+                if n:
+                    for action in self.get_tower_actions(c // columns,
+                                                         c % columns):
+                        yield action
+        elif order == "random":
+            towers = [c for c, n in enumerate(self.moves) if n]
+            if self.rng is None:
+                shuffle(towers)
+            else:
+                self.rng.shuffle(towers)
+            for c in towers:
+                for action in self.get_tower_actions(c // columns,
+                                                     c % columns):
+                    yield action
+        elif callable(order):
+            for action in sorted(self.get_actions("natural"), key=order,
+                                 reverse=True):
                 yield action
+        else:
+            raise ValueError("unknown action order: %r" % (order,))
 
     def play_action(self, action):
         """Play an action if it is valid.
@@ -165,20 +391,52 @@ class Board:
         if not self.is_action_valid(action):
             raise InvalidAction(action)
         i1, j1, i2, j2 = action
-        h1 = abs(self.m[i1][j1])
-        h2 = abs(self.m[i2][j2])
-        if self.m[i1][j1] < 0:
+        x1 = self.m[i1][j1]
+        x2 = self.m[i2][j2]
+        h1 = abs(x1)
+        h2 = abs(x2)
+        if x1 < 0:
             self.m[i2][j2] = -(h1 + h2)
         else:
             self.m[i2][j2] = h1 + h2
         self.m[i1][j1] = 0
+        self._update_key(i1, j1, x1, i2, j2, x2, self.m[i2][j2])
+        self._update_moves(i1, j1, i2, j2)
         return self
 
+    def do_action(self, action):
+        """Play an action in place and return the record to undo it.
+
+        The action is validated as in play_action. The returned record must
+        be given to undo_action, in the reverse order of the do_action calls,
+        to restore the board.
+
+        """
+        if not self.is_action_valid(action):
+            raise InvalidAction(action)
+        i1, j1, i2, j2 = action
+        x1 = self.m[i1][j1]
+        x2 = self.m[i2][j2]
+        h = abs(x1) + abs(x2)
+        self.m[i2][j2] = -h if x1 < 0 else h
+        self.m[i1][j1] = 0
+        key = self._key
+        self._update_key(i1, j1, x1, i2, j2, x2, self.m[i2][j2])
+        return (action, x1, x2, key, self._update_moves(i1, j1, i2, j2))
+
+    def undo_action(self, undo):
+        """Undo the action whose record undo was returned by do_action."""
+        (i1, j1, i2, j2), x1, x2, self._key, changed = undo
+        self.m[i1][j1] = x1
+        self.m[i2][j2] = x2
+        moves = self.moves
+        for c, old in changed:
+            self.move_count += old - moves[c]
+            moves[c] = old
+
     def is_finished(self):
         """Return whether no more moves can be made (i.e., game finished)."""
-        for action in self.get_actions():
-            return False
-        return True
+        return self.move_count == 0
 
     def get_score(self):
         """Return a score for this board.
@@ -219,9 +477,9 @@ class Board:
 
     def get_number_max_tower(self, i, j, weight_player1, weight_player2):
         result = 0
-        if self.m[i][j] == 5:
+        if self.m[i][j] == self.max_height:
             result += weight_player1
-        elif self.m[i][j] == -5:
+        elif self.m[i][j] == -self.max_height:
             result += weight_player2
         return result
 
@@ -229,16 +487,16 @@ class Board:
         score = 0
         for i in range(self.rows):
             for j in range(self.columns):
-                if self.m[i][j] == 4:
+                if self.m[i][j] == self.max_height - 1:
                     score += weight_player1
-                elif self.m[i][j] == -4:
+                elif self.m[i][j] == 1 - self.max_height:
                     score += weight_player2
         return score
 
 
     def get_score_not_great_tower_level_4(self, i, j, weight):
         score = 0
-        if abs(self.m[i][j]) == 4:
+        if abs(self.m[i][j]) == self.max_height - 1:
             if (self.is_tower_movable(i,j)):
                 score +=weight
         return score
@@ -248,7 +506,7 @@ class Board:
         for action in actions:
             (x, y, dx, dy) = action
             if self.m[x][y] < 0 or self.m[dx][dy] < 0 :
-                if abs(self.get_tower_at_the_origin_of_action(action)) + abs(self.get_tower_targeted_by_action(action))== 5:
+                if abs(self.get_tower_at_the_origin_of_action(action)) + abs(self.get_tower_targeted_by_action(action))== self.max_height:
                     score += weight
         return score
 
@@ -257,14 +515,25 @@ class Board:
         score = 0
         for i in range(self.rows):
             for j in range(self.columns):
-                score += self.get_number_max_tower(i, j, WEIGHT_TOWER_FIVE_PLAYER1, WEIGHT_TOWER_FIVE_PLAYER2)
-                score += self.get_number_tower(i, j, WEIGHT_TOWER__PLAYER1,WEIGHT_TOWER__PLAYER2)
-                score += self.cast_away(i, j, WEIGHT_CAST_AWAY_PLAYER1, WEIGHT_CAST_AWAY_PLAYER2)
-                score += self.get_score_not_great_tower_level_4(i, j, WEIGHT_DONT_DO_THAT)
-                actions = list(self.get_tower_actions(i, j))
-                if len(actions) == 1:
-                    score += self.near_a_bad_cast_away(i, j, actions[0], WEIGHT_DONT_DO_THAT)
-                score += self.have_a_tower_with_neighbor_that_complet_it(i, j, actions, WEIGHT_DONT_DO_THAT)
+                score += self.get_pimped_cell_score(i, j, WEIGHT_TOWER_FIVE_PLAYER1, WEIGHT_TOWER_FIVE_PLAYER2, WEIGHT_TOWER__PLAYER1, WEIGHT_TOWER__PLAYER2, WEIGHT_TOWER_FOUR_PLAYER1, WEIGHT_TOWER_FOUR_PLAYER2,
+                                                    WEIGHT_CAST_AWAY_PLAYER1, WEIGHT_CAST_AWAY_PLAYER2, WEIGHT_DONT_DO_THAT)
+        return score
+
+    def get_pimped_cell_score(self, i, j, WEIGHT_TOWER_FIVE_PLAYER1, WEIGHT_TOWER_FIVE_PLAYER2, WEIGHT_TOWER__PLAYER1, WEIGHT_TOWER__PLAYER2, WEIGHT_TOWER_FOUR_PLAYER1, WEIGHT_TOWER_FOUR_PLAYER2,
+                              WEIGHT_CAST_AWAY_PLAYER1, WEIGHT_CAST_AWAY_PLAYER2, WEIGHT_DONT_DO_THAT):
+        """
+        Return the contribution of cell (i,j) to get_pimped_score.
+        It only depends on the cell and its 8 neighbours.
+        """
+        score = 0
+        score += self.get_number_max_tower(i, j, WEIGHT_TOWER_FIVE_PLAYER1, WEIGHT_TOWER_FIVE_PLAYER2)
+        score += self.get_number_tower(i, j, WEIGHT_TOWER__PLAYER1,WEIGHT_TOWER__PLAYER2)
+        score += self.cast_away(i, j, WEIGHT_CAST_AWAY_PLAYER1, WEIGHT_CAST_AWAY_PLAYER2)
+        score += self.get_score_not_great_tower_level_4(i, j, WEIGHT_DONT_DO_THAT)
+        actions = list(self.get_tower_actions(i, j))
+        if len(actions) == 1:
+            score += self.near_a_bad_cast_away(i, j, actions[0], WEIGHT_DONT_DO_THAT)
+        score += self.have_a_tower_with_neighbor_that_complet_it(i, j, actions, WEIGHT_DONT_DO_THAT)
         return score
 
 
@@ -273,10 +542,10 @@ class Board:
         height = self.m[i][j]
         if height > 0:
             if not self.is_tower_movable(i,j):
-                score += (6-height) * weight_player1
+                score += (self.max_height+1-height) * weight_player1
         elif height < 0:
             if not self.is_tower_movable(i,j):
-                score += (6-abs(height)) * weight_player2
+                score += (self.max_height+1-abs(height)) * weight_player2
         return score
 
     def near_a_bad_cast_away(self, i, j, action, weight):
@@ -19,6 +19,7 @@ along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 import avalam
 import minimax
+from bitboard import BitBoard
 
 class Agent:
     """This is the skeleton of an agent to play the Avalam game."""
@@ -43,6 +44,25 @@ class Agent:
             newState = (newBoard, nextPlayer, nextStep)
             yield (action, newState)
 
+    def actions(self, state):
+        """Return the actions playable from state."""
+        return state[0].get_actions()
+
+    def do_action(self, state, action):
+        """Play action on the board of state in place and return the new
+        state with the record needed by undo_action.
+        """
+        board, player, step = state
+        return (board, player * -1, step + 1), board.do_action(action)
+
+    def undo_action(self, state, undo):
+        """Restore the board of state after do_action."""
+        state[0].undo_action(undo)
+
+    def hash(self, state):
+        """Return the Zobrist key of the board of state."""
+        return state[0].zobrist_key
+
     def cutoff(self, state, depth):
         """The cutoff function returns true if the alpha-beta/minimax
         search has to stop; false otherwise.
@@ -72,9 +92,9 @@ class Agent:
         will perform.
         """
         self.time_left = time_left
-        newBoard = avalam.Board(board.get_percepts(player==avalam.PLAYER2))
+        newBoard = BitBoard(board.get_percepts(player==avalam.PLAYER2))
         state = (newBoard, player, step)
-        return minimax.search(state, self)
+        return minimax.search(state, self, inplace=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized evaluation of many Avalam boards at once (requires NumPy).
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import numpy as np
+
+from avalam import Board
+
+
+OFFSETS = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)
+           if di or dj]
+
+
+def stack_boards(boards):
+    """Return the cells of a sequence of boards as an (N, rows, columns)
+    int8 array."""
+    return np.array([board.m for board in boards], dtype=np.int8)
+
+
+def stack_successors(board, actions):
+    """Return the cells of the boards reached by playing each action of the
+    sequence actions on board, as an (N, rows, columns) int8 array.
+
+    The actions are assumed to be valid; board is not modified.
+    """
+    actions = np.asarray(actions, dtype=np.intp).reshape(-1, 4)
+    n = len(actions)
+    cells = np.repeat(np.array(board.m, dtype=np.int8)[np.newaxis], n, axis=0)
+    k = np.arange(n)
+    i1, j1, i2, j2 = actions.T
+    x1 = cells[k, i1, j1]
+    h = np.abs(x1) + np.abs(cells[k, i2, j2])
+    cells[k, i2, j2] = np.where(x1 < 0, -h, h)
+    cells[k, i1, j1] = 0
+    return cells
+
+
+def neighbours(cells):
+    """Yield, for each of the 8 directions, the array of the neighbours of
+    every cell in that direction (0 outside of the board)."""
+    n, rows, columns = cells.shape
+    padded = np.zeros((n, rows + 2, columns + 2), dtype=cells.dtype)
+    padded[:, 1:-1, 1:-1] = cells
+    for di, dj in OFFSETS:
+        yield padded[:, 1 + di:rows + 1 + di, 1 + dj:columns + 1 + dj]
+
+
+def get_scores(cells, max_height=Board.max_height):
+    """Return the array of Board.get_score for each board of cells."""
+    towers = (cells > 0).sum(axis=(1, 2)) - (cells < 0).sum(axis=(1, 2))
+    top = (cells == max_height).sum(axis=(1, 2)) - \
+        (cells == -max_height).sum(axis=(1, 2))
+    return np.where(towers == 0, top, towers)
+
+
+def get_features(cells, max_height=Board.max_height):
+    """Return the features of get_pimped_score for each board of cells.
+
+    The result is a dictionary of (N,) arrays:
+    towers1, towers2 -- number of towers of each player
+    five1, five2 -- number of towers of height max_height of each player
+    cast_away1, cast_away2 -- sum of max_height + 1 - height over the towers
+        of each player that cannot move any more
+    four_movable -- number of movable towers of height max_height - 1
+    complete -- number of actions making a tower of height max_height that
+        involve a negative tower
+
+    """
+    heights = np.abs(cells).astype(np.int16)
+    occupied = heights > 0
+    moves = np.zeros(cells.shape, dtype=np.int16)
+    complete = np.zeros(cells.shape, dtype=np.int16)
+    for neighbour in neighbours(cells):
+        nh = np.abs(neighbour).astype(np.int16)
+        total = heights + nh
+        valid = occupied & (nh > 0) & (total <= max_height)
+        moves += valid
+        complete += valid & ((cells < 0) | (neighbour < 0)) & \
+            (total == max_height)
+    movable = moves > 0
+    yellow = cells > 0
+    red = cells < 0
+    isolated = occupied & ~movable
+    axes = (1, 2)
+    return {
+        "towers1": yellow.sum(axis=axes),
+        "towers2": red.sum(axis=axes),
+        "five1": (cells == max_height).sum(axis=axes),
+        "five2": (cells == -max_height).sum(axis=axes),
+        "cast_away1": np.where(isolated & yellow, max_height + 1 - heights, 0)
+        .sum(axis=axes),
+        "cast_away2": np.where(isolated & red, max_height + 1 - heights, 0)
+        .sum(axis=axes),
+        "four_movable": ((heights == max_height - 1) & movable)
+        .sum(axis=axes),
+        "complete": complete.sum(axis=axes),
+    }
+
+
+def get_pimped_scores(cells, WEIGHT_TOWER_FIVE_PLAYER1,
+                      WEIGHT_TOWER_FIVE_PLAYER2, WEIGHT_TOWER__PLAYER1,
+                      WEIGHT_TOWER__PLAYER2, WEIGHT_TOWER_FOUR_PLAYER1,
+                      WEIGHT_TOWER_FOUR_PLAYER2, WEIGHT_CAST_AWAY_PLAYER1,
+                      WEIGHT_CAST_AWAY_PLAYER2, WEIGHT_DONT_DO_THAT,
+                      max_height=Board.max_height):
+    """Return the array of Board.get_pimped_score (with the same weights)
+    for each board of cells.
+
+    As in Board.get_pimped_score, the weights of the towers of height
+    max_height - 1 are not used.  Board.near_a_bad_cast_away never
+    contributes (the tower it inspects is the moved tower itself), so it has
+    no counterpart here.
+    """
+    f = get_features(cells, max_height)
+    return (f["five1"] * WEIGHT_TOWER_FIVE_PLAYER1 +
+            f["five2"] * WEIGHT_TOWER_FIVE_PLAYER2 +
+            f["towers1"] * WEIGHT_TOWER__PLAYER1 +
+            f["towers2"] * WEIGHT_TOWER__PLAYER2 +
+            f["cast_away1"] * WEIGHT_CAST_AWAY_PLAYER1 +
+            f["cast_away2"] * WEIGHT_CAST_AWAY_PLAYER2 +
+            (f["four_movable"] + f["complete"]) * WEIGHT_DONT_DO_THAT)
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+Bitboard implementation of the Avalam board.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+from random import shuffle, Random
+
+from avalam import Board, InvalidAction, get_zobrist_table
+
+
+_geometries = {}
+
+
+def get_geometry(rows, columns):
+    """Return the precomputed masks for a board of the given dimensions.
+
+    Cell (i, j) is bit i * columns + j.  The result is a quadruplet
+    (neighbours, shifts, full, actions):
+    neighbours -- list giving for each bit the mask of its (at most 8)
+        neighbouring cells
+    shifts -- list of (shift, mask) pairs such that the neighbourhood of a
+        set of cells s is the union of ((s << shift) or (s >> -shift)) & mask
+    full -- mask of all the cells of the board
+    actions -- list giving for each bit the pairs (target, action) of the
+        actions moving its tower onto a neighbour, target being the mask of
+        the neighbour
+
+    """
+    key = (rows, columns)
+    if key not in _geometries:
+        full = (1 << (rows * columns)) - 1
+        not_first = 0
+        not_last = 0
+        for i in range(rows):
+            for j in range(columns):
+                if j > 0:
+                    not_first |= 1 << (i * columns + j)
+                if j < columns - 1:
+                    not_last |= 1 << (i * columns + j)
+        shifts = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if di == 0 and dj == 0:
+                    continue
+                # a neighbour at (i+di, j+dj) lands on (i, j) when shifted
+                # by -(di * columns + dj); it must not wrap around a row
+                mask = full
+                if dj == 1:
+                    mask &= not_last
+                elif dj == -1:
+                    mask &= not_first
+                shifts.append((-(di * columns + dj), mask))
+        neighbours = []
+        actions = []
+        for i in range(rows):
+            for j in range(columns):
+                n = 0
+                moves = []
+                for di in (-1, 0, 1):
+                    for dj in (-1, 0, 1):
+                        ni, nj = i + di, j + dj
+                        if (di or dj) and 0 <= ni < rows and 0 <= nj < columns:
+                            n |= 1 << (ni * columns + nj)
+                            moves.append((1 << (ni * columns + nj),
+                                          (i, j, ni, nj)))
+                neighbours.append(n)
+                actions.append(tuple(moves))
+        _geometries[key] = (neighbours, shifts, full, actions)
+    return _geometries[key]
+
+
+def iter_bits(b):
+    """Yield the indices of the set bits of b in increasing order."""
+    while b:
+        low = b & -b
+        yield low.bit_length() - 1
+        b ^= low
+
+
+class BitBoard:
+
+    """Avalam board stored as integer bitboards.
+
+    self.height[h] is the set of cells holding a tower of height h (for h
+    from 1 to self.max_height), self.yellow the set of cells whose top-most
+    counter is yellow (positive) and self.occupied the set of non-empty
+    cells.  Cell (i, j) is bit i * self.columns + j.  self.m is the usual
+    matrix of the signed heights, kept up to date with the bitboards, so
+    that reading a cell does not need to scan the height planes.
+
+    The set of the movable towers is computed with shifted masks when it is
+    first needed in a position and kept until the next action (undo_action
+    restores the one of the previous position).  The board must only be
+    modified through play_action, do_action and undo_action.
+
+    The public interface is the one of avalam.Board, so that an instance can
+    be used wherever a Board is expected.
+
+    """
+
+    def __init__(self, percepts=Board.initial_board,
+                 max_height=Board.max_height, invert=False, seed=None):
+        """Initialize the board.
+
+        Arguments:
+        percepts -- matrix representing the board
+        invert -- whether to invert the sign of all values, inverting the
+            players
+        max_height -- maximum height of a tower
+        seed -- if not None, seed of the random order of get_actions (see
+            avalam.Board.seed)
+
+        """
+        self.rng = None if seed is None else Random(seed)
+        self.rows = len(percepts)
+        self.columns = len(percepts[0])
+        self.max_height = max_height
+        self.neighbours, self.shifts, self.full, self.actions = \
+            get_geometry(self.rows, self.columns)
+        self.zobrist_table = get_zobrist_table(self.rows, self.columns,
+                                               max_height)
+        mul = -1 if invert else 1
+        self.m = [[mul * x for x in row] for row in percepts]
+        self.height = [0] * (max_height + 1)
+        self.yellow = 0
+        self.occupied = 0
+        self._key = 0
+        for i, j, x in self.get_towers():
+            c = i * self.columns + j
+            self.height[abs(x)] |= 1 << c
+            if x > 0:
+                self.yellow |= 1 << c
+            self.occupied |= 1 << c
+            self._key ^= self.zobrist_table[c][x + max_height]
+        self._movable = None
+        self._at_most = None
+
+    def __str__(self):
+        return str(Board(self.get_percepts(), self.max_height))
+
+    def clone(self):
+        """Return a clone of this object."""
+        board = BitBoard.__new__(BitBoard)
+        board.rows = self.rows
+        board.columns = self.columns
+        board.max_height = self.max_height
+        board.neighbours = self.neighbours
+        board.shifts = self.shifts
+        board.full = self.full
+        board.actions = self.actions
+        board.m = [row[:] for row in self.m]
+        board.height = self.height[:]
+        board.yellow = self.yellow
+        board.occupied = self.occupied
+        board.zobrist_table = self.zobrist_table
+        board.rng = self.rng
+        board._key = self._key
+        board._movable = self._movable
+        board._at_most = self._at_most
+        return board
+
+    def __getstate__(self):
+        # the tables are shared and rebuilt from the dimensions
+        state = self.__dict__.copy()
+        for name in ("neighbours", "shifts", "full", "actions",
+                     "zobrist_table", "_movable", "_at_most"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.neighbours, self.shifts, self.full, self.actions = \
+            get_geometry(self.rows, self.columns)
+        self.zobrist_table = get_zobrist_table(self.rows, self.columns,
+                                               self.max_height)
+        self._movable = None
+        self._at_most = None
+
+    seed = Board.seed
+
+    @property
+    def zobrist_key(self):
+        """64-bit Zobrist hash of the position (see avalam.Board)."""
+        return self._key
+
+    def get_cell(self, i, j):
+        """Return the signed height of the tower at (i, j)."""
+        return self.m[i][j]
+
+    def get_percepts(self, invert=False):
+        """Return the percepts corresponding to the current state.
+
+        If invert is True, the sign of all values is inverted to get the view
+        of the other player.
+
+        """
+        mul = -1 if invert else 1
+        return [[mul * x for x in row] for row in self.m]
+
+    def dilate(self, b):
+        """Return the set of cells adjacent to at least one cell of b."""
+        result = 0
+        for shift, mask in self.shifts:
+            if shift >= 0:
+                result |= (b << shift) & mask
+            else:
+                result |= (b >> -shift) & mask
+        return result
+
+    def movable(self):
+        """Return the set of cells holding a movable tower."""
+        if self._movable is None:
+            mh = self.max_height
+            height = self.height
+            # at_most[k] is the set of the towers of height at most k, the
+            # targets of a tower of height max_height - k
+            at_most = [0] * (mh + 1)
+            for k in range(1, mh + 1):
+                at_most[k] = at_most[k - 1] | height[k]
+            result = 0
+            for h in range(1, mh):
+                if height[h]:
+                    result |= height[h] & self.dilate(at_most[mh - h])
+            self._at_most = at_most
+            self._movable = result
+        return self._movable
+
+    def get_towers(self):
+        """Yield all towers.
+
+        Yield the towers as triplets (i, j, h):
+        i -- row number of the tower
+        j -- column number of the tower
+        h -- height of the tower (absolute value) and owner (sign)
+
+        """
+        for i, row in enumerate(self.m):
+            for j, x in enumerate(row):
+                if x:
+                    yield (i, j, x)
+
+    def is_action_valid(self, action):
+        """Return whether action is a valid action."""
+        try:
+            i1, j1, i2, j2 = action
+            if i1 < 0 or j1 < 0 or i2 < 0 or j2 < 0 or \
+               i1 >= self.rows or j1 >= self.columns or \
+               i2 >= self.rows or j2 >= self.columns:
+                return False
+            b1 = i1 * self.columns + j1
+            b2 = i2 * self.columns + j2
+            if not (self.neighbours[b1] >> b2) & 1:
+                return False
+            h1 = abs(self.m[i1][j1])
+            h2 = abs(self.m[i2][j2])
+            return 0 < h1 and 0 < h2 and h1 + h2 <= self.max_height
+        except (TypeError, ValueError):
+            return False
+
+    def targets(self, bit, h):
+        """Return the set of cells onto which a tower of height h at bit can
+        be moved."""
+        self.movable()
+        return self._at_most[self.max_height - h] & self.neighbours[bit]
+
+    def get_tower_actions(self, i, j):
+        """Yield all actions with moving tower (i,j)"""
+        h = abs(self.m[i][j])
+        if 0 < h < self.max_height:
+            bit = i * self.columns + j
+            targets = self.targets(bit, h)
+            for target, action in self.actions[bit]:
+                if targets & target:
+                    yield action
+
+    def is_tower_movable(self, i, j):
+        """Return wether tower (i,j) is movable"""
+        return bool((self.movable() >> (i * self.columns + j)) & 1)
+
+    def get_actions(self, order="random"):
+        """Yield all valid actions on this board.
+
+        See avalam.Board.get_actions for the possible orders.
+
+        """
+        columns = self.columns
+        if order == "natural":
+            towers = list(iter_bits(self.movable()))
+        elif order == "random":
+            towers = list(iter_bits(self.movable()))
+            if self.rng is None:
+                shuffle(towers)
+            else:
+                self.rng.shuffle(towers)
+        elif callable(order):
+            for action in sorted(self.get_actions("natural"), key=order,
+                                 reverse=True):
+                yield action
+            return
+        else:
+            raise ValueError("unknown action order: %r" % (order,))
+        m = self.m
+        at_most = self._at_most
+        actions = self.actions
+        mh = self.max_height
+        for bit in towers:
+            targets = at_most[mh - abs(m[bit // columns][bit % columns])]
+            for target, action in actions[bit]:
+                if targets & target:
+                    yield action
+
+    def play_action(self, action):
+        """Play an action if it is valid.
+
+        An action is a 4-uple containing the row and column of the tower to
+        move and the row and column of the tower to gobble. If the action is
+        invalid, raise an InvalidAction exception. Return self.
+
+        """
+        self.do_action(action)
+        return self
+
+    def do_action(self, action):
+        """Play an action in place and return the record to undo it.
+
+        See avalam.Board.do_action.
+
+        """
+        if not self.is_action_valid(action):
+            raise InvalidAction(action)
+        i1, j1, i2, j2 = action
+        c1 = i1 * self.columns + j1
+        c2 = i2 * self.columns + j2
+        b1 = 1 << c1
+        b2 = 1 << c2
+        x1 = self.m[i1][j1]
+        x2 = self.m[i2][j2]
+        h1 = abs(x1)
+        h2 = abs(x2)
+        x = h1 + h2 if x1 > 0 else -h1 - h2
+        undo = (action, x1, x2, self.yellow, self._key, self._movable,
+                self._at_most)
+        mh = self.max_height
+        self._key ^= self.zobrist_table[c1][x1 + mh] ^ \
+            self.zobrist_table[c2][x2 + mh] ^ self.zobrist_table[c2][x + mh]
+        self.m[i1][j1] = 0
+        self.m[i2][j2] = x
+        height = self.height
+        height[h1] &= ~b1
+        height[h2] &= ~b2
+        height[h1 + h2] |= b2
+        self.occupied &= ~b1
+        if x1 > 0:
+            self.yellow = (self.yellow & ~b1) | b2
+        else:
+            self.yellow &= ~b2
+        self._movable = None
+        return undo
+
+    def undo_action(self, undo):
+        """Undo the action whose record undo was returned by do_action."""
+        (i1, j1, i2, j2), x1, x2, self.yellow, self._key, self._movable, \
+            self._at_most = undo
+        b1 = 1 << (i1 * self.columns + j1)
+        b2 = 1 << (i2 * self.columns + j2)
+        h1 = abs(x1)
+        h2 = abs(x2)
+        height = self.height
+        height[h1 + h2] &= ~b2
+        height[h1] |= b1
+        height[h2] |= b2
+        self.occupied |= b1
+        self.m[i1][j1] = x1
+        self.m[i2][j2] = x2
+
+    def is_finished(self):
+        """Return whether no more moves can be made (i.e., game finished)."""
+        return not self.movable()
+
+    def get_score(self):
+        """Return a score for this board.
+
+        The score is the difference between the number of towers of each
+        player. In case of ties, it is the difference between the maximal
+        height towers of each player. If self.is_finished() returns True,
+        this score represents the winner (<0: red, >0: yellow, 0: draw).
+
+        """
+        yellow = self.yellow.bit_count()
+        score = 2 * yellow - self.occupied.bit_count()
+        if score == 0:
+            top = self.height[self.max_height]
+            score = 2 * (top & self.yellow).bit_count() - top.bit_count()
+        return score
+
+    def get_pimped_score(self, WEIGHT_TOWER_FIVE_PLAYER1,
+                         WEIGHT_TOWER_FIVE_PLAYER2, WEIGHT_TOWER__PLAYER1,
+                         WEIGHT_TOWER__PLAYER2, WEIGHT_TOWER_FOUR_PLAYER1,
+                         WEIGHT_TOWER_FOUR_PLAYER2, WEIGHT_CAST_AWAY_PLAYER1,
+                         WEIGHT_CAST_AWAY_PLAYER2, WEIGHT_DONT_DO_THAT):
+        """Return avalam.Board.get_pimped_score computed on the bitboards.
+
+        The features are those of batchevaluation.get_features: counts of
+        towers, of immovable towers weighted by max_height + 1 - height, of
+        movable towers of height max_height - 1 and of the actions making a
+        tower of height max_height with a red tower.
+
+        """
+        mh = self.max_height
+        height = self.height
+        yellow = self.yellow
+        red = self.occupied & ~yellow
+        movable = self.movable()
+        top = height[mh]
+        score = (top & yellow).bit_count() * WEIGHT_TOWER_FIVE_PLAYER1 + \
+            (top & red).bit_count() * WEIGHT_TOWER_FIVE_PLAYER2 + \
+            yellow.bit_count() * WEIGHT_TOWER__PLAYER1 + \
+            red.bit_count() * WEIGHT_TOWER__PLAYER2
+        isolated = self.occupied & ~movable
+        for h in range(1, mh + 1):
+            cells = height[h] & isolated
+            if cells:
+                score += (mh + 1 - h) * (
+                    (cells & yellow).bit_count() * WEIGHT_CAST_AWAY_PLAYER1 +
+                    (cells & red).bit_count() * WEIGHT_CAST_AWAY_PLAYER2)
+        dont = (height[mh - 1] & movable).bit_count()
+        for h in range(1, mh):
+            towers = height[h] & movable
+            if not towers:
+                continue
+            # pairs of towers adding up to max_height, one of them red
+            others = height[mh - h]
+            red_others = others & red
+            for shift, mask in self.shifts:
+                if shift >= 0:
+                    aligned = (others << shift) & mask
+                    aligned_red = (red_others << shift) & mask
+                else:
+                    aligned = (others >> -shift) & mask
+                    aligned_red = (red_others >> -shift) & mask
+                dont += (towers & ((aligned & red) | aligned_red)).bit_count()
+        return score + dont * WEIGHT_DONT_DO_THAT
+
+    # the other heuristics of avalam.Board only read self.m and the methods
+    # above
+    get_number_tower = Board.get_number_tower
+    get_number_max_tower = Board.get_number_max_tower
+    get_number_tower_level_4 = Board.get_number_tower_level_4
+    get_score_not_great_tower_level_4 = \
+        Board.get_score_not_great_tower_level_4
+    have_a_tower_with_neighbor_that_complet_it = \
+        Board.have_a_tower_with_neighbor_that_complet_it
+    get_pimped_cell_score = Board.get_pimped_cell_score
+    cast_away = Board.cast_away
+    near_a_bad_cast_away = Board.near_a_bad_cast_away
+    get_tower_at_the_origin_of_action = \
+        Board.get_tower_at_the_origin_of_action
+    get_tower_targeted_by_action = Board.get_tower_targeted_by_action
+    get_tower_height = Board.get_tower_height
+    action_cover_my_tower_with_an_other_tower = \
+        Board.action_cover_my_tower_with_an_other_tower
+    action_cover_my_tower_with_an_opponent_tower = \
+        Board.action_cover_my_tower_with_an_opponent_tower
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Opening book for the Avalam agents.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+A book is a file made of a header followed by fixed-size records sorted by
+key.  Each record gives the move to play, and its value, in a position
+where the positive player is to move.  The key of a position is its
+canonical key (see symmetry.canonical_key), so that one record serves all
+the symmetric images of the position; the move is stored in the
+orientation of the canonical image.
+
+Usage: python3 book.py [options] -o FILE  (see --help)
+
+"""
+
+import logging
+import math
+import mmap
+import os
+import struct
+
+from avalam import Board
+from symmetry import canonical_key, inverse, transform_action
+
+
+MAGIC = b"AVBK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQ")  # magic, version, record size, count
+RECORD = struct.Struct("<Q4bf")  # key, action, value
+KEY = struct.Struct("<Q")
+
+
+def book_key(board):
+    """Return the (key, transform) pair locating board in a book."""
+    key, transform, sign = canonical_key(board)
+    return key, transform
+
+
+def write_book(path, entries):
+    """Write a book.
+
+    Arguments:
+    path -- name of the file, which is replaced atomically
+    entries -- dictionary mapping the keys to the (action, value) pairs,
+        the actions being in the orientation of the canonical image
+
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(entries)))
+        for key in sorted(entries):
+            action, value = entries[key]
+            f.write(RECORD.pack(key, *action, value))
+    os.replace(tmp, path)
+
+
+class InvalidBook(Exception):
+
+    """Raised when a file is not a book."""
+
+
+class OpeningBook:
+
+    """Read-only access to a book.
+
+    The file is mapped in memory and searched by bisection, so that opening
+    a book costs nothing and a lookup only reads a few pages of it.
+
+    """
+
+    def __init__(self, path):
+        """Open the book in file path."""
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            if os.fstat(self.file.fileno()).st_size < HEADER.size:
+                raise InvalidBook("%s: truncated header" % path)
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            magic, version, size, self.count = HEADER.unpack_from(self.map)
+            if magic != MAGIC or version != VERSION or size != RECORD.size:
+                raise InvalidBook("%s: not a book of version %d" %
+                                  (path, VERSION))
+            if len(self.map) < HEADER.size + self.count * RECORD.size:
+                raise InvalidBook("%s: truncated records" % path)
+        except InvalidBook:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Release the file."""
+        if getattr(self, "map", None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def record(self, k):
+        """Return the k-th record as a (key, action, value) triplet."""
+        key, i1, j1, i2, j2, value = RECORD.unpack_from(
+            self.map, HEADER.size + k * RECORD.size)
+        return key, (i1, j1, i2, j2), value
+
+    def find(self, key):
+        """Return the (action, value) pair of key, or None."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            k = KEY.unpack_from(self.map, HEADER.size +
+                                middle * RECORD.size)[0]
+            if k < key:
+                low = middle + 1
+            elif k > key:
+                high = middle
+            else:
+                return self.record(middle)[1:]
+        return None
+
+    def lookup(self, board):
+        """Return the (action, value) pair for board, the positive player to
+        move, or None if board is not in the book."""
+        key, transform = book_key(board)
+        entry = self.find(key)
+        if entry is None:
+            return None
+        action = transform_action(entry[0], inverse(transform),
+                                  board.columns)
+        if not board.is_action_valid(action):
+            return None  # key collision
+        return action, entry[1]
+
+    def items(self):
+        """Yield all the (key, action, value) records."""
+        for k in range(self.count):
+            yield self.record(k)
+
+
+def invert(board):
+    """Return board seen by the other player."""
+    return Board(board.get_percepts(True), board.max_height)
+
+
+def build_book(agent, plies, replies=None, entries=None):
+    """Build a book by self-play searches.
+
+    Two trees are explored, one with the book player moving first and one
+    with the book player moving second.  In the positions where the book
+    player is to move, agent chooses the move (its stats.value gives the
+    value), and only this move is followed.  In the positions where the
+    opponent is to move, his best replies according to the evaluation of
+    agent are all followed.
+
+    Arguments:
+    agent -- the agent searching the positions, e.g. a super_agent.Agent
+        without a book and with STATS set; its play method is called as in
+        an untimed game
+    plies -- number of plies of the book
+    replies -- number of replies of the opponent followed (default: all)
+    entries -- dictionary of the entries to complete (see write_book)
+
+    Return the entries of the book.
+    """
+    if entries is None:
+        entries = {}
+    seen = set()
+
+    def expand(board, ply, book_to_move):
+        if ply >= plies or board.is_finished():
+            return
+        key, transform = book_key(board)
+        if (key, book_to_move) in seen:
+            return
+        seen.add((key, book_to_move))
+        if book_to_move:
+            if key in entries:
+                action = transform_action(entries[key][0], inverse(transform),
+                                          board.columns)
+            else:
+                action = agent.play(board, 1, ply + 1, None)
+                value = getattr(getattr(agent, "stats", None), "value", None)
+                entries[key] = (transform_action(action, transform,
+                                                 board.columns),
+                                math.nan if value is None else value)
+                logging.info("Ply %d: %d entries, %s -> %s (%s)", ply,
+                             len(entries), key, action, value)
+            expand(invert(board.clone().play_action(action)), ply + 1, False)
+        else:
+            children = []
+            for action in board.get_actions("natural"):
+                child = board.clone().play_action(action)
+                children.append((agent.evaluate((child, 1, ply + 1)), child))
+            children.sort(key=lambda c: c[0], reverse=True)
+            for value, child in children[:replies]:
+                expand(invert(child), ply + 1, True)
+
+    expand(Board(), 0, True)
+    expand(Board(), 0, False)
+    return entries
+
+
+if __name__ == "__main__":
+    import argparse
+    import super_agent
+
+    parser = argparse.ArgumentParser(
+        description="Build an opening book for super_agent.py.")
+    parser.add_argument("-o", "--output", required=True,
+                        help="write the book to FILE", metavar="FILE")
+    parser.add_argument("-p", "--plies", type=int, default=4,
+                        help="number of plies of the book (default:"
+                             " %(default)s)")
+    parser.add_argument("-d", "--depth", type=int, default=4,
+                        help="depth of the searches (default: %(default)s)")
+    parser.add_argument("-r", "--replies", type=int, default=None,
+                        help="number of replies of the opponent to follow"
+                             " (default: all)")
+    parser.add_argument("-u", "--update", action="store_true", default=False,
+                        help="keep the entries of the existing book")
+    parser.add_argument("-v", "--verbose", action="store_true", default=False,
+                        help="be verbose")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s -- %(levelname)s: %(message)s",
+                        level=logging.INFO if args.verbose else
+                        logging.WARNING)
+
+    entries = {}
+    if args.update and os.path.exists(args.output):
+        book = OpeningBook(args.output)
+        entries = {key: (action, value)
+                   for key, action, value in book.items()}
+        book.close()
+    super_agent.Agent.BOOK = None  # search every position
+    super_agent.Agent.STATS = True  # for the values of the positions
+    agent = super_agent.Agent()
+    agent.UNTIMED_DEPTH = args.depth
+    build_book(agent, args.plies, args.replies, entries)
+    write_book(args.output, entries)
+    print("%d positions written to %s" % (len(entries), args.output))
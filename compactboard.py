@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Compact implementation of the Avalam board.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+from array import array
+from random import shuffle, Random
+
+from avalam import Board, InvalidAction, get_zobrist_table, \
+    get_adjacency_table, get_compatibility_table
+
+
+class CompactBoard:
+
+    """Avalam board stored in a single flat array of signed bytes.
+
+    self.cells[i * self.columns + j] holds the value of cell (i, j) with the
+    conventions of avalam.Board.  The class uses __slots__ and clone() only
+    copies the array, so that a board takes a few hundred bytes.  self.m is
+    a tuple of read-only memoryviews of the rows of the array, giving the
+    usual self.m[i][j] access; it is built once per board and follows the
+    changes of the cells.  self.moves and self.move_count are the move counts
+    of avalam.Board, self.moves being an array of signed bytes too.  The
+    board must only be modified through play_action, do_action and
+    undo_action.
+
+    The public interface is the one of avalam.Board, so that an instance can
+    be used wherever a Board is expected.
+
+    """
+
+    __slots__ = ("cells", "rows", "columns", "max_height", "zobrist_table",
+                 "adjacency", "compatible", "rng", "_key", "_m", "moves",
+                 "move_count")
+
+    def __init__(self, percepts=Board.initial_board,
+                 max_height=Board.max_height, invert=False, seed=None):
+        """Initialize the board.
+
+        Arguments:
+        percepts -- matrix representing the board
+        invert -- whether to invert the sign of all values, inverting the
+            players
+        max_height -- maximum height of a tower
+        seed -- if not None, seed of the random order of get_actions (see
+            avalam.Board.seed)
+
+        """
+        self.rng = None if seed is None else Random(seed)
+        mul = -1 if invert else 1
+        self.rows = len(percepts)
+        self.columns = len(percepts[0])
+        self.max_height = max_height
+        self.cells = array("b", [mul * x for row in percepts for x in row])
+        self._m = None
+        self.zobrist_table = get_zobrist_table(self.rows, self.columns,
+                                               max_height)
+        self._init_tables()
+        self._init_counters()
+
+    def __str__(self):
+        return str(Board(self.get_percepts(), self.max_height))
+
+    def __getstate__(self):
+        # the shared tables and the move counts are rebuilt from the cells
+        return (self.cells.tobytes(), self.rows, self.columns,
+                self.max_height, self.rng, self._key)
+
+    def __setstate__(self, state):
+        cells, self.rows, self.columns, self.max_height, self.rng, \
+            self._key = state
+        self.cells = array("b", cells)
+        self._m = None
+        self.zobrist_table = get_zobrist_table(self.rows, self.columns,
+                                               self.max_height)
+        self._init_tables()
+        self._init_counters()
+
+    def _init_counters(self):
+        """Compute the Zobrist key and the move counts from scratch."""
+        mh = self.max_height
+        key = 0
+        for c, x in enumerate(self.cells):
+            key ^= self.zobrist_table[c][x + mh]
+        self._key = key
+        columns = self.columns
+        self.moves = array("b", [self._count_moves(c // columns, c % columns)
+                                 for c in range(len(self.cells))])
+        self.move_count = sum(self.moves)
+
+    seed = Board.seed
+
+    def _init_tables(self):
+        """Set the adjacency and compatibility tables of the board."""
+        self.adjacency = get_adjacency_table(self.rows, self.columns)
+        self.compatible = get_compatibility_table(self.max_height)
+
+    @property
+    def m(self):
+        """Read-only matrix view of the board, built on its first use."""
+        m = self._m
+        if m is None:
+            view = memoryview(self.cells).toreadonly()
+            c = self.columns
+            m = self._m = tuple(view[i * c:(i + 1) * c]
+                                for i in range(self.rows))
+        return m
+
+    @property
+    def zobrist_key(self):
+        """64-bit Zobrist hash of the position (see avalam.Board)."""
+        return self._key
+
+    def clone(self):
+        """Return a clone of this object."""
+        board = CompactBoard.__new__(CompactBoard)
+        board.cells = self.cells[:]
+        board.rows = self.rows
+        board.columns = self.columns
+        board.max_height = self.max_height
+        board.zobrist_table = self.zobrist_table
+        board.adjacency = self.adjacency
+        board.compatible = self.compatible
+        board.rng = self.rng
+        board._key = self._key
+        board._m = None
+        board.moves = self.moves[:]
+        board.move_count = self.move_count
+        return board
+
+    def get_percepts(self, invert=False):
+        """Return the percepts corresponding to the current state.
+
+        If invert is True, the sign of all values is inverted to get the view
+        of the other player.
+
+        """
+        mul = -1 if invert else 1
+        c = self.columns
+        return [[mul * x for x in self.cells[i * c:(i + 1) * c]]
+                for i in range(self.rows)]
+
+    def get_towers(self):
+        """Yield all towers.
+
+        Yield the towers as triplets (i, j, h):
+        i -- row number of the tower
+        j -- column number of the tower
+        h -- height of the tower (absolute value) and owner (sign)
+
+        """
+        for c, x in enumerate(self.cells):
+            if x:
+                yield (c // self.columns, c % self.columns, x)
+
+    def is_action_valid(self, action):
+        """Return whether action is a valid action."""
+        try:
+            i1, j1, i2, j2 = action
+            if i1 < 0 or j1 < 0 or i1 >= self.rows or j1 >= self.columns:
+                return False
+            c1 = i1 * self.columns + j1
+            for i, j, c2 in self.adjacency[c1]:
+                if i == i2 and j == j2:
+                    mh = self.max_height
+                    x1 = self.cells[c1]
+                    x2 = self.cells[c2]
+                    if abs(x1) > mh or abs(x2) > mh:
+                        return False # higher than any table entry
+                    return self.compatible[x1 + mh][x2 + mh]
+            return False
+        except (TypeError, ValueError):
+            return False
+
+    def _count_moves(self, i, j):
+        """Return the number of valid actions moving tower (i,j)."""
+        cells = self.cells
+        c = i * self.columns + j
+        if not cells[c]:
+            return 0
+        mh = self.max_height
+        compatible = self.compatible[cells[c] + mh]
+        n = 0
+        for i2, j2, c2 in self.adjacency[c]:
+            if compatible[cells[c2] + mh]:
+                n += 1
+        return n
+
+    _update_moves = Board._update_moves
+
+    def get_tower_actions(self, i, j):
+        """Yield all actions with moving tower (i,j)"""
+        cells = self.cells
+        mh = self.max_height
+        c = i * self.columns + j
+        compatible = self.compatible[cells[c] + mh]
+        for i2, j2, c2 in self.adjacency[c]:
+            if compatible[cells[c2] + mh]:
+                yield (i, j, i2, j2)
+
+    def is_tower_movable(self, i, j):
+        """Return wether tower (i,j) is movable"""
+        return self.moves[i * self.columns + j] > 0
+
+    def get_actions(self, order="random"):
+        """Yield all valid actions on this board.
+
+        See avalam.Board.get_actions for the possible orders.
+
+        """
+        columns = self.columns
+        if order == "natural":
+            for c, n in enumerate(self.moves):
+                if n:
+                    for action in self.get_tower_actions(c // columns,
+                                                         c % columns):
+                        yield action
+        elif order == "random":
+            towers = [c for c, n in enumerate(self.moves) if n]
+            if self.rng is None:
+                shuffle(towers)
+            else:
+                self.rng.shuffle(towers)
+            for c in towers:
+                for action in self.get_tower_actions(c // columns,
+                                                     c % columns):
+                    yield action
+        elif callable(order):
+            for action in sorted(self.get_actions("natural"), key=order,
+                                 reverse=True):
+                yield action
+        else:
+            raise ValueError("unknown action order: %r" % (order,))
+
+    def play_action(self, action):
+        """Play an action if it is valid.
+
+        An action is a 4-uple containing the row and column of the tower to
+        move and the row and column of the tower to gobble. If the action is
+        invalid, raise an InvalidAction exception. Return self.
+
+        """
+        self.do_action(action)
+        return self
+
+    def do_action(self, action):
+        """Play an action in place and return the record to undo it.
+
+        See avalam.Board.do_action.
+
+        """
+        if not self.is_action_valid(action):
+            raise InvalidAction(action)
+        i1, j1, i2, j2 = action
+        c1 = i1 * self.columns + j1
+        c2 = i2 * self.columns + j2
+        x1 = self.cells[c1]
+        x2 = self.cells[c2]
+        h = abs(x1) + abs(x2)
+        x = -h if x1 < 0 else h
+        key = self._key
+        self.cells[c2] = x
+        self.cells[c1] = 0
+        mh = self.max_height
+        self._key ^= self.zobrist_table[c1][x1 + mh] ^ \
+            self.zobrist_table[c2][x2 + mh] ^ self.zobrist_table[c2][x + mh]
+        return (c1, c2, x1, x2, key, self._update_moves(i1, j1, i2, j2))
+
+    def undo_action(self, undo):
+        """Undo the action whose record undo was returned by do_action."""
+        c1, c2, x1, x2, self._key, changed = undo
+        self.cells[c1] = x1
+        self.cells[c2] = x2
+        moves = self.moves
+        for c, old in changed:
+            self.move_count += old - moves[c]
+            moves[c] = old
+
+    def is_finished(self):
+        """Return whether no more moves can be made (i.e., game finished)."""
+        return self.move_count == 0
+
+    def get_score(self):
+        """Return a score for this board.
+
+        The score is the difference between the number of towers of each
+        player. In case of ties, it is the difference between the maximal
+        height towers of each player. If self.is_finished() returns True,
+        this score represents the winner (<0: red, >0: yellow, 0: draw).
+
+        """
+        score = 0
+        for x in self.cells:
+            if x < 0:
+                score -= 1
+            elif x > 0:
+                score += 1
+        if score == 0:
+            score = self.cells.count(self.max_height) - \
+                self.cells.count(-self.max_height)
+        return score
+
+    # the heuristics of avalam.Board only read self.m and the methods above
+    get_number_tower = Board.get_number_tower
+    get_number_max_tower = Board.get_number_max_tower
+    get_number_tower_level_4 = Board.get_number_tower_level_4
+    get_score_not_great_tower_level_4 = \
+        Board.get_score_not_great_tower_level_4
+    have_a_tower_with_neighbor_that_complet_it = \
+        Board.have_a_tower_with_neighbor_that_complet_it
+    get_pimped_score = Board.get_pimped_score
+    get_pimped_cell_score = Board.get_pimped_cell_score
+    cast_away = Board.cast_away
+    near_a_bad_cast_away = Board.near_a_bad_cast_away
+    get_tower_at_the_origin_of_action = \
+        Board.get_tower_at_the_origin_of_action
+    get_tower_targeted_by_action = Board.get_tower_targeted_by_action
+    get_tower_height = Board.get_tower_height
+    get_color_neighborhood = Board.get_color_neighborhood
+    action_cover_my_tower_with_an_other_tower = \
+        Board.action_cover_my_tower_with_an_other_tower
+    action_cover_my_tower_with_an_opponent_tower = \
+        Board.action_cover_my_tower_with_an_opponent_tower
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Exact Avalam solver based on depth-first proof-number search (df-pn).
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import time
+
+from endgame import BudgetExceeded
+
+
+INFINITY = 10 ** 9
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+class DfpnSolver:
+
+    """Solve Avalam positions exactly with df-pn.
+
+    The elementary question is whether the positive player can make sure
+    that the final score (see Board.get_score) is at least a threshold t.
+    The search is written with the phi and delta numbers of the player to
+    move: phi is the proof number of his goal (for the positive player,
+    score >= t; for the negative player, score < t) and delta its disproof
+    number.  The (phi, delta) pairs are kept in a transposition table
+    keyed by the Zobrist key of the board, the side to move and t, so that
+    the successive questions asked for one position share their work.
+
+    The boards are modified in place with do_action and undo_action and
+    must provide zobrist_key and zobrist_table (see avalam.Board).  The game
+    has no cycles (every action removes a tower), so no special care is
+    needed for repeated positions.
+
+    """
+
+    def __init__(self, max_entries=500000, epsilon=0.25):
+        """Create a solver.
+
+        Arguments:
+        max_entries -- the transposition table is cleared when it grows
+            beyond this number of entries
+        epsilon -- the 1 + epsilon trick: the best child is searched until
+            its delta exceeds (1 + epsilon) times the one of the second best
+            child, which avoids switching back and forth between children
+
+        """
+        self.max_entries = max_entries
+        self.epsilon = epsilon
+        self.table = {}
+        self.nodes = 0
+        self.max_nodes = None
+        self.deadline = None
+
+    def clear(self):
+        """Forget all the cached results."""
+        self.table.clear()
+
+    def _child_keys(self, board, actions):
+        """Return the Zobrist keys of the boards reached by actions."""
+        m = board.m
+        mh = board.max_height
+        columns = board.columns
+        zobrist = board.zobrist_table
+        key = board.zobrist_key
+        keys = []
+        for i1, j1, i2, j2 in actions:
+            x1 = m[i1][j1]
+            x2 = m[i2][j2]
+            h = abs(x1) + abs(x2)
+            x = -h if x1 < 0 else h
+            c1 = i1 * columns + j1
+            c2 = i2 * columns + j2
+            keys.append(key ^ zobrist[c1][x1 + mh] ^ zobrist[c2][x2 + mh] ^
+                        zobrist[c2][x + mh])
+        return keys
+
+    def _mid(self, board, side, threshold, th_phi, th_delta):
+        """Search board until its phi or delta reach their thresholds and
+        return the (phi, delta) pair."""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+        if self.deadline is not None and not self.nodes & 1023 and \
+                time.time() >= self.deadline:
+            raise BudgetExceeded()
+        table = self.table
+        key = (board.zobrist_key, side, threshold)
+        if board.is_finished():
+            score = board.get_score()
+            if (score >= threshold) == (side > 0):
+                result = (0, INFINITY)
+            else:
+                result = (INFINITY, 0)
+            table[key] = result
+            return result
+        actions = list(board.get_actions("natural"))
+        children = [(k, -side, threshold)
+                    for k in self._child_keys(board, actions)]
+        while True:
+            phi = INFINITY
+            delta = 0
+            best = None
+            second = INFINITY
+            for n, child in enumerate(children):
+                child_phi, child_delta = table.get(child, (1, 1))
+                delta = min(INFINITY, delta + child_phi)
+                if child_delta < phi:
+                    second = phi
+                    phi = child_delta
+                    best = n
+                    best_phi = child_phi
+                elif child_delta < second:
+                    second = child_delta
+            if phi >= th_phi or delta >= th_delta:
+                break
+            child_th_phi = th_delta - delta + best_phi
+            child_th_delta = min(th_phi,
+                                 int(second * (1 + self.epsilon)) + 1)
+            undo = board.do_action(actions[best])
+            try:
+                self._mid(board, -side, threshold, child_th_phi,
+                          child_th_delta)
+            finally:
+                board.undo_action(undo)
+        if len(table) >= self.max_entries:
+            table.clear()
+        table[key] = (phi, delta)
+        return phi, delta
+
+    def _search(self, board, side, threshold):
+        """Return whether the positive player can make sure that the final
+        score is at least threshold (within the current budget)."""
+        phi, delta = self._mid(board, side, threshold, INFINITY, INFINITY)
+        return (phi == 0) == (side > 0)
+
+    def _proven_action(self, board, side, threshold):
+        """Return an action keeping the goal of the player to move for
+        threshold, which must be proven."""
+        actions = list(board.get_actions("natural"))
+        children = self._child_keys(board, actions)
+        for action, key in zip(actions, children):
+            if self.table.get((key, -side, threshold), (1, 1))[0] == \
+                    INFINITY:
+                return action
+        # the proof has been dropped from the table
+        for action in actions:
+            undo = board.do_action(action)
+            try:
+                phi, delta = self._mid(board, -side, threshold, INFINITY,
+                                       INFINITY)
+            finally:
+                board.undo_action(undo)
+            if phi == INFINITY:
+                return action
+        return None
+
+    def _run(self, function, max_nodes, deadline, *args):
+        """Call function(*args) within a budget; return None if the budget
+        is exceeded."""
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        try:
+            return function(*args)
+        except BudgetExceeded:
+            return None
+        finally:
+            self.max_nodes = self.deadline = None
+
+    def prove(self, board, side, threshold, max_nodes=None, deadline=None):
+        """Return whether the positive player can make sure that the final
+        score is at least threshold, or None if the budget is exceeded.
+
+        Arguments:
+        board -- the board, which is left unchanged
+        side -- 1 if the positive player is to move, -1 otherwise
+        threshold -- the score to reach
+        max_nodes -- maximal number of nodes to expand (None: no limit)
+        deadline -- time (as returned by time.time) at which the search is
+            abandoned (None: no limit)
+
+        """
+        return self._run(self._search, max_nodes, deadline, board, side,
+                         threshold)
+
+    def solve(self, board, side=1, max_nodes=None, deadline=None):
+        """Return the result of the game with perfect play.
+
+        The result is a pair (result, action): result is WIN, DRAW or LOSS
+        for the positive player and action a best action for the player to
+        move (None if the game is finished).  None is returned instead if
+        the budget is exceeded.
+        """
+        return self._run(self._solve, max_nodes, deadline, board, side)
+
+    def _solve(self, board, side):
+        # score >= 1 is a win, score >= 0 a draw or a win
+        if self._search(board, side, 1):
+            result = WIN
+        elif self._search(board, side, 0):
+            result = DRAW
+        else:
+            result = LOSS
+        if board.is_finished():
+            return result, None
+        if result == (LOSS if side > 0 else WIN):
+            # every action loses for the player to move
+            return result, next(board.get_actions("natural"))
+        # the positive player reaches the threshold of the result, the
+        # negative one stays below the threshold of the next better result
+        threshold = result if side > 0 else result + 1
+        return result, self._proven_action(board, side, threshold)
+
+    def best_score(self, board, side=1, max_nodes=None, deadline=None):
+        """Return the final score with perfect play from both players.
+
+        The result is a pair (score, action) as for solve, or None if the
+        budget is exceeded.  The score is found by a binary search on the
+        threshold of prove.
+        """
+        return self._run(self._best_score, max_nodes, deadline, board, side)
+
+    def _best_score(self, board, side):
+        if board.is_finished():
+            return board.get_score(), None
+        towers = sum(1 for tower in board.get_towers())
+        low, high = -towers, towers  # low is reachable, high + 1 is not
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._search(board, side, middle):
+                low = middle
+            else:
+                high = middle - 1
+        if low == (-towers if side > 0 else towers):
+            # all the actions lead to this extreme score
+            return low, next(board.get_actions("natural"))
+        return low, self._proven_action(board, side,
+                                        low if side > 0 else low + 1)
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Exact endgame solver for Avalam based on independent regions.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import time
+
+from avalam import Board
+from symmetry import canonical_pattern
+
+
+INFINITY = float("inf")
+
+
+class BudgetExceeded(Exception):
+
+    """Raised when the solver exceeds its node or time budget."""
+
+
+def final_score(fixed):
+    """Return the score of a finished board (see Board.get_score) from its
+    (towers, top towers) differences."""
+    towers, tops = fixed
+    return towers if towers else tops
+
+
+def split_regions(cells, max_height=Board.max_height):
+    """Split a set of towers into independent regions.
+
+    Two adjacent towers are linked when one can be moved onto the other.
+    Links are never created by an action (a tower only grows), so the
+    connected components of the towers, the regions, evolve independently
+    until the end of the game.
+
+    Arguments:
+    cells -- dictionary mapping the (i, j) cells to their signed heights
+    max_height -- maximum height of a tower
+
+    Return a pair (fixed, regions):
+    fixed -- the (towers, top towers) differences between the players over
+        the towers that cannot move any more
+    regions -- list of the (pattern, (i0, j0)) pairs of the regions of more
+        than one tower, where pattern is the sorted tuple of the
+        (i - i0, j - j0, height) triplets of the towers of the region and
+        (i0, j0) the smallest row and column of the region
+
+    """
+    seen = set()
+    towers = tops = 0
+    regions = []
+    for start in cells:
+        if start in seen:
+            continue
+        seen.add(start)
+        component = [start]
+        k = 0
+        while k < len(component):
+            i, j = component[k]
+            h = abs(cells[(i, j)])
+            k += 1
+            for i2 in (i - 1, i, i + 1):
+                for j2 in (j - 1, j, j + 1):
+                    x2 = cells.get((i2, j2))
+                    if x2 and (i2, j2) not in seen and \
+                            h + abs(x2) <= max_height:
+                        seen.add((i2, j2))
+                        component.append((i2, j2))
+        if len(component) == 1:
+            x = cells[start]
+            sign = 1 if x > 0 else -1
+            towers += sign
+            if abs(x) == max_height:
+                tops += sign
+        else:
+            i0 = min(i for i, j in component)
+            j0 = min(j for i, j in component)
+            pattern = tuple(sorted((i - i0, j - j0, cells[(i, j)])
+                                   for i, j in component))
+            regions.append((pattern, (i0, j0)))
+    return (towers, tops), regions
+
+
+def get_board_regions(board):
+    """Return split_regions for all the towers of board."""
+    cells = {(i, j): h for i, j, h in board.get_towers()}
+    return split_regions(cells, board.max_height)
+
+
+class EndgameSolver:
+
+    """Exact solver for boards whose movable towers form small regions.
+
+    The game is solved by a minimax over the multisets of regions: a state
+    is the side to move, the score differences over the fixed towers and the
+    sorted tuple of the canonical patterns of the regions (see
+    symmetry.canonical_pattern).  Since these patterns are relative to the
+    regions and do not depend on their orientation, the same region in
+    different places of the board, in any orientation, or at different
+    moments of the game is analysed once; its successors are cached by
+    pattern in self.regions.  The bounds on the
+    values of the states are cached in self.values.
+
+    The values are final scores (see Board.get_score) from the point of
+    view of the positive player, who maximizes; side is 1 when he is to
+    move and -1 otherwise.
+
+    """
+
+    def __init__(self, max_height=Board.max_height, max_entries=200000):
+        """Create a solver.
+
+        Arguments:
+        max_height -- maximum height of a tower
+        max_entries -- the value cache is cleared when it grows beyond this
+            number of states
+
+        """
+        self.max_height = max_height
+        self.max_entries = max_entries
+        self.regions = {}
+        self.patterns = {}
+        self.values = {}
+        self.nodes = 0
+        self.max_nodes = None
+        self.deadline = None
+
+    def clear(self):
+        """Forget all the cached results."""
+        self.regions.clear()
+        self.patterns.clear()
+        self.values.clear()
+
+    def canonical(self, pattern):
+        """Return symmetry.canonical_pattern(pattern), cached."""
+        result = self.patterns.get(pattern)
+        if result is None:
+            if len(self.patterns) >= self.max_entries:
+                self.patterns.clear()
+            result = self.patterns[pattern] = canonical_pattern(pattern)
+        return result
+
+    def region_successors(self, pattern):
+        """Return the list of the (action, fixed, patterns) triplets for the
+        actions of a region.
+
+        action is the action in the coordinates of the pattern, fixed the
+        score differences of the towers that cannot move any more after it
+        and patterns the tuple of the canonical patterns of the resulting
+        regions.
+        """
+        successors = self.regions.get(pattern)
+        if successors is not None:
+            return successors
+        successors = []
+        cells = {(i, j): x for i, j, x in pattern}
+        for (i1, j1), x1 in cells.items():
+            h1 = abs(x1)
+            for i2 in (i1 - 1, i1, i1 + 1):
+                for j2 in (j1 - 1, j1, j1 + 1):
+                    x2 = cells.get((i2, j2))
+                    if not x2 or (i2 == i1 and j2 == j1) or \
+                            h1 + abs(x2) > self.max_height:
+                        continue
+                    h = h1 + abs(x2)
+                    child = cells.copy()
+                    del child[(i1, j1)]
+                    child[(i2, j2)] = -h if x1 < 0 else h
+                    fixed, regions = split_regions(child, self.max_height)
+                    successors.append(((i1, j1, i2, j2), fixed,
+                                       tuple(self.canonical(p)
+                                             for p, origin in regions)))
+        self.regions[pattern] = successors
+        return successors
+
+    def value(self, side, fixed, patterns, alpha=-INFINITY, beta=INFINITY):
+        """Return the final score reached with perfect play.
+
+        This is an AlphaBeta search: the result is exact if it lies strictly
+        between alpha and beta, and otherwise only a bound on the same side
+        of the window.  self.values stores the (lower, upper) bounds found
+        for each state.
+
+        Arguments:
+        side -- 1 if the positive player is to move, -1 otherwise
+        fixed -- score differences over the fixed towers
+        patterns -- sorted tuple of the canonical patterns of the regions
+        alpha, beta -- search window
+
+        """
+        if not patterns:
+            return final_score(fixed)
+        key = (side, fixed, patterns)
+        lower, upper = self.values.get(key, (-INFINITY, INFINITY))
+        if lower >= beta or lower == upper:
+            return lower
+        if upper <= alpha:
+            return upper
+        alpha = max(alpha, lower)
+        beta = min(beta, upper)
+        alpha0, beta0 = alpha, beta
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+        if self.deadline is not None and not self.nodes & 1023 and \
+                time.time() >= self.deadline:
+            raise BudgetExceeded()
+        best = -INFINITY * side
+        for k, pattern in enumerate(patterns):
+            if k and pattern == patterns[k - 1]:
+                continue  # same successors as the previous region
+            others = patterns[:k] + patterns[k + 1:]
+            for action, delta, children in self.ordered(pattern, side):
+                v = self.value(-side, (fixed[0] + delta[0],
+                                       fixed[1] + delta[1]),
+                               tuple(sorted(others + children)), alpha, beta)
+                if side > 0:
+                    best = max(best, v)
+                    alpha = max(alpha, v)
+                else:
+                    best = min(best, v)
+                    beta = min(beta, v)
+                if alpha >= beta:
+                    break
+            if alpha >= beta:
+                break
+        if best <= alpha0:
+            upper = min(upper, best)
+        elif best >= beta0:
+            lower = max(lower, best)
+        else:
+            lower = upper = best
+        if len(self.values) >= self.max_entries:
+            self.values.clear()
+        self.values[key] = (lower, upper)
+        return best
+
+    def ordered(self, pattern, side):
+        """Return region_successors(pattern), the actions fixing the most
+        towers of side first."""
+        successors = self.region_successors(pattern)
+        if side > 0:
+            return sorted(successors, key=lambda s: -s[1][0])
+        return sorted(successors, key=lambda s: s[1][0])
+
+    def solve(self, board, side=1, max_nodes=None, deadline=None):
+        """Return the best action on board and its value.
+
+        The result is a pair (action, value), action being None if the game
+        is finished, or None if the search needed more than max_nodes
+        nodes or went on until deadline (as returned by time.time).  The
+        results found before the budget ran out are kept for the next calls.
+        """
+        fixed, regions = get_board_regions(board)
+        if not regions:
+            return None, final_score(fixed)
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        best = None
+        alpha, beta = -INFINITY, INFINITY
+        try:
+            for k, (pattern, (i0, j0)) in enumerate(regions):
+                others = tuple(self.canonical(p)
+                               for n, (p, origin) in enumerate(regions)
+                               if n != k)
+                for (i1, j1, i2, j2), delta, children in \
+                        self.ordered(pattern, side):
+                    v = self.value(-side, (fixed[0] + delta[0],
+                                           fixed[1] + delta[1]),
+                                   tuple(sorted(others + children)),
+                                   alpha, beta)
+                    if best is None or (v > alpha if side > 0 else v < beta):
+                        best = ((i0 + i1, j0 + j1, i0 + i2, j0 + j2), v)
+                        if side > 0:
+                            alpha = v
+                        else:
+                            beta = v
+        except BudgetExceeded:
+            return None
+        finally:
+            self.max_nodes = self.deadline = None
+        return best
+
+
+def region_size(board):
+    """Return the number of towers of board that are part of a region, i.e.
+    that can still be moved or receive a tower."""
+    fixed, regions = get_board_regions(board)
+    return sum(len(pattern) for pattern, origin in regions)
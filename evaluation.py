@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental evaluation of Avalam boards.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+class IncrementalEvaluator:
+
+    """Keep Board.get_pimped_score up to date while actions are played.
+
+    The score is the sum of Board.get_pimped_cell_score over all cells, and
+    the contribution of a cell only depends on the cell and its neighbours.
+    An action only modifies two cells, so only the contributions of the
+    cells at distance at most 1 of them are recomputed.
+
+    The actions must be played through do_action/undo_action (or
+    play_action) of the evaluator rather than those of the board.
+
+    """
+
+    def __init__(self, board, *weights):
+        """Evaluate board with the weights of Board.get_pimped_score."""
+        self.board = board
+        self.weights = weights
+        self.cells = [[board.get_pimped_cell_score(i, j, *weights)
+                       for j in range(board.columns)]
+                      for i in range(board.rows)]
+        self.score = sum(sum(row) for row in self.cells)
+
+    def affected(self, action):
+        """Return the cells whose contribution may be changed by action."""
+        i1, j1, i2, j2 = action
+        cells = set()
+        for i, j in ((i1, j1), (i2, j2)):
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    ni, nj = i + di, j + dj
+                    if 0 <= ni < self.board.rows and \
+                            0 <= nj < self.board.columns:
+                        cells.add((ni, nj))
+        return cells
+
+    def do_action(self, action):
+        """Play action on the board and return the record to undo it."""
+        undo = self.board.do_action(action)
+        changed = []
+        for i, j in self.affected(action):
+            old = self.cells[i][j]
+            new = self.board.get_pimped_cell_score(i, j, *self.weights)
+            if new != old:
+                changed.append((i, j, old))
+                self.cells[i][j] = new
+                self.score += new - old
+        return (undo, changed)
+
+    def undo_action(self, record):
+        """Undo the action whose record was returned by do_action."""
+        undo, changed = record
+        self.board.undo_action(undo)
+        for i, j, old in changed:
+            self.score += old - self.cells[i][j]
+            self.cells[i][j] = old
+
+    def play_action(self, action):
+        """Play action on the board for good.  Return self."""
+        self.do_action(action)
+        return self
+
+    def get_score(self):
+        """Return the current value of Board.get_pimped_score."""
+        return self.score
@@ -27,6 +27,9 @@ import imp
 import subprocess
 
 from avalam import *
+from agentworker import AgentProcess, WorkerTimeout
+from minimax import SearchStats
+from tracefile import InvalidTrace, TraceWriter, is_trace, parse_trace
 
 
 class TimeCreditExpired(Exception):
@@ -143,13 +146,15 @@ class Trace:
 
     """
 
-    def __init__(self, board, time_limits):
+    def __init__(self, board, time_limits, f=None):
         """Initialize the trace.
 
         Arguments:
         board -- the initial board
         time_limits -- a sequence of 2 elements containing the time limits in
             seconds for each agent, or None for a time-unlimitted agent
+        f -- binary file to which the trace is written as the game goes
+            (see tracefile.TraceWriter), or None
 
         """
         self.time_limits = [t for t in time_limits]
@@ -157,6 +162,9 @@ class Trace:
         self.actions = []
         self.winner = 0
         self.reason = ""
+        self.writer = None
+        if f is not None:
+            self.writer = TraceWriter(f, board, self.time_limits)
 
     def add_action(self, player, action, t):
         """Add an action to the trace.
@@ -170,6 +178,8 @@ class Trace:
 
         """
         self.actions.append((player, action, t))
+        if self.writer is not None:
+            self.writer.add_action(player, action, t)
 
     def set_winner(self, winner, reason):
         """Set the winner.
@@ -181,26 +191,55 @@ class Trace:
         """
         self.winner = winner
         self.reason = reason
+        if self.writer is not None:
+            self.writer.set_winner(winner, reason)
 
     def get_initial_board(self):
         """Return a Board instance representing the initial board."""
         return self.initial_board.clone()
 
     def write(self, f):
-        """Write the trace to a file."""
-        pickle.dump(self, f)
+        """Write the trace to a binary file (see tracefile)."""
+        writer = TraceWriter(f, self.initial_board, self.time_limits)
+        for player, action, t in self.actions:
+            writer.add_action(player, action, t)
+        writer.set_winner(self.winner, self.reason)
 
 
-def load_trace(f):
-    """Load a trace from a file."""
-    return pickle.load(f)
+def load_trace(f, legacy=False):
+    """Load a trace from a binary file.
+
+    The trace of an unfinished game is a draw game with a specific reason.
+
+    Arguments:
+    f -- the file
+    legacy -- whether to accept the pickled traces written by the previous
+        versions; unpickling can run any code, so only set it for files
+        from trusted sources
+
+    """
+    data = f.read()
+    if not is_trace(data):
+        if not legacy:
+            raise InvalidTrace("not a trace (pickled traces need the legacy"
+                               " option)")
+        return pickle.loads(data)
+    header, board, actions, end = parse_trace(data)
+    trace = Trace(board, header["time_limits"])
+    trace.actions = actions
+    if end is None:
+        trace.set_winner(0, "The trace stops before the end of the game.")
+    else:
+        trace.set_winner(*end)
+    return trace
 
 
 class Game:
 
     """Main Avalam game class."""
 
-    def __init__(self, agents, board, viewer=None, credits=[None, None]):
+    def __init__(self, agents, board, viewer=None, credits=[None, None],
+                 trace_file=None):
         """New Avalam game.
 
         Arguments:
@@ -210,6 +249,8 @@ class Game:
         viewer -- the viewer or None if none should be used
         credits -- a sequence of 2 elements containing the time credit in
             seconds for each agent, or None for a time-unlimitted agent
+        trace_file -- binary file to which the trace is written as the game
+            goes, or None
 
         """
         self.agents = agents
@@ -218,7 +259,7 @@ class Game:
         self.credits = credits
         self.step = 0
         self.player = 1
-        self.trace = Trace(board, credits)
+        self.trace = Trace(board, credits, trace_file)
 
     def startPlaying(self):
         self.viewer.init_viewer(self.board.clone(), game=self)
@@ -229,14 +270,11 @@ class Game:
         """Play the game."""
         logging.info("Starting new game")
         try:
-            """
-            for agent in [1, -1]:
-                logging.debug("Initializing agent %d", agent)
-                self.timed_exec("initialize",
-                    self.board,
-                    [agent, -agent],
-                    agent=agent)
-            """
+            for player in [1, -1]:
+                # a failure is attributed to the player being initialized
+                self.player = player
+                self.initialize_agent(player)
+            self.player = 1
 
             while not self.board.is_finished():
                 self.step += 1
@@ -276,13 +314,27 @@ class Game:
         self.trace.set_winner(winner, reason)
         self.viewer.finished(self.step, winner, reason)
 
+    def initialize_agent(self, player):
+        """Call the initialize method of the agent of player if it has one.
+
+        The method is always called on remote agents, for which hasattr is
+        always true; see timed_exec.
+
+        """
+        agent = 0 if player > 0 else 1
+        if hasattr(self.agents[agent], "initialize"):
+            logging.debug("Initializing agent %d", agent)
+            self.timed_exec("initialize", self.board.clone(), [player],
+                            agent=agent)
+
     def timed_exec(self, fn, *args, agent=None):
         """Execute self.agents[agent].fn(*args, time_left) with the
         time limit for the current player.
 
         Return a tuple (result, t) with the function result and the time taken
         in seconds. If agent is None, the agent will be computed from
-        self.player.
+        self.player.  The time of an agentworker.AgentProcess is the one
+        measured by its worker process.
 
         """
         if agent is None:
@@ -294,13 +346,21 @@ class Game:
             if self.credits[agent] < 0:
                 raise TimeCreditExpired
             socket.setdefaulttimeout(self.credits[agent] + 1)
-        start = time.time()
+        start = time.perf_counter()
+        cpu = time.process_time()
         try:
-            result = self.agents[agent].play(*args + (self.credits[agent],))
-        except socket.timeout:
+            result = getattr(self.agents[agent], fn)(
+                *args + (self.credits[agent],))
+        except (socket.timeout, WorkerTimeout):
             self.credits[agent] = -1.0  # ensure it is counted as expired
             raise TimeCreditExpired
-        except (socket.error, xmlrpc.client.Fault) as e:
+        except xmlrpc.client.Fault as e:
+            if fn != "initialize" or "not supported" not in e.faultString:
+                logging.error("Player %d was unable to play step %d." +
+                              " Reason: %s", agent + 1, self.step, e)
+                raise InvalidAction
+            result = None # initialize is optional for remote agents too
+        except socket.error as e:
             logging.error("Player %d was unable to play step %d." +
                           " Reason: %s", agent + 1, self.step, e)
             raise InvalidAction
@@ -308,10 +368,16 @@ class Game:
             logging.error("Player %d was unable to play step %d." +
                           " Reason: %s", agent + 1, self.step, e)
             raise InvalidAction
-        end = time.time()
-        t = end - start
-        logging.info("Step %d: received result %s in %fs",
-                     self.step, result, t)
+        t = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        if isinstance(self.agents[agent], AgentProcess):
+            t, cpu = self.agents[agent].measured
+        logging.info("Step %d: received result %s in %fs (CPU %fs)",
+                     self.step, result, t, cpu)
+        stats = getattr(self.agents[agent], "stats", None)
+        if fn == "play" and isinstance(stats, SearchStats) and \
+                stats.total_nodes():
+            logging.info("Step %d: search statistics: %s", self.step, stats)
         if self.credits[agent] is not None:
             self.credits[agent] -= t
             logging.debug("New time credit for agent %d: %f",
@@ -368,6 +434,9 @@ if __name__ == "__main__":
                         metavar="AGENT2")
     parser.add_argument("-v", "--verbose", action="store_true", default=False,
                         help="be verbose")
+    parser.add_argument("--workers", action="store_true", default=False,
+                        help="run each agent in its own worker process," +
+                             " which measures its time precisely")
     parser.add_argument("--no-gui",
                         action="store_false", dest="gui", default=True,
                         help="do not try to load the graphical user interface")
@@ -394,6 +463,9 @@ if __name__ == "__main__":
                    metavar="SECONDS", default=2.0)
     g.add_argument("--realtime", action="store_true", default=False,
                    help="replay with the real durations")
+    g.add_argument("--legacy-pickle", action="store_true", default=False,
+                   help="accept a trace pickled by a previous version" +
+                        " (only from a trusted source)")
     args = parser.parse_args()
     if args.replay is None and args.headless and \
             (args.agent1 == "human" or args.agent2 == "human"):
@@ -413,9 +485,9 @@ if __name__ == "__main__":
         # replay mode
         logging.info("Loading trace '%s'", args.replay.name)
         try:
-            trace = load_trace(args.replay)
+            trace = load_trace(args.replay, args.legacy_pickle)
             args.replay.close()
-        except (IOError, pickle.UnpicklingError) as e:
+        except (IOError, pickle.UnpicklingError, InvalidTrace) as e:
             logging.error("Unable to load trace. Reason: %s", e)
             exit(1)
         board = trace.get_initial_board()
@@ -454,23 +526,27 @@ if __name__ == "__main__":
             if agents[i] == 'human':
                 agents[i] = viewer
             else:
-                agent_module = import_from_path(agents[i], "Player " + str(i + 1))
-                agents[i] = agent_module.Agent("Player " + str(i + 1))
+                if args.workers:
+                    agents[i] = AgentProcess(agents[i], "Player " + str(i + 1))
+                else:
+                    agent_module = import_from_path(agents[i], "Player " + str(i + 1))
+                    agents[i] = agent_module.Agent("Player " + str(i + 1))
                 credits[i] = args.time
-        game = Game(agents, board, viewer, credits)
+        if args.write is not None:
+            logging.info("Writing trace to '%s'", args.write.name)
+        game = Game(agents, board, viewer, credits, args.write)
 
         def play():
             try:
                 game.startPlaying()
             except KeyboardInterrupt:
                 exit()
-            if args.write is not None:
-                logging.info("Writing trace to '%s'", args.write.name)
-                try:
-                    game.trace.write(args.write)
+            finally:
+                if args.write is not None:
                     args.write.close()
-                except IOError as e:
-                    logging.error("Unable to write trace. Reason: %s", e)
+                for agent in agents:
+                    if isinstance(agent, AgentProcess):
+                        agent.close()
             if args.gui:
                 logging.debug("Replaying trace.")
                 viewer.replay(game.trace, args.speed, show_end=True)
@@ -26,6 +26,7 @@ import threading
 from SimpleWebSocketServer import WebSocket, SimpleWebSocketServer, SimpleSSLWebSocketServer
 from optparse import OptionParser
 from game import Viewer, Game
+from compactboard import CompactBoard
 
 logging.basicConfig(format='%(asctime)s %(message)s', level=logging.DEBUG)
 
@@ -230,8 +231,10 @@ class WebViewer(Viewer):
     """
     self.trace = trace
     self.speed = speed
-    # generate all boards to access them backwards
-    self.boards = [trace.get_initial_board()]
+    # generate all boards to access them backwards; compact boards keep a
+    # long replay small
+    initial = trace.get_initial_board()
+    self.boards = [CompactBoard(initial.m, initial.max_height)]
     for step in range(len(trace.actions)):
       player, action, t = trace.actions[step]
       b = self.boards[-1].clone()
@@ -17,6 +17,14 @@ along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import math
+import itertools
+import multiprocessing
+import time
+import weakref
+
+from transposition import EXACT, LOWER, UPPER
+
 
 class Game:
 
@@ -39,51 +47,918 @@ class Game:
         """Return the evaluation of state."""
         abstract
 
+    def hash(self, state):
+        """Return an integer identifying state (for transposition tables)."""
+        abstract
+
+    # The following methods are only needed by search(..., inplace=True).
+
+    def actions(self, state):
+        """Return the actions applicable in state."""
+        abstract
+
+    def do_action(self, state, action):
+        """Apply action to state in place.
+
+        Return a pair (s, undo) where s is the resulting state (which may
+        share its board with state) and undo is the record to give to
+        undo_action to restore state.
+
+        """
+        abstract
+
+    def undo_action(self, state, undo):
+        """Restore state as it was before the do_action returning undo."""
+        abstract
+
+    # Optional, called by the workers of a SearchPool:
+    #
+    # def track(self, state):
+    #     """Prepare the actions played in place on the board of state.
+    #
+    #     The workers receive a copy of the root state for each action they
+    #     search, so the objects following the board (e.g. an incremental
+    #     evaluator) must be set up again for this copy.
+    #     """
+
+    # Optional, used with a transposition table when hash gives the same key
+    # to states that are equivalent up to a renaming of the actions (e.g.
+    # symmetric positions):
+    #
+    # def table_action(self, state, action):
+    #     """Return the action stored in the table for action of state."""
+    #
+    # def state_action(self, state, action):
+    #     """Return the action of state for the action stored in the table,
+    #     the inverse of table_action."""
+
 
 inf = float("inf")
 
+# xored with the hash of the states where the minimizing player is to move
+MIN_KEY = 0x9e3779b97f4a7c15
 
-def search(state, game, prune=True):
-    """Perform a MiniMax/AlphaBeta search and return the best action.
 
-    Arguments:
-    state -- initial state
-    game -- a concrete instance of class Game
-    prune -- whether to use AlphaBeta pruning
+class _Timeout(Exception):
+    """Raised inside search when the deadline is reached."""
+
+
+class SearchStats:
+
+    """Statistics collected by a search.
+
+    Attributes:
+    nodes -- list giving the number of states visited at each depth
+    leaves -- number of evaluated states
+    cutoffs -- number of cutoffs
+    cutoff_index -- list giving the number of cutoffs caused by the first,
+        second, ... action of a state (the better the move ordering, the
+        more cutoffs are caused by the first action)
+    iterations -- list of (depth, nodes, seconds) for each completed pass
+        of the search (one per iterative deepening iteration)
+    table_probes, table_hits -- transposition table probes and hits
+    time_successors, time_evaluate, time_cutoff -- seconds spent in the
+        game functions generating the successors (successors, actions,
+        do_action and undo_action), in evaluate and in cutoff
+    elapsed -- total duration of the search in seconds
+    pv -- principal variation (actions from the root) of the last completed
+        pass
+    value -- value of the root found by the last completed pass, or None
 
     """
 
-    def max_value(state, alpha, beta, depth):
-        if game.cutoff(state, depth):
-            return game.evaluate(state), None
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Reset all the statistics."""
+        self.nodes = []
+        self.leaves = 0
+        self.cutoffs = 0
+        self.cutoff_index = []
+        self.iterations = []
+        self.table_probes = 0
+        self.table_hits = 0
+        self.time_successors = 0.0
+        self.time_evaluate = 0.0
+        self.time_cutoff = 0.0
+        self.elapsed = 0.0
+        self.pv = []
+        self.value = None
+        self._start = None
+
+    def start(self, table=None):
+        """Begin a new search with the transposition table table."""
+        self.reset()
+        self._start = time.perf_counter()
+        if table is not None:
+            self.table_probes = -table.probes
+            self.table_hits = -table.hits
+
+    def finish(self, table=None):
+        """End the search."""
+        self.elapsed = time.perf_counter() - self._start
+        if table is not None:
+            self.table_probes += table.probes
+            self.table_hits += table.hits
+
+    def visit(self, depth):
+        """Count a state visited at depth."""
+        while len(self.nodes) <= depth:
+            self.nodes.append(0)
+        self.nodes[depth] += 1
+
+    def cutoff(self, index):
+        """Count a cutoff caused by the index-th action of a state."""
+        self.cutoffs += 1
+        while len(self.cutoff_index) <= index:
+            self.cutoff_index.append(0)
+        self.cutoff_index[index] += 1
+
+    def iteration(self, depth, nodes, seconds):
+        """Record a completed pass of the search."""
+        self.iterations.append((depth, nodes, seconds))
+
+    def total_nodes(self):
+        """Return the number of visited states."""
+        return sum(self.nodes)
+
+    def depth(self):
+        """Return the depth of the deepest completed pass."""
+        if not self.iterations or self.iterations[-1][0] is None:
+            return len(self.nodes) - 1
+        return self.iterations[-1][0]
+
+    def branching_factor(self):
+        """Return the effective branching factor.
+
+        It is the ratio between the nodes of the two last iterations if
+        there are several, otherwise the depth-th root of the number of
+        nodes.
+        """
+        if len(self.iterations) >= 2 and self.iterations[-2][1]:
+            return self.iterations[-1][1] / self.iterations[-2][1]
+        depth = self.depth()
+        if depth <= 0:
+            return 0.0
+        return self.total_nodes() ** (1.0 / depth)
+
+    def merge(self, other):
+        """Add the counters of other (e.g. from a worker process)."""
+        for counts, more in ((self.nodes, other.nodes),
+                             (self.cutoff_index, other.cutoff_index)):
+            counts.extend([0] * (len(more) - len(counts)))
+            for k, n in enumerate(more):
+                counts[k] += n
+        self.leaves += other.leaves
+        self.cutoffs += other.cutoffs
+        self.table_probes += other.table_probes
+        self.table_hits += other.table_hits
+        self.time_successors += other.time_successors
+        self.time_evaluate += other.time_evaluate
+        self.time_cutoff += other.time_cutoff
+
+    def __str__(self):
+        return ("depth %s, %d nodes %s, %d leaves, %d cutoffs %s, "
+                "branching factor %.2f, table %d/%d hits, "
+                "time %.3fs (successors %.3fs, evaluate %.3fs, "
+                "cutoff %.3fs), pv %s" %
+                (self.depth(), self.total_nodes(), self.nodes, self.leaves,
+                 self.cutoffs, self.cutoff_index[:5],
+                 self.branching_factor(), self.table_hits,
+                 self.table_probes, self.elapsed, self.time_successors,
+                 self.time_evaluate, self.time_cutoff, self.pv))
+
+
+class _TimedGame:
+
+    """Wrapper of a game measuring the time spent in its functions."""
+
+    def __init__(self, game, stats):
+        self._game = game
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._game, name)
+
+    def _timed_iter(self, iterable):
+        stats = self._stats
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stats.time_successors += time.perf_counter() - start
+            yield item
+
+    def successors(self, state):
+        return self._timed_iter(self._game.successors(state))
+
+    def actions(self, state):
+        return self._timed_iter(self._game.actions(state))
+
+    def do_action(self, state, action):
+        start = time.perf_counter()
+        result = self._game.do_action(state, action)
+        self._stats.time_successors += time.perf_counter() - start
+        return result
+
+    def undo_action(self, state, undo):
+        start = time.perf_counter()
+        self._game.undo_action(state, undo)
+        self._stats.time_successors += time.perf_counter() - start
+
+    def cutoff(self, state, depth):
+        start = time.perf_counter()
+        result = self._game.cutoff(state, depth)
+        self._stats.time_cutoff += time.perf_counter() - start
+        return result
+
+    def evaluate(self, state):
+        start = time.perf_counter()
+        result = self._game.evaluate(state)
+        self._stats.time_evaluate += time.perf_counter() - start
+        self._stats.leaves += 1
+        return result
+
+    def evaluate_successors(self, state, actions):
+        start = time.perf_counter()
+        result = self._game.evaluate_successors(state, actions)
+        self._stats.time_evaluate += time.perf_counter() - start
+        self._stats.leaves += len(actions)
+        return result
+
+
+class _Search:
+
+    """State of one call to search (see its documentation)."""
+
+    def __init__(self, game, prune=True, inplace=False, table=None,
+                 max_depth=None, deadline=None, time_manager=None,
+                 ordering=None, algorithm="alphabeta", stats=None,
+                 batch=False):
+        if algorithm not in ("alphabeta", "pvs"):
+            raise ValueError("unknown search algorithm: %r" % (algorithm,))
+        self.algorithm = algorithm
+        self.stats = stats
+        if stats is not None:
+            game = _TimedGame(game, stats)
+        self.game = game
+        self.pv = {}
+        self.prune = prune
+        self.inplace = inplace
+        self.table = table
+        self.max_depth = max_depth
+        self.time_manager = time_manager
+        if time_manager is not None and deadline is None:
+            deadline = time_manager.deadline
+        self.deadline = deadline
+        self.ordering = ordering
+        self.batch = batch
+        self.horizon = max_depth
+        self.horizon_reached = False
+        self.root_best = None
+        self.table_action = getattr(game, "table_action", None)
+        self.state_action = getattr(game, "state_action", None)
+
+    def draft(self, depth):
+        """Return the remaining depth below depth, or 1 if unknown."""
+        if self.horizon is None:
+            return 1
+        return self.horizon - depth
+
+    def table_depth(self, depth):
+        """Return the depth stored in the table for a state at depth: the
+        remaining depth, or minus the depth from the root if there is no
+        horizon (there is then a single pass)."""
+        if self.horizon is None:
+            return -depth
+        return self.horizon - depth
+
+    def successors(self, state, depth, first=None):
+        """Yield (action, state, undo) triplets, starting with action first
+        if it is applicable, then in the order given by self.ordering."""
+        game = self.game
+        if self.inplace:
+            actions = game.actions(state)
+            if self.ordering is not None:
+                actions = self.ordering.order(actions, depth)
+            if first is not None:
+                actions = list(actions)
+                if first in actions:
+                    actions.remove(first)
+                    actions.insert(0, first)
+            for a in actions:
+                s, undo = game.do_action(state, a)
+                yield a, s, undo
+        else:
+            pairs = game.successors(state)
+            if self.ordering is not None:
+                states = dict(pairs)
+                pairs = [(a, states[a])
+                         for a in self.ordering.order(states, depth)]
+            if first is not None:
+                pairs = list(pairs)
+                for k, (a, s) in enumerate(pairs):
+                    if a == first:
+                        pairs.insert(0, pairs.pop(k))
+                        break
+            for a, s in pairs:
+                yield a, s, None
+
+    def is_leaf(self, state, depth):
+        if self.stats is not None:
+            self.stats.visit(depth)
+            self.pv[depth] = []
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise _Timeout
+        if self.game.cutoff(state, depth):
+            return True
+        if self.horizon is not None and depth >= self.horizon:
+            self.horizon_reached = True
+            return True
+        return False
+
+    def lookup(self, state, key, alpha, beta, depth):
+        """Return (value, move, alpha, beta) from the table; value is None
+        unless the stored result can be used as is."""
+        table = self.table
+        entry = table.probe(key)
+        if entry is None:
+            return None, None, alpha, beta
+        _, v, bound, d, move, generation = entry
+        if move is not None and self.state_action is not None:
+            move = self.state_action(state, move)
+        if generation == table.generation and \
+                d >= self.table_depth(depth) and depth > 0:
+            if bound == EXACT:
+                return v, move, alpha, beta
+            elif bound == LOWER:
+                alpha = max(alpha, v)
+            else:
+                beta = min(beta, v)
+            if alpha >= beta:
+                return v, move, alpha, beta
+        return None, move, alpha, beta
+
+    def batched(self, depth):
+        """Return whether the successors of the states at depth are to be
+        evaluated together."""
+        return self.batch and self.horizon is not None and \
+            depth + 1 >= self.horizon
+
+    def batch_value(self, state, depth, color):
+        """Evaluate all the successors of state at once with
+        game.evaluate_successors.
+
+        Return the value (for the maximizing player) of the best successor
+        for the player to move, color being 1 for the maximizing player and
+        -1 for the other, and the corresponding action.
+        """
+        actions = list(self.game.actions(state))
+        if not actions:
+            return self.game.evaluate(state), None
+        values = self.game.evaluate_successors(state, actions)
+        self.horizon_reached = True
+        if self.stats is not None:
+            self.stats.visit(depth + 1)
+            self.stats.nodes[depth + 1] += len(actions) - 1
+            self.pv[depth + 1] = []
+        best = max(range(len(actions)), key=lambda k: color * values[k])
+        self.improved(actions[best], depth)
+        return values[best], actions[best]
+
+    def improved(self, action, depth):
+        """Record that action is the best one found so far at depth."""
+        if depth == 0:
+            self.root_best = action
+        if self.stats is not None:
+            self.pv[depth] = [action] + self.pv.get(depth + 1, [])
+
+    def cut(self, action, depth, index):
+        """Record that the index-th action caused a cutoff at depth."""
+        if self.ordering is not None:
+            self.ordering.cutoff(action, depth, self.draft(depth))
+        if self.stats is not None:
+            self.stats.cutoff(index)
+
+    def store(self, state, key, val, alpha, beta, depth, action):
+        if action is not None and self.table_action is not None:
+            action = self.table_action(state, action)
+        if not self.prune or alpha < val < beta:
+            bound = EXACT
+        elif val >= beta:
+            bound = LOWER
+        else:
+            bound = UPPER
+        self.table.store(key, val, bound, self.table_depth(depth), action)
+
+    def max_value(self, state, alpha, beta, depth, first=None):
+        if self.is_leaf(state, depth):
+            return self.game.evaluate(state), None
+        if self.table is not None:
+            key = self.game.hash(state)
+            v, move, alpha, beta = self.lookup(state, key, alpha, beta, depth)
+            if v is not None:
+                return v, move
+            first = first or move
+            alpha0 = alpha
+        if self.batched(depth):
+            val, action = self.batch_value(state, depth, 1)
+            if self.table is not None:
+                self.store(state, key, val, alpha0, beta, depth, action)
+            return val, action
         val = -inf
         action = None
-        for a, s in game.successors(state):
-            v, _ = min_value(s, alpha, beta, depth + 1)
+        for k, (a, s, undo) in enumerate(self.successors(state, depth,
+                                                         first)):
+            try:
+                v, _ = self.min_value(s, alpha, beta, depth + 1)
+            finally:
+                if self.inplace:
+                    self.game.undo_action(state, undo)
             if v > val:
                 val = v
                 action = a
-                if prune:
+                self.improved(a, depth)
+                if self.prune:
                     if v >= beta:
-                        return v, a
+                        self.cut(a, depth, k)
+                        break
                     alpha = max(alpha, v)
+        if self.table is not None:
+            self.store(state, key, val, alpha0, beta, depth, action)
         return val, action
 
-    def min_value(state, alpha, beta, depth):
-        if game.cutoff(state, depth):
-            return game.evaluate(state), None
+    def min_value(self, state, alpha, beta, depth):
+        if self.is_leaf(state, depth):
+            return self.game.evaluate(state), None
+        first = None
+        if self.table is not None:
+            key = self.game.hash(state) ^ MIN_KEY
+            v, first, alpha, beta = self.lookup(state, key, alpha, beta, depth)
+            if v is not None:
+                return v, first
+            beta0 = beta
+        if self.batched(depth):
+            val, action = self.batch_value(state, depth, -1)
+            if self.table is not None:
+                self.store(state, key, val, alpha, beta0, depth, action)
+            return val, action
         val = inf
         action = None
-        for a, s in game.successors(state):
-            v, _ = max_value(s, alpha, beta, depth + 1)
+        for k, (a, s, undo) in enumerate(self.successors(state, depth,
+                                                         first)):
+            try:
+                v, _ = self.max_value(s, alpha, beta, depth + 1)
+            finally:
+                if self.inplace:
+                    self.game.undo_action(state, undo)
             if v < val:
                 val = v
                 action = a
-                if prune:
+                self.improved(a, depth)
+                if self.prune:
                     if v <= alpha:
-                        return v, a
+                        self.cut(a, depth, k)
+                        break
                     beta = min(beta, v)
+        if self.table is not None:
+            self.store(state, key, val, alpha, beta0, depth, action)
+        return val, action
+
+    def pvs(self, state, alpha, beta, depth, color, first=None):
+        """Principal variation search in negamax form.
+
+        Return the value of state for the player to move, i.e. color times
+        the value for the maximizing player (color is 1 or -1), and the best
+        action.
+        """
+        if self.is_leaf(state, depth):
+            return color * self.game.evaluate(state), None
+        if self.table is not None:
+            key = self.game.hash(state)
+            if color < 0:
+                key ^= MIN_KEY
+            # the table holds values for the maximizing player
+            if color > 0:
+                v, move, alpha, beta = self.lookup(state, key, alpha, beta,
+                                                   depth)
+            else:
+                v, move, beta, alpha = self.lookup(state, key, -beta, -alpha,
+                                                   depth)
+                beta, alpha = -beta, -alpha
+            if v is not None:
+                return color * v, move
+            first = first or move
+            alpha0 = alpha
+        if self.batched(depth):
+            v, action = self.batch_value(state, depth, color)
+            val = color * v
+        else:
+            val, action = self.pvs_children(state, alpha, beta, depth, color,
+                                            first)
+        if self.table is not None:
+            if color > 0:
+                self.store(state, key, val, alpha0, beta, depth, action)
+            else:
+                self.store(state, key, -val, -beta, -alpha0, depth, action)
         return val, action
 
-    _, action = max_value(state, -inf, inf, 0)
-    return action
+    def pvs_children(self, state, alpha, beta, depth, color, first):
+        """Search the successors of state for pvs and return (value,
+        action)."""
+        val = -inf
+        action = None
+        for k, (a, s, undo) in enumerate(self.successors(state, depth,
+                                                         first)):
+            try:
+                if action is None:
+                    v = -self.pvs(s, -beta, -alpha, depth + 1, -color)[0]
+                else:
+                    # null window: only prove that a is not better
+                    scout = math.nextafter(alpha, inf)
+                    v = -self.pvs(s, -scout, -alpha, depth + 1, -color)[0]
+                    if alpha < v < beta:
+                        v = -self.pvs(s, -beta, -v, depth + 1, -color)[0]
+            finally:
+                if self.inplace:
+                    self.game.undo_action(state, undo)
+            if v > val or action is None:
+                val = v
+                action = a
+                self.improved(a, depth)
+                if v > alpha:
+                    alpha = v
+                if alpha >= beta:
+                    self.cut(a, depth, k)
+                    break
+        return val, action
+
+    def child_value(self, state, alpha):
+        """Search a successor of the root, where the minimizing player is to
+        move, and return its value.
+
+        Only values greater than alpha are exact, the others are upper
+        bounds.
+        """
+        if self.algorithm == "pvs":
+            return -self.pvs(state, -inf, -alpha, 1, -1)[0]
+        return self.min_value(state, alpha, inf, 1)[0]
+
+    def root(self, state, first=None):
+        """Search the root state and return (value, action)."""
+        if self.algorithm == "pvs":
+            return self.pvs(state, -inf, inf, 0, 1, first)
+        return self.max_value(state, -inf, inf, 0, first)
+
+    def new_pass(self):
+        """Prepare the ordering for a new pass over the tree."""
+        if self.ordering is not None:
+            self.ordering.new_search()
+
+    def run(self, state):
+        """Search state and return the best action."""
+        if self.table is not None:
+            self.table.new_search()
+        stats = self.stats
+        if stats is not None:
+            stats.start(self.table)
+        try:
+            return self.iterate(state)
+        finally:
+            if stats is not None:
+                stats.finish(self.table)
+
+    def iterate(self, state):
+        """Search state, iteratively deepened if there is a deadline."""
+        if self.deadline is None:
+            self.new_pass()
+            start = time.time()
+            value, action = self.root(state)
+            self.pass_done(self.horizon, 0, start, value)
+            return action
+        best = None
+        self.horizon = 1
+        while self.max_depth is None or self.horizon <= self.max_depth:
+            if time.time() >= self.deadline:
+                break
+            self.new_pass()
+            self.horizon_reached = False
+            self.root_best = None
+            start = time.time()
+            nodes = self.stats.total_nodes() if self.stats else 0
+            try:
+                value, best = self.root(state, best)
+            except _Timeout:
+                if best is None:
+                    best = self.root_best
+                break
+            self.pass_done(self.horizon, nodes, start, value)
+            if not self.horizon_reached:
+                break  # a deeper search would explore the same tree
+            if self.time_manager is not None:
+                self.time_manager.iteration_done(self.horizon,
+                                                 time.time() - start)
+                if not self.time_manager.should_deepen():
+                    break
+            self.horizon += 1
+        if best is None:
+            # not even one action searched: play the first one
+            best = self.first_action(state)
+        return best
+
+    def first_action(self, state):
+        """Return the first action of state in the order of the game, or
+        None if there is none."""
+        if self.inplace:
+            for action in self.game.actions(state):
+                return action
+        else:
+            for action, s in self.game.successors(state):
+                return action
+        return None
+
+    def pass_done(self, horizon, nodes, start, value):
+        """Record in the statistics a completed pass to depth horizon which
+        started with nodes visited nodes at time start and gave value to the
+        root."""
+        if self.stats is not None:
+            self.stats.iteration(horizon,
+                                 self.stats.total_nodes() - nodes,
+                                 time.time() - start)
+            self.stats.pv = self.pv.get(0, [])
+            self.stats.value = value
+
+
+def search(state, game, prune=True, inplace=False, table=None,
+           max_depth=None, deadline=None, time_manager=None, ordering=None,
+           algorithm="alphabeta", stats=None, batch=False):
+    """Perform a MiniMax/AlphaBeta search and return the best action.
+
+    Arguments:
+    state -- initial state
+    game -- a concrete instance of class Game
+    prune -- whether to use AlphaBeta pruning
+    inplace -- whether to expand states with game.actions, game.do_action
+        and game.undo_action instead of game.successors, so that no state
+        has to be copied
+    table -- a transposition.TranspositionTable to reuse the results of
+        positions reached several times, or None; game.hash must then be
+        implemented
+    max_depth -- depth at which states are evaluated even if game.cutoff
+        returns False, or None for no limit
+    deadline -- time (as given by time.time()) at which the search must
+        stop, or None.  If set, the search is iteratively deepened (depth 1,
+        2, ... up to max_depth) and the best action of the deepest completed
+        iteration is returned.  Each iteration tries the best action of the
+        previous one first.
+    time_manager -- a timemanager.TimeManager whose move has been started,
+        or None.  Its hard deadline is used when deadline is None, and a new
+        iteration is only started if it is expected to finish in time.
+    ordering -- an ordering.MoveOrdering (or any object with the same
+        order, cutoff and new_search methods) sorting the actions of each
+        state, or None to keep the order of the game
+    algorithm -- "alphabeta" for the MiniMax/AlphaBeta search or "pvs" for
+        a principal variation search (NegaScout): the first action of each
+        state is searched with the full window and the others with a null
+        window, being searched again if they turn out better.  The pvs
+        search always prunes.
+    stats -- a SearchStats collecting statistics about the search, or None.
+        Collecting them slows the search down.
+    batch -- whether the successors of the states just above the depth
+        limit (max_depth or the current iterative deepening depth) are
+        evaluated all at once by game.evaluate_successors(state, actions),
+        which must return the list of their values, the actions being given
+        by game.actions.  There is no pruning among these successors.
+
+    """
+    return _Search(game, prune, inplace, table, max_depth, deadline,
+                   time_manager, ordering, algorithm, stats, batch).run(state)
+
+
+# state of the worker processes of a SearchPool
+_worker = {}
+
+# games of the living SearchPools, inherited by their forked workers; the
+# multiprocessing pools must not reference them or they would never be freed
+_pool_games = weakref.WeakValueDictionary()
+_pool_ids = itertools.count()
+
+
+def _init_worker(pool_id, bound, table_size):
+    from ordering import MoveOrdering
+    from transposition import TranspositionTable
+    _worker["game"] = _pool_games[pool_id]
+    _worker["bound"] = bound
+    _worker["table"] = TranspositionTable(table_size) if table_size else None
+    _worker["ordering"] = MoveOrdering()
+    _worker["pass"] = None
+    _worker["move"] = None
+
+
+def _search_root_action(task):
+    """Search one action of the root in a worker process.
+
+    Return (action, value, exact, stats), value being None if the deadline
+    has been reached and stats a SearchStats or None.
+    """
+    pass_id, state, action, child, options = task
+    game = _worker["game"]
+    table = _worker["table"]
+    ordering = _worker["ordering"] if options["ordering"] else None
+    stats = SearchStats() if options["stats"] else None
+    search = _Search(game, table=table, ordering=ordering, stats=stats,
+                     **options["search"])
+    if _worker["move"] != options["move"]:
+        _worker["move"] = options["move"]
+        _worker["ordering"].new_move()
+        if table is not None:
+            table.new_search()
+    if _worker["pass"] != pass_id:
+        _worker["pass"] = pass_id
+        search.new_pass()
+    if stats is not None:
+        stats.start(table)
+    bound = _worker["bound"]
+    alpha = bound.value
+    try:
+        if child is None:
+            track = getattr(game, "track", None)
+            if track is not None:
+                track(state)
+            child, undo = search.game.do_action(state, action)
+        v = search.child_value(child, alpha)
+    except _Timeout:
+        v = None
+    finally:
+        if stats is not None:
+            stats.finish(table)
+            stats.pv = [action] + search.pv.get(1, [])
+    if v is None:
+        return action, None, False, stats
+    exact = v > alpha
+    if exact:
+        with bound.get_lock():
+            if v > bound.value:
+                bound.value = v
+    return action, v, exact, stats
+
+
+def _close_pool(pool):
+    pool.terminate()
+    pool.join()
+
+
+class SearchPool:
+
+    """Pool of processes searching the actions of the root in parallel.
+
+    The pool is meant to be created once per game (e.g. in the initialize
+    method of an agent) and used for every move.  The worker processes are
+    forked with a copy of the game, so the game does not need to be
+    picklable, but its attributes modified afterwards are not seen by the
+    workers: the search depth must be given through max_depth.  Each worker
+    keeps its own transposition table and move ordering between moves.  The
+    workers receive copies of the root state, for which game.track(state)
+    is called if it exists (see Game).  The processes are stopped by close,
+    or when the pool is garbage collected.
+
+    The first action is searched alone, then the others are distributed
+    between the workers (young brothers wait).  The best value found so far
+    is shared between the workers, so that each action is searched with the
+    tightest known alpha bound.
+
+    """
+
+    def __init__(self, game, processes=None, table_size=16 * 1024 * 1024):
+        """Start the worker processes.
+
+        Arguments:
+        game -- the game (e.g. the agent) to search with
+        processes -- number of workers (default: number of CPUs)
+        table_size -- size in bytes of the transposition table of each
+            worker, or 0 to use none (game.hash must exist otherwise)
+
+        """
+        ctx = multiprocessing.get_context("fork")
+        self.game = game
+        self.bound = ctx.Value("d", -inf)
+        pool_id = next(_pool_ids)
+        _pool_games[pool_id] = game
+        self.pool = ctx.Pool(processes, _init_worker,
+                             (pool_id, self.bound, table_size))
+        self._close = weakref.finalize(self, _close_pool, self.pool)
+        self.passes = 0
+        self.moves = 0
+
+    def close(self):
+        """Stop the worker processes."""
+        self._close()
+
+    def search(self, state, inplace=False, max_depth=None, deadline=None,
+               time_manager=None, ordering=True, algorithm="alphabeta",
+               stats=None, batch=False):
+        """Perform a parallel AlphaBeta search and return the best action.
+
+        The arguments are those of search; ordering is a boolean telling
+        whether the workers use their own ordering.MoveOrdering.  If neither
+        max_depth nor a deadline is given, game.cutoff alone must stop the
+        search.  The statistics of the workers are summed in stats, their
+        times thus being CPU times rather than elapsed times.
+
+        """
+        self.moves += 1
+        if stats is not None:
+            stats.start()
+        try:
+            return self.iterate(state, inplace, max_depth, deadline,
+                                time_manager, ordering,
+                                {"algorithm": algorithm, "batch": batch},
+                                stats)
+        finally:
+            if stats is not None:
+                stats.finish()
+
+    def iterate(self, state, inplace, max_depth, deadline, time_manager,
+                ordering, options, stats):
+        """Search state, iteratively deepened if there is a deadline."""
+        if time_manager is not None and deadline is None:
+            deadline = time_manager.deadline
+        if inplace:
+            children = [(a, None) for a in self.game.actions(state)]
+        else:
+            children = list(self.game.successors(state))
+        if not children:
+            return None
+        if len(children) == 1 or deadline is None:
+            return self.search_pass(state, children, max_depth, deadline,
+                                    inplace, ordering, options, stats)[0]
+        best = None
+        horizon = 1
+        while max_depth is None or horizon <= max_depth:
+            start = time.time()
+            if best is not None:
+                k = [a for a, _ in children].index(best)
+                children.insert(0, children.pop(k))
+            action, complete = self.search_pass(state, children, horizon,
+                                                deadline, inplace, ordering,
+                                                options, stats)
+            if not complete:
+                if best is None:
+                    best = action
+                break
+            best = action
+            if time_manager is not None:
+                time_manager.iteration_done(horizon, time.time() - start)
+                if not time_manager.should_deepen():
+                    break
+            horizon += 1
+        return best
+
+    def search_pass(self, state, children, max_depth, deadline, inplace,
+                    ordering, options, stats=None):
+        """Search all children of state once.
+
+        Return (action, complete) where action is the best action found and
+        complete is False if the deadline has been reached.
+        """
+        self.passes += 1
+        self.bound.value = -inf
+        start = time.time()
+        nodes = stats.total_nodes() if stats is not None else 0
+        options = {"ordering": ordering, "stats": stats is not None,
+                   "move": self.moves,
+                   "search": dict(options, inplace=inplace,
+                                  max_depth=max_depth, deadline=deadline)}
+        tasks = [(self.passes, state, a, s, options) for a, s in children]
+        best = None
+        val = -inf
+        pv = []
+        complete = True
+        first = self.pool.apply(_search_root_action, (tasks[0],))
+        results = [first]
+        if first[1] is not None:
+            results.extend(self.pool.imap_unordered(_search_root_action,
+                                                    tasks[1:]))
+        for action, v, exact, worker_stats in results:
+            if worker_stats is not None:
+                stats.merge(worker_stats)
+            if v is None:
+                complete = False
+            elif exact and (best is None or v > val):
+                best, val = action, v
+                if worker_stats is not None:
+                    pv = worker_stats.pv
+        if best is None:
+            best = first[0]
+        if stats is not None and complete:
+            stats.nodes[0] += 1
+            stats.iteration(max_depth, stats.total_nodes() - nodes,
+                            time.time() - start)
+            stats.pv = pv
+            stats.value = val
+        return best, complete
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Move ordering heuristics for the AlphaBeta search.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+class MoveOrdering:
+
+    """Killer moves and history heuristic.
+
+    The killer moves of a depth are the last actions that caused a cutoff at
+    that depth; they are tried first in the sibling states.  The history
+    table gives to each action, i.e. to each (from, to) pair of cells, a
+    score increased by draft * draft whenever it causes a cutoff with draft
+    plies left to search; the other actions are tried by decreasing score.
+
+    """
+
+    def __init__(self, killers=2):
+        """Create a move ordering keeping killers killer moves per depth."""
+        self.killers_per_depth = killers
+        self.killers = {}
+        self.history = {}
+
+    def order(self, actions, depth):
+        """Return the list of actions in the order they should be tried."""
+        history = self.history
+        actions = sorted(actions, key=lambda a: history.get(a, 0),
+                         reverse=True)
+        killers = self.killers.get(depth)
+        if killers:
+            front = [a for a in killers if a in actions]
+            if front:
+                for a in front:
+                    actions.remove(a)
+                actions[:0] = front
+        return actions
+
+    def cutoff(self, action, depth, draft):
+        """Record that action caused a cutoff at depth with draft plies left."""
+        killers = self.killers.setdefault(depth, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[self.killers_per_depth:]
+        self.history[action] = self.history.get(action, 0) + draft * draft
+
+    def new_search(self):
+        """Age the history scores before a new search pass.
+
+        The killers are kept since they are indexed by the depth from the
+        root, which is the same for all the passes of one move.
+        """
+        for action in self.history:
+            self.history[action] //= 2
+
+    def new_move(self):
+        """Forget the killers, whose depths refer to the previous root."""
+        self.killers.clear()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Matches between two Avalam agents stopped by a sequential probability
+ratio test (SPRT).
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+The test decides between H0: the Elo difference of the first agent over
+the second is elo0, and H1: it is elo1.  After each game, the log
+likelihood ratio (LLR) of H1 against H0 is compared with the bounds
+log(beta / (1 - alpha)) and log((1 - beta) / alpha): the match stops with
+H0 below the first one and H1 above the second one.  alpha and beta are the
+probabilities of accepting H1 when H0 holds and H0 when H1 holds.
+
+Usage: python3 sprt.py [options] AGENT1 AGENT2  (see --help)
+
+"""
+
+import math
+import time
+
+from tournament import play_games, schedule
+
+
+def elo_to_score(elo):
+    """Return the expected score of a player elo points stronger than his
+    opponent."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    """Return the Elo difference giving the expected score."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class SPRT:
+
+    """Sequential probability ratio test on the results of a match.
+
+    The games are scored 1, 0.5 or 0 for the first agent.  The LLR is
+    computed with the normal approximation of the mean score, whose
+    variance is estimated from the results (as in the GSPRT used by the
+    chess engine testing frameworks).  A count of wins, draws or losses that
+    is still 0 counts as 0.5, so that the variance is never 0.
+
+    """
+
+    def __init__(self, elo0=0.0, elo1=10.0, alpha=0.05, beta=0.05):
+        """Create a test.
+
+        Arguments:
+        elo0, elo1 -- Elo differences of H0 and H1 (elo0 < elo1)
+        alpha -- probability of accepting H1 when H0 holds
+        beta -- probability of accepting H0 when H1 holds
+
+        """
+        if not elo0 < elo1:
+            raise ValueError("elo0 must be lower than elo1")
+        if not (0 < alpha < 1 and 0 < beta < 1):
+            raise ValueError("alpha and beta must be between 0 and 1")
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = self.draws = self.losses = 0
+
+    def add(self, points):
+        """Record the result of a game: 1, 0.5 or 0 points for the first
+        agent."""
+        if points == 1:
+            self.wins += 1
+        elif points == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def games(self):
+        """Return the number of games recorded."""
+        return self.wins + self.draws + self.losses
+
+    def _moments(self):
+        """Return the (mean, variance, games) of the score of a game."""
+        counts = [max(n, 0.5) for n in (self.wins, self.draws, self.losses)]
+        n = sum(counts)
+        mean = (counts[0] + 0.5 * counts[1]) / n
+        variance = (counts[0] * (1 - mean) ** 2 +
+                    counts[1] * (0.5 - mean) ** 2 +
+                    counts[2] * mean ** 2) / n
+        return mean, variance, n
+
+    def llr(self):
+        """Return the log likelihood ratio of H1 against H0."""
+        if not self.games():
+            return 0.0
+        mean, variance, n = self._moments()
+        s0 = elo_to_score(self.elo0)
+        s1 = elo_to_score(self.elo1)
+        return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+    def status(self):
+        """Return "H0" or "H1" if the test is decided, None otherwise."""
+        llr = self.llr()
+        if llr <= self.lower:
+            return "H0"
+        if llr >= self.upper:
+            return "H1"
+        return None
+
+    def elo(self, z=1.96):
+        """Return the (elo, low, high) estimate of the Elo difference of
+        the first agent, low and high being the bounds of the confidence
+        interval of z standard deviations (default: 95%)."""
+        mean, variance, n = self._moments()
+        margin = z * math.sqrt(variance / n)
+        return (score_to_elo(mean), score_to_elo(mean - margin),
+                score_to_elo(mean + margin))
+
+    def __str__(self):
+        elo, low, high = self.elo()
+        return ("%d games (+%d =%d -%d), Elo %+.1f [%+.1f, %+.1f],"
+                " LLR %.2f [%.2f, %.2f]" %
+                (self.games(), self.wins, self.draws, self.losses, elo, low,
+                 high, self.llr(), self.lower, self.upper))
+
+
+def run_match(agent1, agent2, test, max_games=10000, time_limit=None,
+              processes=None, seed=None, callback=None):
+    """Play a match until test is decided and return its status (see
+    SPRT.status, None if max_games were played first).
+
+    The games are played in parallel (see tournament.play_games), the
+    agents alternating the colours; the games still in progress when the
+    test is decided are abandoned.
+
+    Arguments:
+    agent1, agent2 -- paths of the agents, which must be different
+    test -- the SPRT, updated with the results of agent1
+    max_games -- maximum number of games
+    time_limit -- time credit of each player in seconds (None: untimed)
+    processes -- number of games played in parallel (default: number of
+        CPUs)
+    seed -- seed of the games (see tournament.play_games)
+    callback -- function called with each GameResult after test is updated
+
+    """
+    if agent1 == agent2:
+        raise ValueError("the agents must be different files")
+    games = play_games(schedule([agent1, agent2], max_games), time_limit,
+                       processes, seed)
+    try:
+        for result in games:
+            test.add(result.points(result.agents.index(agent1)))
+            if callback is not None:
+                callback(result)
+            status = test.status()
+            if status is not None:
+                return status
+    finally:
+        games.close()
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    def posfloatarg(string):
+        value = float(string)
+        if value <= 0:
+            raise argparse.ArgumentTypeError("%s is not strictly positive" %
+                                             string)
+        return value
+
+    parser = argparse.ArgumentParser(
+        description="Compare two Avalam agents with an SPRT.")
+    parser.add_argument("agent1", metavar="AGENT1",
+                        help="path to the tested agent")
+    parser.add_argument("agent2", metavar="AGENT2",
+                        help="path to the reference agent")
+    parser.add_argument("--elo0", type=float, default=0.0,
+                        help="Elo difference of H0 (default: %(default)s)")
+    parser.add_argument("--elo1", type=float, default=10.0,
+                        help="Elo difference of H1 (default: %(default)s)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="probability of accepting H1 when H0 holds"
+                             " (default: %(default)s)")
+    parser.add_argument("--beta", type=float, default=0.05,
+                        help="probability of accepting H0 when H1 holds"
+                             " (default: %(default)s)")
+    parser.add_argument("-g", "--max-games", type=int, default=10000,
+                        help="stop after this number of games (default:"
+                             " %(default)s)")
+    parser.add_argument("-t", "--time", type=posfloatarg,
+                        help="set the time credit per player (default:"
+                             " untimed games)",
+                        metavar="SECONDS")
+    parser.add_argument("-j", "--processes", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="number of games played in parallel (default:"
+                             " %(default)s)")
+    parser.add_argument("-s", "--seed", type=int,
+                        help="seed the random module of game k with SEED + k")
+    parser.add_argument("-v", "--verbose", action="store_true", default=False,
+                        help="print the test after each game")
+    args = parser.parse_args()
+    if args.agent1 == args.agent2:
+        parser.error("the agents must be different files")
+    try:
+        test = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def progress(result):
+        if args.verbose:
+            print(test)
+
+    start = time.perf_counter()
+    try:
+        status = run_match(args.agent1, args.agent2, test, args.max_games,
+                           args.time, args.processes, args.seed, progress)
+    except KeyboardInterrupt:
+        status = None
+        print("Interrupted")
+    print(test)
+    if status is None:
+        print("Undecided after %.1fs" % (time.perf_counter() - start))
+    else:
+        print("%s accepted after %.1fs (H0: %+g Elo, H1: %+g Elo)" %
+              (status, time.perf_counter() - start, args.elo0, args.elo1))
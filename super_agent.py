@@ -17,9 +17,23 @@ along with this program; if not, see <http://www.gnu.org/licenses/>.
 
 """
 
+import os
+import time
+
 import avalam
+import dfpn
 import minimax
-import time
+from book import InvalidBook, OpeningBook
+from endgame import EndgameSolver, get_board_regions
+from evaluation import IncrementalEvaluator
+try:
+    import batchevaluation
+except ImportError: # NumPy is not available, evaluate the boards one by one
+    batchevaluation = None
+from ordering import MoveOrdering
+from symmetry import SymmetricKeys, transform_action
+from timemanager import TimeManager
+from transposition import TranspositionTable
 
 
 class Agent:
@@ -35,13 +49,51 @@ class Agent:
     WEIGHT_CAST_AWAY_PLAYER2 = -15
     WEIGHT_DONT_DO_THAT = -100
 
+    MAX_DEPTH = 4 # never search deeper than this
+    UNTIMED_DEPTH = 2 # depth of the search when the game is not timed
+    ALGORITHM = "pvs" # see minimax.search
+    PROCESSES = 1 # number of processes searching in parallel
+    STATS = False # collect search statistics, which slows the search down
+    SEED = None # seed of the order of the actions, for reproducible searches
+    ENDGAME_TOWERS = 20 # solve the game exactly below this number of towers
+    ENDGAME_REGION = 10 # ... if no region has more towers than this
+    ENDGAME_NODES = 20000 # node budget of the exact solver per move
+    ENDGAME_TIME = 0.25 # fraction of the time of a move given to the solver
+    SOLVER_MOVES = 30 # try to prove the result below this number of actions
+    SOLVER_TIME = 0.5 # fraction of the time of a move given to the proof
+    SOLVER_NODES = 100000 # node budget of the proof when the game is untimed
+    SYMMETRIC = False # share the table entries of symmetric positions
+    BOOK = "book.bin" # opening book in the directory of this file, see book.py
+
     def __init__(self, name="Super Agent"):
         self.name = name
-        self.max_depth = 1 #at the beginning, we only explore one step
+        self.table = TranspositionTable()
+        self.timer = TimeManager()
+        self.ordering = MoveOrdering()
+        self.pool = None
+        self.evaluator = None
+        self.keys = None
+        self.endgame = EndgameSolver()
+        self.solver = dfpn.DfpnSolver()
+        self.book = None
+        if self.BOOK:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                self.BOOK)
+            try:
+                self.book = OpeningBook(path)
+            except (OSError, InvalidBook):
+                pass # no book, search every move
+        self.stats = minimax.SearchStats() # logged by game.py after each move
+
+    def initialize(self, percepts, players, time_left):
+        """Start the search processes once for the whole game."""
+        if self.PROCESSES > 1 and self.pool is None:
+            # the workers stop when the agent is freed, at the latest at exit
+            self.pool = minimax.SearchPool(self, self.PROCESSES)
 
 
     def comp(self,action):
-        score1 = self.comparable_score
+        score1 = 0
         x1, y1, dx1, dy1 = action
         if self.comparable_board.m[x1][y1] > 0 and self.comparable_board.m[dx1][dy1] < 0:
             score1 += 3
@@ -54,92 +106,140 @@ class Agent:
 
         return score1
 
-    def successors(self, state):
-        """The successors function must return (or yield) a list of
-        pairs (a, s) in which a is the action played to reach the
-        state s; s is the new state, i.e. a triplet (b, p, st) where
-        b is the new board after the action a has been played,
-        p is the player to play the next move and
-        st is the next step number.
+    def actions(self, state):
+        """Return the actions to explore from state, best first.
+
+        Actions covering one of our towers with another tower are only
+        returned when there is nothing else to play.
         """
         # the received state is a tuple: 0:board, 1:player, 2:step
         board, player, step = state
         ignored_mov = []
-        nbr_mov_yielded = 0
         list = []
         self.comparable_board = board
-        self.comparable_score = board.get_score()
         for action in board.get_actions():
             if not board.action_cover_my_tower_with_an_other_tower(action):
                 list.append(action)
-                nbr_mov_yielded += 1
             else:
                 ignored_mov.append(action)
         list.sort(key=self.comp)
-        #print("noeuds = ", nbr_mov_yielded)
-        if nbr_mov_yielded > 0:
-            for action in list :
-                new_board = board.clone()
-                new_board.play_action(action)
-                next_player = player * -1
-                next_step = step + 1
-                new_state = (new_board, next_player, next_step)
-                yield((action,new_state))
-        else:
-             for action in ignored_mov :
-                new_board = board.clone()
-                new_board.play_action(action)
-                next_player = player * -1
-                next_step = step + 1
-                new_state = (new_board, next_player, next_step)
-                yield((action,new_state))
+        #print("noeuds = ", len(list))
+        if list:
+            return list
+        return ignored_mov
 
+    def successors(self, state):
+        """The successors function must return (or yield) a list of
+        pairs (a, s) in which a is the action played to reach the
+        state s; s is the new state, i.e. a triplet (b, p, st) where
+        b is the new board after the action a has been played,
+        p is the player to play the next move and
+        st is the next step number.
+        """
+        board, player, step = state
+        for action in self.actions(state):
+            new_board = board.clone()
+            new_board.play_action(action)
+            next_player = player * -1
+            next_step = step + 1
+            new_state = (new_board, next_player, next_step)
+            yield((action,new_state))
+
+    def do_action(self, state, action):
+        """Play action on the board of state in place and return the new
+        state with the record needed by undo_action.
+        """
+        board, player, step = state
+        undo = self.mover(board).do_action(action)
+        return (board, player * -1, step + 1), undo
+
+    def undo_action(self, state, undo):
+        """Restore the board of state after do_action."""
+        self.mover(state[0]).undo_action(undo)
+
+    def mover(self, board):
+        """Return the object playing the actions on board in place:
+        self.keys or self.evaluator if they follow board, else board."""
+        if self.keys is not None and board is self.keys.board:
+            return self.keys
+        if self.is_evaluated(board):
+            return self.evaluator
+        return board
+
+    def track(self, state):
+        """Follow the board of state with self.evaluator and self.keys
+        while actions are played in place on it.
+
+        The leaves evaluated in batches are evaluated from scratch, so the
+        incremental evaluation would only slow the search down then.
+        """
+        board = state[0]
+        self.evaluator = None
+        if batchevaluation is None:
+            self.evaluator = IncrementalEvaluator(board, *self.weights())
+        self.keys = None
+        if self.SYMMETRIC:
+            self.keys = SymmetricKeys(board, player=self.evaluator)
+
+    def is_evaluated(self, board):
+        """Return whether the score of board is kept up to date by
+        self.evaluator."""
+        return self.evaluator is not None and board is self.evaluator.board
+
+    def hash(self, state):
+        """Return the Zobrist key of the board of state, the same for all
+        its symmetric images if SYMMETRIC is set."""
+        if self.keys is not None and state[0] is self.keys.board:
+            return self.keys.canonical_key()
+        return state[0].zobrist_key
 
+    def table_action(self, state, action):
+        """Return the image of action in the orientation of the key given by
+        hash, under which the transposition table stores it."""
+        if self.keys is not None and state[0] is self.keys.board:
+            return transform_action(action, self.keys.canonical_transform(),
+                                    state[0].columns)
+        return action
 
+    def state_action(self, state, action):
+        """Return the action of state for an action of the table, the
+        inverse of table_action."""
+        if self.keys is not None and state[0] is self.keys.board:
+            return transform_action(action,
+                                    self.keys.canonical_transform(True),
+                                    state[0].columns)
+        return action
 
     def cutoff(self, state, depth):
         """The cutoff function returns true if the alpha-beta/minimax
         search has to stop; false otherwise.
-        """
-        board, player, step = state
-        # first, let's check if the game is finished before computing some things
-        if board.is_finished():
-            return True
-
-        self.compute_max_depth(step, self.time_left, time.time() - self.init_time, self.previous_step_time, self.total_time)
 
-        if depth >= int(self.max_depth):
-            return True
-        return False
+        The depth is limited by the iterative deepening of minimax.search.
+        """
+        return state[0].is_finished()
 
-    def compute_max_depth(self, step, time_left, elapsed_time, previous_step_time, total_time):
-        if time_left - elapsed_time <= 10:
-            self.max_depth = 1
-        else:
-            if step <= 6 or step >= 30:
-                self.max_depth = 1
-            else:
-                middle_step = 18
-                distance_with_middle_step = abs(step - middle_step)
-                super_height = middle_step - distance_with_middle_step
-                factor = super_height / 24 # 24 because : 30 - 6; 30 = upper value for depth > 1; 6 = lower value for depth > 1;
-                self.max_depth = (((total_time/30) * factor) % (time_left - elapsed_time))
-                if self.max_depth >= 5:
-                    self.max_depth = (self.max_depth%4) + 1 # never exceed a depth of 4
+    def weights(self):
+        """Return the weights given to get_pimped_score."""
+        return (self.WEIGHT_TOWER_FIVE_PLAYER1, self.WEIGHT_TOWER_FIVE_PLAYER2,
+                self.WEIGHT_TOWER__PLAYER1, self.WEIGHT_TOWER__PLAYER2,
+                self.WEIGHT_TOWER_FOUR_PLAYER1, self.WEIGHT_TOWER_FOUR_PLAYER2,
+                self.WEIGHT_CAST_AWAY_PLAYER1, self.WEIGHT_CAST_AWAY_PLAYER2,
+                self.WEIGHT_DONT_DO_THAT)
 
     def evaluate(self, state):
         """The evaluate function must return an integer value
         representing the utility function of the board.
         """
-        score = state[0].get_pimped_score(self.WEIGHT_TOWER_FIVE_PLAYER1, self.WEIGHT_TOWER_FIVE_PLAYER2,
-                                          self.WEIGHT_TOWER__PLAYER1,
-                                          self.WEIGHT_TOWER__PLAYER2, self.WEIGHT_TOWER_FOUR_PLAYER1,
-                                          self.WEIGHT_TOWER_FOUR_PLAYER2,
-                                          self.WEIGHT_CAST_AWAY_PLAYER1, self.WEIGHT_CAST_AWAY_PLAYER2,
-                                          self.WEIGHT_DONT_DO_THAT
-                                          )
+        if self.is_evaluated(state[0]):
+            return self.evaluator.get_score()
+        return state[0].get_pimped_score(*self.weights())
 
-        return score
+    def evaluate_successors(self, state, actions):
+        """Return the evaluations of the boards reached by playing each of
+        the actions on the board of state, computed all at once.
+        """
+        cells = batchevaluation.stack_successors(state[0], actions)
+        return batchevaluation.get_pimped_scores(cells, *self.weights()).tolist()
 
     def play(self, board, player, step, time_left):
         """This function is used to play a move according
@@ -147,18 +247,58 @@ class Agent:
         It must return an action representing the move the player
         will perform.
         """
-        print(int(self.max_depth))
-        if step <= 2:
-            self.total_time = time_left #we store the total time that we have to play
-            self.previous_step_time = 1
-        self.init_time = time.time() #we store the time at the beginning of our tour to use it in cutoff to know if we can continue to think or not
         self.time_left = time_left
-
-        new_board = avalam.Board(board.get_percepts(player == avalam.PLAYER2))  # We are always the positive player
+        new_board = avalam.Board(board.get_percepts(player == avalam.PLAYER2),  # We are always the positive player
+                                 seed=self.SEED)
+        if self.book is not None:
+            entry = self.book.lookup(new_board)
+            if entry is not None:
+                self.stats.reset()
+                return entry[0]
+        if self.timer.start_move(time_left, step, new_board) is None:
+            max_depth = self.UNTIMED_DEPTH
+        else:
+            max_depth = self.MAX_DEPTH
+        lost = False
+        sizes = [len(pattern)
+                 for pattern, origin in get_board_regions(new_board)[1]]
+        if sizes and sum(sizes) <= self.ENDGAME_TOWERS and \
+                max(sizes) <= self.ENDGAME_REGION:
+            deadline = None
+            if self.timer.budget is not None:
+                deadline = time.time() + self.ENDGAME_TIME * self.timer.budget
+            solved = self.endgame.solve(new_board, 1, self.ENDGAME_NODES,
+                                        deadline)
+            # a lost game is left to the search, as below
+            lost = solved is not None and solved[1] < 0
+            if solved is not None and solved[0] is not None and not lost:
+                self.stats.reset()
+                return solved[0]
+        if new_board.move_count <= self.SOLVER_MOVES and not lost:
+            if self.timer.budget is None:
+                solved = self.solver.solve(new_board, 1, self.SOLVER_NODES)
+            else:
+                solved = self.solver.solve(new_board, 1, deadline=time.time() +
+                                           self.SOLVER_TIME * self.timer.budget)
+            # when the game is lost, let the search hope for a mistake
+            if solved is not None and solved[0] != dfpn.LOSS:
+                self.stats.reset()
+                return solved[1]
         state = (new_board, player, step)
-        result = minimax.search(state, self)
-        self.previous_step_time = time.time() - self.init_time
-        return result
+        self.track(state)
+        batch = batchevaluation is not None
+        stats = self.stats if self.STATS else None
+        if self.pool is not None:
+            return self.pool.search(state, inplace=True, max_depth=max_depth,
+                                    time_manager=self.timer,
+                                    algorithm=self.ALGORITHM,
+                                    stats=stats, batch=batch)
+        self.ordering.new_move()
+        return minimax.search(state, self, inplace=True, table=self.table,
+                              max_depth=max_depth, time_manager=self.timer,
+                              ordering=self.ordering,
+                              algorithm=self.ALGORITHM, stats=stats,
+                              batch=batch)
 
 if __name__ == "__main__":
     avalam.agent_main(Agent())
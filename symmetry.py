@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Symmetries of Avalam positions.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+The rules only depend on which towers are adjacent, so a position and its
+image by any rotation or reflection of the grid are equivalent, whatever
+the holes of the board.  Swapping the colours of all the towers and the
+side to move negates the final score.
+
+"""
+
+from minimax import MIN_KEY
+
+
+# the 8 isometries of the plane as functions of (i, j), the last 4 exchange
+# the rows and the columns
+ISOMETRIES = [
+    lambda i, j: (i, j),
+    lambda i, j: (-i, -j),
+    lambda i, j: (-i, j),
+    lambda i, j: (i, -j),
+    lambda i, j: (j, i),
+    lambda i, j: (-j, -i),
+    lambda i, j: (j, -i),
+    lambda i, j: (-j, i),
+]
+
+_transforms = {}
+
+
+def get_transforms(rows, columns):
+    """Return the symmetries of a grid of the given dimensions.
+
+    Each symmetry is a permutation of the cells: a tuple t where t[c] is
+    the image of cell c = i * columns + j.  The identity comes first.  A
+    square grid has 8 symmetries, the others 4.
+
+    """
+    dims = (rows, columns)
+    if dims not in _transforms:
+        count = 8 if rows == columns else 4
+        transforms = []
+        for isometry in ISOMETRIES[:count]:
+            images = [isometry(i, j) for i in range(rows)
+                      for j in range(columns)]
+            i0 = min(i for i, j in images)
+            j0 = min(j for i, j in images)
+            transforms.append(tuple((i - i0) * columns + (j - j0)
+                                    for i, j in images))
+        _transforms[dims] = transforms
+    return _transforms[dims]
+
+
+def transform_action(action, transform, columns):
+    """Return the image of action by the symmetry transform."""
+    i1, j1, i2, j2 = action
+    c1, c2 = transform[i1 * columns + j1], transform[i2 * columns + j2]
+    return divmod(c1, columns) + divmod(c2, columns)
+
+
+def inverse(transform):
+    """Return the inverse of the symmetry transform."""
+    result = [0] * len(transform)
+    for c, image in enumerate(transform):
+        result[image] = c
+    return tuple(result)
+
+
+def get_keys(board, colours=False):
+    """Return the Zobrist keys of the images of board.
+
+    The result is the list of the (key, transform, sign) triplets for each
+    symmetry transform of get_transforms and sign 1, and also sign -1 (the
+    colours swapped) if colours is True.
+    """
+    mh = board.max_height
+    zobrist = board.zobrist_table
+    signs = (1, -1) if colours else (1,)
+    keys = []
+    for sign in signs:
+        for transform in get_transforms(board.rows, board.columns):
+            key = 0
+            for i, j, x in board.get_towers():
+                key ^= zobrist[transform[i * board.columns + j]][
+                    sign * x + mh]
+            keys.append((key, transform, sign))
+    return keys
+
+
+def canonical_key(board, side=1, colours=False):
+    """Return the canonical key of board with side to move.
+
+    This is the smallest key over the images of the position, so that all
+    the equivalent positions have the same key.  If colours is True, the
+    images with the colours swapped are included (they have the other side
+    to move); the result is then only meaningful for values that are
+    negated with the colours, such as the final score.
+
+    Return the triplet (key, transform, sign): the image of board by
+    transform, with the colours multiplied by sign, has the key.
+    """
+    return min((key ^ (MIN_KEY if side * sign < 0 else 0), transform, sign)
+               for key, transform, sign in get_keys(board, colours))
+
+
+class SymmetricKeys:
+
+    """Keep the keys of the images of a board up to date while actions are
+    played.
+
+    The actions must be played through do_action/undo_action (or
+    play_action) of this object.  They are forwarded to player, which is the
+    board itself or an object wrapping it with the same methods (such as
+    evaluation.IncrementalEvaluator).
+
+    """
+
+    def __init__(self, board, colours=False, player=None):
+        """Track the images of board (see get_keys)."""
+        self.board = board
+        self.player = player if player is not None else board
+        self.colours = colours
+        self.images = get_keys(board, colours)
+        self.inverses = [inverse(transform)
+                         for key, transform, sign in self.images]
+        self.keys = [key for key, transform, sign in self.images]
+
+    def do_action(self, action):
+        """Play action and return the record to undo it."""
+        board = self.board
+        i1, j1, i2, j2 = action
+        x1 = board.m[i1][j1]
+        x2 = board.m[i2][j2]
+        undo = self.player.do_action(action)
+        keys = self.keys[:]
+        h = abs(x1) + abs(x2)
+        x = -h if x1 < 0 else h
+        mh = board.max_height
+        zobrist = board.zobrist_table
+        c1 = i1 * board.columns + j1
+        c2 = i2 * board.columns + j2
+        for k, (key, transform, sign) in enumerate(self.images):
+            t1 = zobrist[transform[c1]]
+            t2 = zobrist[transform[c2]]
+            self.keys[k] ^= t1[sign * x1 + mh] ^ t2[sign * x2 + mh] ^ \
+                t2[sign * x + mh]
+        return (undo, keys)
+
+    def undo_action(self, record):
+        """Undo the action whose record was returned by do_action."""
+        undo, self.keys = record
+        self.player.undo_action(undo)
+
+    def play_action(self, action):
+        """Play action on the board for good.  Return self."""
+        self.do_action(action)
+        return self
+
+    def canonical_key(self, side=1):
+        """Return the key of canonical_key(self.board, side, colours)."""
+        if side > 0 and not self.colours:
+            return min(self.keys)
+        return min(key ^ (MIN_KEY if side * image[2] < 0 else 0)
+                   for key, image in zip(self.keys, self.images))
+
+    def canonical_transform(self, back=False):
+        """Return the transform of the image of the board having the key of
+        canonical_key() (colours not swapped), or its inverse if back is
+        True."""
+        k = self.keys.index(min(self.keys))
+        return self.inverses[k] if back else self.images[k][1]
+
+
+def canonical_pattern(pattern):
+    """Return the canonical form of a pattern of towers.
+
+    A pattern is a sorted tuple of (i, j, height) triplets whose smallest
+    row and column are 0 (see endgame.split_regions).  The canonical form
+    is the smallest of the images of the pattern by the 8 isometries.
+    """
+    best = pattern
+    for isometry in ISOMETRIES[1:]:
+        images = [isometry(i, j) + (x,) for i, j, x in pattern]
+        i0 = min(i for i, j, x in images)
+        j0 = min(j for i, j, x in images)
+        image = tuple(sorted((i - i0, j - j0, x) for i, j, x in images))
+        if image < best:
+            best = image
+    return best
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of agentworker.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import io
+import math
+import struct
+
+import pytest
+
+import agentworker
+import game
+from agentworker import READY, REPLY, REQUEST, AgentProcess, WorkerError, \
+    WorkerTimeout
+from avalam import Board
+from testgames import RANDOM_AGENT
+
+MOODY_AGENT = '''
+import time
+from avalam import Board
+
+
+class Agent:
+
+    def __init__(self, name):
+        self.name = name
+
+    def play(self, board, player, step, time_left):
+        if step == 2:
+            raise ValueError("no move at step 2")
+        if step == 3:
+            time.sleep(60)
+        return next(Board(board.get_percepts()).get_actions("natural"))
+'''
+
+
+def request(kind, board, player=1, step=1, time_left=None):
+    return REQUEST.pack(kind, player, step,
+                        math.nan if time_left is None else time_left,
+                        board.rows, board.columns, board.max_height) + \
+        struct.pack("%db" % (board.rows * board.columns),
+                    *[x for row in board.m for x in row])
+
+
+def test_serve():
+    board = Board()
+    fin = io.BytesIO(request(b"I", board) + request(b"P", board) +
+                     REQUEST.pack(b"Q", 0, 0, 0, 0, 0, 0) +
+                     request(b"P", board))
+    fout = io.BytesIO()
+    agentworker.serve(RANDOM_AGENT, "Random", fin, fout)
+    data = fout.getvalue()
+    assert data[:len(READY)] == READY
+    replies = list(REPLY.iter_unpack(data[len(READY):]))
+    # the request after b"Q" is not answered
+    assert len(replies) == 2
+    for kind, i1, j1, i2, j2, wall, cpu, length in replies:
+        assert kind == b"A" and length == 0 and wall >= 0 and cpu >= 0
+    assert board.is_action_valid(replies[1][1:5])
+
+
+def test_agent_process(tmp_path):
+    path = tmp_path / "moody_agent.py"
+    path.write_text(MOODY_AGENT)
+    agent = AgentProcess(str(path), "Moody", margin=0.2)
+    try:
+        board = Board()
+        agent.initialize(board, [1], None)
+        assert agent.play(board, 1, 1, 10.0) == \
+            next(board.get_actions("natural"))
+        wall, cpu = agent.measured
+        assert 0 <= wall < 10 and 0 <= cpu < 10
+        with pytest.raises(WorkerError, match="no move at step 2"):
+            agent.play(board, 1, 2, None)
+        # the worker goes on after an exception of the agent
+        agent.play(board, 1, 1, None)
+        with pytest.raises(WorkerTimeout):
+            agent.play(board, 1, 3, 0.1)
+        assert agent.process.poll() is not None
+        with pytest.raises(WorkerError):
+            agent.play(board, 1, 1, None)
+    finally:
+        agent.close()
+
+
+def test_game_with_workers():
+    agents = [AgentProcess(RANDOM_AGENT, "Player %d" % k) for k in (1, 2)]
+    try:
+        g = game.Game(agents, Board(), None, [60.0, 60.0])
+        g.play()
+        assert g.trace.reason == ""
+        assert g.trace.actions
+        assert all(t < 60.0 for player, action, t in g.trace.actions)
+    finally:
+        for agent in agents:
+            agent.close()
+        assert all(a.process.poll() is not None for a in agents)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of avalam.Board.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import random
+
+import pytest
+
+from avalam import Board, InvalidAction, get_adjacency_table, \
+    get_compatibility_table
+from testgames import check_do_undo, random_games
+
+
+def test_do_undo():
+    for boards in random_games():
+        rng = random.Random(len(boards))
+        for board in boards:
+            check_do_undo(board, rng)
+    board = Board()
+    with pytest.raises(InvalidAction):
+        board.do_action((0, 0, 0, 1))
+
+
+def test_zobrist_key():
+    keys = {}
+    for boards in random_games():
+        for board in boards:
+            fresh = Board(board.get_percepts())
+            assert board.zobrist_key == fresh.zobrist_key
+            position = str(board)
+            assert keys.setdefault(board.zobrist_key, position) == position
+    assert Board().zobrist_key != Board(invert=True).zobrist_key
+
+
+def test_move_counts():
+    for boards in random_games():
+        for board in boards:
+            fresh = Board(board.get_percepts())
+            assert board.moves == fresh.moves
+            assert board.move_count == len(list(board.get_actions()))
+            assert board.is_finished() == (board.move_count == 0)
+
+
+def test_action_validity():
+    for boards in random_games(3):
+        for board in boards:
+            actions = set(board.get_actions("natural"))
+            for i1 in range(-1, board.rows + 1):
+                for j1 in range(-1, board.columns + 1):
+                    for i2 in range(i1 - 2, i1 + 3):
+                        for j2 in range(j1 - 2, j1 + 3):
+                            action = (i1, j1, i2, j2)
+                            assert board.is_action_valid(action) == \
+                                (action in actions)
+    # towers higher than max_height can't be moved, nor be moved onto
+    board = Board([[1, 1, 0], [0, 1, -1]])
+    board.m[0][0], board.m[1][2] = 7, -9
+    assert not board.is_action_valid((0, 0, 0, 1))
+    assert not board.is_action_valid((0, 1, 0, 0))
+    assert not board.is_action_valid((1, 1, 1, 2))
+    assert board.is_action_valid((0, 1, 1, 1))
+    for action in [None, (0, 1), "abcd", (0.5, 1, 1, 1)]:
+        assert not board.is_action_valid(action)
+
+
+def test_shared_tables():
+    assert Board().adjacency is Board(max_height=3).adjacency
+    assert Board().adjacency is get_adjacency_table(9, 9)
+    assert Board([[1, 1], [1, 1]]).adjacency == [
+        ((0, 1, 1), (1, 0, 2), (1, 1, 3)),
+        ((0, 0, 0), (1, 0, 2), (1, 1, 3)),
+        ((0, 0, 0), (0, 1, 1), (1, 1, 3)),
+        ((0, 0, 0), (0, 1, 1), (1, 0, 2))]
+    assert Board().compatible is get_compatibility_table(5)
+    table = get_compatibility_table(3)
+    assert table[1 + 3][-2 + 3] and not table[2 + 3][-2 + 3]
+    assert not table[0 + 3][1 + 3] and not table[1 + 3][0 + 3]
+
+
+def test_action_orders():
+    board = Board()
+    natural = list(board.get_actions("natural"))
+    assert sorted(board.get_actions()) == sorted(natural)
+    orders = [list(Board(seed=1).get_actions()) for _ in range(2)]
+    assert orders[0] == orders[1] != natural
+    assert sorted(orders[0]) == sorted(natural)
+    seeded = Board(seed=1)
+    clone = seeded.clone()
+    list(seeded.get_actions())
+    # the generator is shared: the clone goes on with the same sequence
+    assert list(clone.get_actions()) != orders[0]
+    board.seed(1)
+    assert list(board.get_actions()) == orders[0]
+    by_row = list(board.get_actions(lambda action: -action[0]))
+    assert by_row == sorted(natural, key=lambda action: action[0])
+    with pytest.raises(ValueError):
+        list(board.get_actions("sorted"))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of batchevaluation and of the batched search.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import random
+
+import pytest
+
+from avalam import Board
+from testgames import WEIGHTS, ParityGame, check_search, late_boards, \
+    pimped_score, random_games
+
+batchevaluation = pytest.importorskip("batchevaluation")
+
+
+class BatchGame(ParityGame):
+
+    """ParityGame evaluating the successors with batchevaluation."""
+
+    def evaluate_successors(self, state, actions):
+        cells = batchevaluation.stack_successors(state[0], actions)
+        return batchevaluation.get_pimped_scores(cells, *WEIGHTS).tolist()
+
+
+def test_scores():
+    for boards in random_games():
+        cells = batchevaluation.stack_boards(boards)
+        assert batchevaluation.get_scores(cells).tolist() == \
+            [board.get_score() for board in boards]
+        assert batchevaluation.get_pimped_scores(cells, *WEIGHTS).tolist() \
+            == [board.get_pimped_score(*WEIGHTS) for board in boards]
+
+
+def test_successors():
+    for board in late_boards(moves=60):
+        actions = list(board.get_actions("natural"))
+        cells = batchevaluation.stack_successors(board, actions)
+        assert cells.tolist() == \
+            [board.clone().play_action(action).m for action in actions]
+
+
+def test_other_max_height():
+    rng = random.Random(0)
+    for max_height in (3, 4, 6):
+        board = Board(max_height=max_height)
+        boards = [board.clone()]
+        while not board.is_finished():
+            board.play_action(rng.choice(list(board.get_actions("natural"))))
+            boards.append(board.clone())
+        cells = batchevaluation.stack_boards(boards)
+        assert batchevaluation.get_scores(cells, max_height).tolist() == \
+            [b.get_score() for b in boards]
+        assert batchevaluation.get_pimped_scores(
+            cells, *WEIGHTS, max_height=max_height).tolist() == \
+            [b.get_pimped_score(*WEIGHTS) for b in boards]
+
+
+def test_batched_search():
+    for board in late_boards(3, moves=40):
+        for options in ({"batch": True},
+                        {"batch": True, "inplace": True}):
+            check_search(board, 2, pimped_score, game=BatchGame, **options)
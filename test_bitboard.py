@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of bitboard.BitBoard against avalam.Board.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import pickle
+import random
+
+from avalam import Board
+from bitboard import BitBoard
+from testgames import WEIGHTS, check_do_undo, describe, random_games
+
+
+def test_same_as_board():
+    for boards in random_games():
+        rng = random.Random(len(boards))
+        for board in boards:
+            bitboard = BitBoard(board.get_percepts())
+            assert describe(bitboard) == describe(board)
+            assert list(bitboard.get_actions("natural")) == \
+                list(board.get_actions("natural"))
+            assert sorted(bitboard.get_actions("random")) == \
+                sorted(board.get_actions("natural"))
+            for i, j, x in board.get_towers():
+                assert bitboard.is_tower_movable(i, j) == \
+                    board.is_tower_movable(i, j)
+                assert list(bitboard.get_tower_actions(i, j)) == \
+                    list(board.get_tower_actions(i, j))
+            check_do_undo(bitboard, rng)
+
+
+def test_play_whole_game():
+    for boards in random_games(3):
+        bitboard = BitBoard()
+        undos = []
+        for before, after in zip(boards, boards[1:]):
+            action = next(a for a in before.get_actions("natural")
+                          if before.clone().play_action(a).m == after.m)
+            undos.append(bitboard.do_action(action))
+            assert describe(bitboard) == describe(after)
+        for undo in reversed(undos):
+            bitboard.undo_action(undo)
+        assert describe(bitboard) == describe(boards[0])
+
+
+def test_other_max_height():
+    rng = random.Random(0)
+    for max_height in (3, 4, 6):
+        board = Board(max_height=max_height)
+        bitboard = BitBoard(max_height=max_height)
+        while not board.is_finished():
+            assert bitboard.get_pimped_score(*WEIGHTS) == \
+                board.get_pimped_score(*WEIGHTS)
+            action = rng.choice(list(board.get_actions("natural")))
+            board.play_action(action)
+            bitboard.play_action(action)
+        assert bitboard.is_finished()
+
+
+def test_pickle_and_invalid_actions():
+    bitboard = BitBoard(invert=True)
+    copy = pickle.loads(pickle.dumps(bitboard))
+    assert describe(copy) == describe(bitboard)
+    assert copy.get_percepts() == Board(invert=True).get_percepts()
+    for action in [(0, 0, 0, 1), (0, 2, 0, 4), (0, 2, -1, 2), None,
+                   (0, 2, 9, 9)]:
+        assert not bitboard.is_action_valid(action)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of book.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import math
+
+import pytest
+
+from avalam import Board
+from book import HEADER, InvalidBook, OpeningBook, book_key, build_book, \
+    write_book
+from symmetry import get_transforms, inverse, transform_action
+from testgames import image, late_boards
+
+
+class FirstAction:
+
+    """Agent playing the first action, every position being worth 0."""
+
+    def play(self, board, player, step, time_left):
+        return next(board.get_actions("natural"))
+
+    def evaluate(self, state):
+        return 0
+
+
+def test_write_and_lookup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    boards = list(late_boards(moves=60))
+    entries = {}
+    for board in boards:
+        key, transform = book_key(board)
+        action = next(board.get_actions("natural"))
+        entries[key] = (transform_action(action, transform, board.columns),
+                        len(entries))
+    write_book(path, entries)
+    book = OpeningBook(path)
+    try:
+        assert len(book) == len(entries)
+        assert [key for key, action, value in book.items()] == \
+            sorted(entries)
+        for value, board in enumerate(boards):
+            action = next(board.get_actions("natural"))
+            assert book.lookup(board) == (action, value)
+            for transform in get_transforms(board.rows, board.columns):
+                other = image(board, transform)
+                moved = transform_action(action, transform, board.columns)
+                found, v = book.lookup(other)
+                assert v == value
+                assert other.clone().play_action(found).m == \
+                    other.clone().play_action(moved).m
+        assert book.lookup(Board()) is None
+    finally:
+        book.close()
+
+
+def test_invalid_books(tmp_path):
+    path = tmp_path / "book.bin"
+    for data in (b"", b"AVBK", HEADER.pack(b"AVBX", 1, 16, 0),
+                 HEADER.pack(b"AVBK", 1, 16, 3)):
+        path.write_bytes(data)
+        with pytest.raises(InvalidBook):
+            OpeningBook(str(path))
+
+
+def test_build_book():
+    entries = build_book(FirstAction(), 3)
+    board = Board()
+    key, transform = book_key(board)
+    action, value = entries[key]
+    assert math.isnan(value)
+    assert board.is_action_valid(transform_action(
+        action, inverse(transform), board.columns))
+    # the entries are kept, and completed by another call
+    assert build_book(FirstAction(), 3, 2, dict(entries)).keys() >= \
+        entries.keys()
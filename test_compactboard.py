@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of compactboard.CompactBoard against avalam.Board.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import pickle
+import random
+
+from avalam import Board
+from compactboard import CompactBoard
+from testgames import WEIGHTS, check_do_undo, describe, random_games
+
+
+def test_same_as_board():
+    for boards in random_games():
+        rng = random.Random(len(boards))
+        for board in boards:
+            compact = CompactBoard(board.get_percepts())
+            assert describe(compact) == describe(board)
+            assert list(compact.moves) == board.moves
+            assert compact.move_count == board.move_count
+            assert list(compact.get_actions("natural")) == \
+                list(board.get_actions("natural"))
+            assert list(compact.get_towers()) == list(board.get_towers())
+            check_do_undo(compact, rng)
+
+
+def test_play_whole_game():
+    for boards in random_games(3):
+        compact = CompactBoard()
+        undos = []
+        for before, after in zip(boards, boards[1:]):
+            action = next(a for a in before.get_actions("natural")
+                          if before.clone().play_action(a).m == after.m)
+            undos.append(compact.do_action(action))
+            assert describe(compact) == describe(after)
+            assert compact.move_count == after.move_count
+        for undo in reversed(undos):
+            compact.undo_action(undo)
+        assert describe(compact) == describe(boards[0])
+
+
+def test_other_max_height():
+    rng = random.Random(0)
+    for max_height in (3, 4, 6):
+        board = Board(max_height=max_height)
+        compact = CompactBoard(max_height=max_height)
+        while not board.is_finished():
+            assert compact.get_pimped_score(*WEIGHTS) == \
+                board.get_pimped_score(*WEIGHTS)
+            assert compact.is_finished() is False
+            action = rng.choice(list(board.get_actions("natural")))
+            board.play_action(action)
+            compact.play_action(action)
+        assert compact.is_finished()
+        assert compact.get_score() == board.get_score()
+
+
+def test_clone_and_pickle():
+    compact = CompactBoard(invert=True)
+    clone = compact.clone()
+    clone.play_action(next(clone.get_actions("natural")))
+    assert describe(compact) == describe(CompactBoard(invert=True))
+    copy = pickle.loads(pickle.dumps(compact))
+    assert describe(copy) == describe(compact)
+    assert copy.get_percepts() == Board(invert=True).get_percepts()
+    for action in [(0, 0, 0, 1), (0, 2, 0, 4), (0, 2, -1, 2), None,
+                   (0, 2, 9, 9)]:
+        assert not compact.is_action_valid(action)
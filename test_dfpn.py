@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of dfpn.DfpnSolver.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+from avalam import Board
+from bitboard import BitBoard
+from compactboard import CompactBoard
+from dfpn import DfpnSolver, WIN, DRAW, LOSS
+from testgames import brute_force, describe, endgames, random_games
+
+
+def result(value):
+    return WIN if value > 0 else LOSS if value < 0 else DRAW
+
+
+def test_solve_and_best_score():
+    solver = DfpnSolver()
+    for board in endgames():
+        for side in (1, -1):
+            value = brute_force(board, side)
+            for engine in (Board, BitBoard, CompactBoard):
+                other = engine(board.get_percepts())
+                score, action = solver.best_score(other, side)
+                assert score == value
+                assert brute_force(board.clone().play_action(action),
+                                   -side) == value
+                r, action = solver.solve(other, side)
+                assert r == result(value)
+                assert result(brute_force(board.clone().play_action(action),
+                                          -side)) == r
+                assert describe(other) == describe(board)
+
+
+def test_prove():
+    solver = DfpnSolver()
+    for board in endgames(3):
+        value = brute_force(board, 1)
+        assert solver.prove(board, 1, value)
+        assert not solver.prove(board, 1, value + 1)
+
+
+def test_finished_and_budget():
+    solver = DfpnSolver()
+    boards = next(random_games(1))
+    score = boards[-1].get_score()
+    assert solver.best_score(boards[-1]) == (score, None)
+    assert solver.solve(boards[-1]) == (result(score), None)
+    assert solver.solve(boards[len(boards) // 2], max_nodes=10) is None
+    assert solver.best_score(boards[0], deadline=0) is None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of endgame.EndgameSolver.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+from avalam import Board
+from bitboard import BitBoard
+from compactboard import CompactBoard
+from endgame import EndgameSolver, region_size
+from testgames import brute_force, describe, endgames, random_games
+
+
+def test_solve():
+    solver = EndgameSolver()
+    for board in endgames():
+        value = brute_force(board, 1)
+        for engine in (Board, BitBoard, CompactBoard):
+            other = engine(board.get_percepts())
+            action, v = solver.solve(other, 1)
+            assert v == value
+            assert brute_force(board.clone().play_action(action), -1) == value
+            assert describe(other) == describe(board)
+        # the other player to move
+        action, v = solver.solve(board, -1)
+        assert v == brute_force(board, -1)
+        assert brute_force(board.clone().play_action(action), 1) == v
+
+
+def test_finished_and_budget():
+    solver = EndgameSolver()
+    boards = next(random_games(1))
+    assert solver.solve(boards[-1]) == (None, boards[-1].get_score())
+    assert region_size(boards[-1]) == 0
+    assert solver.solve(boards[len(boards) // 2], max_nodes=10) is None
+    assert solver.solve(boards[0], deadline=0) is None
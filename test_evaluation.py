@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of evaluation.IncrementalEvaluator.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import random
+
+from avalam import Board
+from bitboard import BitBoard
+from evaluation import IncrementalEvaluator
+from testgames import WEIGHTS, random_games
+
+
+def test_incremental_score():
+    for boards in random_games():
+        for engine in (Board, BitBoard):
+            rng = random.Random(len(boards))
+            board = engine(boards[0].get_percepts())
+            evaluator = IncrementalEvaluator(board, *WEIGHTS)
+            while not board.is_finished():
+                score = board.get_pimped_score(*WEIGHTS)
+                assert evaluator.get_score() == score
+                actions = list(board.get_actions("natural"))
+                for action in rng.sample(actions, min(len(actions), 3)):
+                    record = evaluator.do_action(action)
+                    assert evaluator.get_score() == \
+                        board.get_pimped_score(*WEIGHTS)
+                    evaluator.undo_action(record)
+                    assert evaluator.get_score() == score
+                assert evaluator.play_action(rng.choice(actions)) \
+                    is evaluator
+            assert evaluator.get_score() == board.get_pimped_score(*WEIGHTS)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of game.Game.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import threading
+from xmlrpc.server import SimpleXMLRPCServer
+
+import game
+from avalam import Board
+from testgames import FirstAction
+
+
+class Recorder(game.Viewer):
+
+    """Viewer keeping the result of the game."""
+
+    def finished(self, steps, winner, reason=""):
+        self.winner = winner
+        self.reason = reason
+
+
+class FailingInitialize(FirstAction):
+
+    def initialize(self, percepts, players, time_left):
+        raise RuntimeError("cannot start")
+
+
+class PlainBoard:
+
+    """Board stand-in whose clone can be marshalled over XML-RPC."""
+
+    def clone(self):
+        return [[0]]
+
+
+def play(agents):
+    viewer = Recorder()
+    game.Game(agents, Board(), viewer, [None, None]).play()
+    return viewer
+
+
+def test_failing_initialize():
+    for loser in (0, 1):
+        agents = [FirstAction(), FirstAction()]
+        agents[loser] = FailingInitialize()
+        viewer = play(agents)
+        assert viewer.winner == (-1 if loser == 0 else 1)
+        assert viewer.reason == "Opponent has played an invalid action."
+
+
+def test_remote_without_initialize():
+    server = SimpleXMLRPCServer(("127.0.0.1", 0), logRequests=False,
+                                allow_none=True)
+    server.register_function(lambda *args: None, "play")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        proxy = game.connect_agent("http://127.0.0.1:%d" %
+                                   server.server_address[1])
+        g = game.Game([proxy, FirstAction()], Board(), Recorder(),
+                      [10.0, 10.0])
+        g.board = PlainBoard()
+        g.initialize_agent(1)
+        assert g.credits[0] > 9.0
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of minimax.search against a brute-force minimax.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import gc
+import time
+
+import pytest
+
+import minimax
+from avalam import Board
+from ordering import MoveOrdering
+from testgames import ParityGame, brute_force, check_search, describe, \
+    late_boards, pimped_score
+from transposition import TranspositionTable
+
+
+def check_variants(*variants):
+    """Run check_search with each dictionary of options of variants, until
+    the end of late games and to depth 2 in the middle of games."""
+    for board in late_boards(moves=10):
+        for options in variants:
+            check_search(board, None, Board.get_score, **options)
+    for board in late_boards(3, moves=40):
+        for options in variants:
+            check_search(board, 2, pimped_score, **options)
+
+
+def test_inplace():
+    check_variants({}, {"inplace": True}, {"prune": False})
+
+
+def test_table():
+    table = TranspositionTable(1 << 16)
+    check_variants({"table": table}, {"table": table, "inplace": True})
+    assert table.hits > 0
+
+
+def test_iterative_deepening():
+    deadline = time.time() + 3600
+    check_variants({"deadline": deadline},
+                   {"deadline": deadline, "inplace": True,
+                    "table": TranspositionTable(1 << 16)})
+
+
+def test_expired_deadline():
+    board = Board()
+    for inplace in (False, True):
+        action = minimax.search((board, 1), ParityGame(pimped_score),
+                                inplace=inplace, deadline=time.time() - 1)
+        assert action == next(board.get_actions("natural"))
+
+
+def test_ordering():
+    check_variants({"ordering": MoveOrdering()},
+                   {"ordering": MoveOrdering(), "inplace": True,
+                    "table": TranspositionTable(1 << 16)})
+
+
+def test_pvs():
+    check_variants({"algorithm": "pvs"},
+                   {"algorithm": "pvs", "inplace": True,
+                    "table": TranspositionTable(1 << 16),
+                    "ordering": MoveOrdering()},
+                   {"algorithm": "pvs", "deadline": time.time() + 3600,
+                    "table": TranspositionTable(1 << 16)})
+    with pytest.raises(ValueError):
+        minimax.search((Board(), 1), ParityGame(pimped_score),
+                       algorithm="mtdf")
+
+
+def test_stats():
+    for board in late_boards(3, moves=40):
+        cache = {}
+        best = max(brute_force(board.clone().play_action(action), -1, 1,
+                               pimped_score, cache)
+                   for action in board.get_actions("natural"))
+        for options in ({}, {"deadline": time.time() + 3600,
+                             "table": TranspositionTable(1 << 16)}):
+            stats = minimax.SearchStats()
+            action = minimax.search((board.clone(), 1),
+                                    ParityGame(pimped_score), max_depth=2,
+                                    stats=stats, **options)
+            assert stats.pv[0] == action
+            assert stats.value == best
+            assert stats.depth() == 2
+            assert stats.leaves > 0 and stats.cutoffs > 0
+            assert sum(stats.cutoff_index) == stats.cutoffs
+            assert stats.elapsed > 0
+            depths = [depth for depth, nodes, seconds in stats.iterations]
+            assert depths == ([1, 2] if options else [2])
+            if options:
+                assert 0 < stats.table_hits <= stats.table_probes
+            str(stats)
+
+
+def test_stats_merge():
+    stats, other = minimax.SearchStats(), minimax.SearchStats()
+    stats.nodes, stats.leaves = [1, 2], 3
+    other.nodes, other.cutoff_index, other.leaves = [1, 4, 8], [5], 7
+    stats.merge(other)
+    assert stats.nodes == [2, 6, 8]
+    assert stats.cutoff_index == [5]
+    assert stats.leaves == 10
+    stats.reset()
+    assert stats.total_nodes() == 0 and stats.value is None
+
+
+def test_search_pool():
+    game = ParityGame(pimped_score)
+    pool = minimax.SearchPool(game, 2, table_size=1 << 16)
+    try:
+        for board in late_boards(3, moves=40):
+            cache = {}
+            values = {action: brute_force(board.clone().play_action(action),
+                                          -1, 1, pimped_score, cache)
+                      for action in board.get_actions("natural")}
+            for options in ({}, {"inplace": True},
+                            {"deadline": time.time() + 3600}):
+                state = (board.clone(), 1)
+                action = pool.search(state, max_depth=2, **options)
+                assert values[action] == max(values.values()), options
+                assert describe(state[0]) == describe(board)
+    finally:
+        pool.close()
+
+
+def test_search_pool_collected():
+    pool = minimax.SearchPool(ParityGame(pimped_score), 2)
+    workers = list(pool.pool._pool)
+    del pool
+    gc.collect()
+    for worker in workers:
+        worker.join(10)
+        assert not worker.is_alive()
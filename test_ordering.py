@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of ordering.MoveOrdering.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from ordering import MoveOrdering
+
+
+ACTIONS = ["a", "b", "c", "d"]
+
+
+def test_history():
+    ordering = MoveOrdering()
+    assert ordering.order(ACTIONS, 0) == ACTIONS
+    ordering.cutoff("c", 5, 1)
+    ordering.cutoff("d", 5, 3)
+    ordering.cutoff("c", 6, 2)
+    # history scores: d 9, c 1 + 4
+    assert ordering.order(ACTIONS, 0) == ["d", "c", "a", "b"]
+    ordering.new_search()
+    assert ordering.history == {"c": 2, "d": 4}
+
+
+def test_killers():
+    ordering = MoveOrdering(killers=2)
+    for action in ("a", "b", "c"):
+        ordering.cutoff(action, 2, 1)
+    # the last two killers of depth 2 come first, most recent first
+    assert ordering.order(ACTIONS, 2)[:2] == ["c", "b"]
+    assert ordering.order(["a", "b"], 2) == ["b", "a"]
+    ordering.new_search()
+    assert ordering.order(ACTIONS, 2)[:2] == ["c", "b"]
+    ordering.new_move()
+    assert ordering.killers == {}
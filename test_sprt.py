@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of sprt.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import shutil
+
+import pytest
+
+import sprt
+from testgames import RANDOM_AGENT
+
+
+def test_elo():
+    assert sprt.elo_to_score(0) == 0.5
+    for elo in (-300, -10, 0, 35, 400):
+        assert sprt.score_to_elo(sprt.elo_to_score(elo)) == \
+            pytest.approx(elo)
+    assert sprt.score_to_elo(1.0) > 2000
+
+
+def test_decisions():
+    for args in ((10, 0), (0, 10, 0, 0.05), (0, 10, 0.05, 1)):
+        with pytest.raises(ValueError):
+            sprt.SPRT(*args)
+    test = sprt.SPRT()
+    assert test.llr() == 0 and test.status() is None
+    while test.status() is None:
+        test.add(1)
+        test.add(0.5)
+    assert test.status() == "H1" and test.llr() >= test.upper
+    elo, low, high = test.elo()
+    assert low < elo < high and elo > 0
+    test = sprt.SPRT(-10, 10)
+    for points in (0, 0, 0.5, 1, 0) * 40:
+        test.add(points)
+    assert test.status() == "H0"
+    assert "200 games (+40 =40 -120)" in str(test)
+
+
+def test_run_match(tmp_path):
+    with pytest.raises(ValueError):
+        sprt.run_match(RANDOM_AGENT, RANDOM_AGENT, sprt.SPRT())
+    other = str(tmp_path / "other_agent.py")
+    shutil.copy(RANDOM_AGENT, other)
+    results = []
+    test = sprt.SPRT(-400, 400)
+    status = sprt.run_match(RANDOM_AGENT, other, test, max_games=6,
+                            processes=2, seed=3, callback=results.append)
+    assert test.games() == len(results) <= 6
+    assert status == test.status()
+    if status is None:
+        assert len(results) == 6
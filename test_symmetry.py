@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of symmetry and of the symmetric transposition table entries.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import random
+
+import super_agent
+from avalam import Board
+from symmetry import SymmetricKeys, canonical_key, get_transforms, \
+    inverse, transform_action
+from testgames import image, late_boards, random_games
+
+
+def test_canonical_keys():
+    for boards in random_games(3):
+        rng = random.Random(len(boards))
+        board = Board(boards[0].get_percepts())
+        keys = SymmetricKeys(board, colours=True)
+        while not board.is_finished():
+            key = canonical_key(board)[0]
+            assert SymmetricKeys(board).canonical_key() == key
+            assert keys.canonical_key() == canonical_key(board, 1, True)[0]
+            assert keys.canonical_key(-1) == \
+                canonical_key(board, -1, True)[0]
+            for transform in get_transforms(board.rows, board.columns):
+                assert canonical_key(image(board, transform))[0] == key
+                assert canonical_key(image(board, transform, -1), -1,
+                                     True)[0] == \
+                    canonical_key(board, 1, True)[0]
+            actions = list(board.get_actions("natural"))
+            keys.undo_action(keys.do_action(actions[0]))
+            keys.play_action(rng.choice(actions))
+
+
+def test_canonical_transform():
+    for board in late_boards(moves=60):
+        keys = SymmetricKeys(board)
+        transform = keys.canonical_transform()
+        assert keys.canonical_transform(True) == inverse(transform)
+        canonical = image(board, transform)
+        assert canonical.zobrist_key == keys.canonical_key()
+        for action in board.get_actions("natural"):
+            moved = transform_action(action, transform, board.columns)
+            assert transform_action(moved, inverse(transform),
+                                    board.columns) == action
+            assert canonical.clone().play_action(moved).m == \
+                image(board.clone().play_action(action), transform).m
+
+
+def test_table_actions():
+    agent = super_agent.Agent()
+    agent.SYMMETRIC = True
+    for board in late_boards(3, moves=60):
+        for transform in get_transforms(board.rows, board.columns):
+            other = image(board, transform)
+            states = [(board.clone(), 1), (other, 1)]
+            for state in states:
+                agent.track(state)
+                assert agent.hash(state) == canonical_key(state[0])[0]
+            for action in board.get_actions("natural"):
+                moved = transform_action(action, transform, board.columns)
+                entries = []
+                for state, a in zip(states, (action, moved)):
+                    agent.track(state)
+                    entry = agent.table_action(state, a)
+                    assert agent.state_action(state, entry) == a
+                    entries.append(entry)
+                # both images store the same entry for the same move
+                assert entries[0] == entries[1]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of timemanager.TimeManager.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from avalam import Board
+from testgames import random_games
+from timemanager import TimeManager
+
+
+def test_untimed():
+    timer = TimeManager()
+    assert timer.start_move(None, 1, Board()) is None
+    assert timer.budget is None
+    assert timer.should_deepen()
+
+
+def test_budget():
+    boards = next(random_games(1))
+    timer = TimeManager(reserve=1.0, max_fraction=0.3)
+    budgets = []
+    for step, board in enumerate(boards[:-1], 1):
+        deadline = timer.start_move(100.0, step, board)
+        assert 0 < timer.budget <= deadline - timer.start <= 99 * 0.3 + 1e-6
+        budgets.append(timer.budget)
+    # fewer movable towers, fewer moves left: more time per move
+    assert budgets[-1] > budgets[0]
+    assert timer.start_move(0.5, 1, Board()) == timer.start
+
+
+def test_deepening():
+    timer = TimeManager(ebf=4.0, smoothing=0.5)
+    timer.start_move(100.0, 1, Board())
+    assert timer.should_deepen()
+    timer.iteration_done(1, 0.01)
+    timer.iteration_done(2, 0.08)
+    assert timer.ebf == 6.0
+    assert timer.predict_next() == 0.08 * 6.0
+    timer.iteration_done(3, 100.0)
+    assert not timer.should_deepen()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of tournament.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import pytest
+
+import tournament
+from testgames import RANDOM_AGENT
+
+
+def test_schedule():
+    assert tournament.schedule("abc", 2) == [
+        ("a", "b"), ("a", "c"), ("b", "c"),
+        ("b", "a"), ("c", "a"), ("c", "b")]
+    assert tournament.schedule("abc", 3, "gauntlet") == [
+        ("a", "b"), ("a", "c"), ("b", "a"), ("c", "a"),
+        ("a", "b"), ("a", "c")]
+    with pytest.raises(ValueError):
+        tournament.schedule("abc", 1, "swiss")
+
+
+def moves(result):
+    return [(player, action) for player, action, t in result.trace.actions]
+
+
+def test_play_games():
+    games = tournament.schedule([RANDOM_AGENT, RANDOM_AGENT], 4)
+    runs = [sorted(tournament.play_games(games, processes=2, seed=7),
+                   key=moves)
+            for _ in range(2)]
+    for results in runs:
+        assert len(results) == len(games)
+        for result in results:
+            assert result.reason == ""
+            assert result.steps == sum(map(len, result.times))
+            assert result.points(0) + result.points(1) == 1
+    # the seeded games are played again identically
+    assert list(map(moves, runs[0])) == list(map(moves, runs[1]))
+    (agent, points, wins, draws, losses, played), = \
+        tournament.standings(runs[0])
+    assert agent == RANDOM_AGENT and played == 2 * len(games)
+    assert points == wins + draws / 2 == len(games)
+    assert "%d games" % len(games) in tournament.report(runs[0], 1.0, 2)
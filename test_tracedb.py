@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of tracedb.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import random
+
+import pytest
+
+from avalam import Board
+from game import Trace
+from tracedb import HEADER, InvalidDatabase, TraceDatabase, \
+    TraceDatabaseWriter
+
+
+def random_trace(seed):
+    """Return the trace of a random game and its successive boards."""
+    rng = random.Random(seed)
+    board = Board()
+    trace = Trace(board, [None, 10.0])
+    boards = [board.clone()]
+    player = 1
+    while not board.is_finished():
+        action = rng.choice(list(board.get_actions("natural")))
+        board.play_action(action)
+        trace.add_action(player, action, rng.random())
+        boards.append(board.clone())
+        player = -player
+    trace.set_winner(board.get_score(), "")
+    return trace, boards
+
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "games.db")
+    games = [random_trace(seed) for seed in range(6)]
+    names = ["a", "b", "c"]
+    writer = TraceDatabaseWriter(path, interval=5)
+    for k, (trace, boards) in enumerate(games):
+        writer.add(trace, (names[k % 3], names[(k + 1) % 3]))
+    writer.close()
+    db = TraceDatabase(path)
+    try:
+        assert len(db) == len(games)
+        for k, (trace, boards) in enumerate(games):
+            entry = db[k]
+            assert entry.agents == (names[k % 3], names[(k + 1) % 3])
+            assert entry.steps == len(trace.actions)
+            assert entry.winner == trace.winner
+            header, board, actions, end = db.trace(k)
+            assert actions == trace.actions
+            assert end == (trace.winner, "")
+            for step, expected in enumerate(boards):
+                assert db.board(k, step).m == expected.m
+            with pytest.raises(IndexError):
+                db.board(k, len(boards))
+        assert [e.number for e in db.select("a")] == [0, 2, 3, 5]
+        for result in (1, 0, -1):
+            assert [e.number for e in db.select("b", result)] == \
+                [e.number for e in db.entries if "b" in e.agents and
+                 e.result("b") == result]
+            assert [e.number for e in db.select(result=result)] == \
+                [k for k, (trace, boards) in enumerate(games)
+                 if (trace.winner > 0) - (trace.winner < 0) == result]
+        longest = max(e.steps for e in db.entries)
+        assert [e.steps for e in db.select(min_steps=longest)] == \
+            [longest] * sum(e.steps == longest for e in db.entries)
+    finally:
+        db.close()
+
+
+def test_invalid_databases(tmp_path):
+    path = tmp_path / "games.db"
+    for data in (b"AVDB", HEADER.pack(b"AVDX", 1, 8, 0, HEADER.size),
+                 HEADER.pack(b"AVDB", 1, 8, 3, HEADER.size),
+                 HEADER.pack(b"AVDB", 1, 8, 0, HEADER.size) + b"[1,"):
+        path.write_bytes(data)
+        with pytest.raises(InvalidDatabase):
+            TraceDatabase(str(path))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of tracefile and of the traces of game.Game.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+import io
+import pickle
+
+import pytest
+
+import game
+from avalam import Board
+from testgames import FirstAction
+from tracefile import ACTION, END, HEADER, InvalidTrace, parse_trace
+
+
+def played_game():
+    """Return a game played to its end with its trace written, and the
+    content of the trace file."""
+    f = io.BytesIO()
+    g = game.Game([FirstAction(), FirstAction()], Board(), None,
+                  [None, 12.5], f)
+    g.play()
+    return g, f.getvalue()
+
+
+def test_streamed_trace():
+    g, data = played_game()
+    header, board, actions, end = parse_trace(data)
+    assert header["time_limits"] == [None, 12.5]
+    assert board.get_percepts() == Board().get_percepts()
+    assert actions == g.trace.actions
+    assert end == (g.trace.winner, g.trace.reason)
+    trace = game.load_trace(io.BytesIO(data))
+    assert trace.actions == g.trace.actions
+    assert trace.winner == g.trace.winner
+    f = io.BytesIO()
+    trace.write(f)
+    assert f.getvalue() == data
+
+
+def test_unfinished_trace():
+    g, data = played_game()
+    count = len(g.trace.actions) // 2
+    data = data[:len(data) - (len(g.trace.actions) - count) * ACTION.size -
+                END.size - len(g.trace.reason.encode("utf-8"))]
+    header, board, actions, end = parse_trace(data)
+    assert actions == g.trace.actions[:count] and end is None
+    trace = game.load_trace(io.BytesIO(data))
+    assert trace.winner == 0
+    assert trace.reason == "The trace stops before the end of the game."
+
+
+def test_invalid_traces():
+    g, data = played_game()
+    for bad in (data[:HEADER.size - 1], b"AVTX" + data[4:],
+                data[:HEADER.size] + b"[" + data[HEADER.size + 1:]):
+        with pytest.raises(InvalidTrace):
+            parse_trace(bad)
+    legacy = pickle.dumps(g.trace)
+    with pytest.raises(InvalidTrace):
+        game.load_trace(io.BytesIO(legacy))
+    trace = game.load_trace(io.BytesIO(legacy), legacy=True)
+    assert trace.actions == g.trace.actions
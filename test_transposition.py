@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of transposition.TranspositionTable.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from transposition import ENTRY_SIZE, EXACT, LOWER, TranspositionTable
+
+
+def one_bucket():
+    return TranspositionTable(2 * ENTRY_SIZE)
+
+
+def test_store_and_probe():
+    table = one_bucket()
+    assert table.probe(1) is None
+    table.store(1, 5, EXACT, 3, (0, 0, 0, 1))
+    assert table.probe(1)[:5] == (1, 5, EXACT, 3, (0, 0, 0, 1))
+    assert table.get_move(1) == (0, 0, 0, 1)
+    assert table.get_move(2) is None
+    assert (table.probes, table.hits, table.misses, table.collisions) == \
+        (4, 2, 2, 1)
+
+
+def test_depth_preferred_slot():
+    table = one_bucket()
+    table.store(1, 5, EXACT, 3, None)
+    table.store(2, 6, LOWER, 1, None)  # shallower: always-replace slot
+    assert table.probe(1)[1] == 5 and table.probe(2)[1] == 6
+    table.store(3, 7, EXACT, 2, None)  # evicts 2, not the deeper 1
+    assert table.probe(1)[1] == 5 and table.probe(2) is None
+    table.store(4, 8, EXACT, 3, None)  # as deep as 1: replaces it
+    assert table.probe(1) is None and table.probe(4)[1] == 8
+    assert table.overwrites == 2
+    assert table.usage() == 1.0
+
+
+def test_aging():
+    table = one_bucket()
+    table.store(1, 5, EXACT, 9, None)
+    table.new_search()
+    table.store(2, 6, EXACT, 1, None)  # the entries of older searches go
+    assert table.probe(1) is None and table.probe(2)[5] == table.generation
+    table.clear()
+    assert table.probe(2) is None
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Random games shared by the tests.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+The boards of the games are avalam.Board instances, the reference the
+other implementations are compared with.  Run the tests with pytest.
+
+"""
+
+import os
+import random
+
+import minimax
+from avalam import Board
+
+
+GAMES = 10  # number of random games of each test
+WEIGHTS = (7, -7, 1, -1, 3, -3, 2, -2, 5)  # weights of get_pimped_score
+RANDOM_AGENT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "random_agent.py")
+
+
+class FirstAction:
+
+    """Agent playing the first action in the natural order."""
+
+    def play(self, board, player, step, time_left):
+        board = Board(board.get_percepts(player < 0))
+        return next(board.get_actions("natural"))
+
+
+def random_games(games=GAMES):
+    """Yield the lists of the successive boards of random games."""
+    for seed in range(games):
+        rng = random.Random(seed)
+        board = Board()
+        boards = [board.clone()]
+        while not board.is_finished():
+            board.play_action(rng.choice(list(board.get_actions("natural"))))
+            boards.append(board.clone())
+        yield boards
+
+
+def describe(board):
+    """Return the state of a board as comparable values."""
+    return ([list(row) for row in board.m], board.zobrist_key,
+            sorted(board.get_actions("natural")), board.get_score(),
+            board.is_finished(), board.get_pimped_score(*WEIGHTS))
+
+
+def check_do_undo(board, rng, count=3):
+    """Check that count random actions played in place on board are undone
+    exactly."""
+    before = describe(board)
+    actions = list(board.get_actions("natural"))
+    for action in rng.sample(actions, min(len(actions), count)):
+        played = board.clone().play_action(action)
+        undo = board.do_action(action)
+        assert describe(board) == describe(played)
+        board.undo_action(undo)
+        assert describe(board) == before
+
+
+def late_boards(games=GAMES, moves=12):
+    """Yield a board of each random game with at most moves actions."""
+    for boards in random_games(games):
+        yield next(b for b in boards if b.move_count <= moves)
+
+
+def endgames(games=GAMES, towers=10):
+    """Yield unfinished boards of random games with at most towers towers
+    in their regions, Player 1 being to move."""
+    from endgame import region_size
+    for boards in random_games(games):
+        for board in boards[::2]:
+            if not board.is_finished() and region_size(board) <= towers:
+                yield board
+                break
+
+
+def image(board, transform, sign=1):
+    """Return the image of board by transform, the colours multiplied by
+    sign."""
+    percepts = [[0] * board.columns for i in range(board.rows)]
+    for i, j, x in board.get_towers():
+        i2, j2 = divmod(transform[i * board.columns + j], board.columns)
+        percepts[i2][j2] = sign * x
+    return Board(percepts)
+
+
+def brute_force(board, side, depth=None, evaluate=None, cache=None):
+    """Return the minimax value of board for Player 1, side being 1 if
+    Player 1 is to move, searching depth plies (None: until the end) and
+    evaluating the leaves by evaluate (default: Board.get_score)."""
+    if cache is None:
+        cache = {}
+    key = (board.zobrist_key, side, depth)
+    if key in cache:
+        return cache[key]
+    if board.is_finished() or depth == 0:
+        value = board.get_score() if evaluate is None else evaluate(board)
+    else:
+        values = [brute_force(board.clone().play_action(action), -side,
+                              None if depth is None else depth - 1,
+                              evaluate, cache)
+                  for action in board.get_actions("natural")]
+        value = max(values) if side > 0 else min(values)
+    cache[key] = value
+    return value
+
+
+class ParityGame(minimax.Game):
+
+    """Game of the states (board, player) evaluated by evaluate(board)."""
+
+    def __init__(self, evaluate):
+        self.evaluate_board = evaluate
+
+    def successors(self, state):
+        board, player = state
+        for action in board.get_actions("natural"):
+            yield action, (board.clone().play_action(action), -player)
+
+    def cutoff(self, state, depth):
+        return state[0].is_finished()
+
+    def evaluate(self, state):
+        return self.evaluate_board(state[0])
+
+    def hash(self, state):
+        return state[0].zobrist_key
+
+    def actions(self, state):
+        return list(state[0].get_actions("natural"))
+
+    def do_action(self, state, action):
+        board, player = state
+        return (board, -player), board.do_action(action)
+
+    def undo_action(self, state, undo):
+        state[0].undo_action(undo)
+
+
+def pimped_score(board):
+    return board.get_pimped_score(*WEIGHTS)
+
+
+def check_search(board, depth, evaluate, game=ParityGame, **options):
+    """Check that search returns an optimal action for Player 1 on board,
+    searching depth plies of the game class game, and leaves the board
+    unchanged."""
+    cache = {}
+    values = {action: brute_force(board.clone().play_action(action), -1,
+                                  None if depth is None else depth - 1,
+                                  evaluate, cache)
+              for action in board.get_actions("natural")}
+    state = (board.clone(), 1)
+    action = minimax.search(state, game(evaluate), max_depth=depth,
+                            **options)
+    assert values[action] == max(values.values()), options
+    assert describe(state[0]) == describe(board)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Time management for the Avalam agents.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import time
+
+
+def count_movable_towers(board):
+    """Return the number of towers that can still be moved on board."""
+    return sum(1 for i, j, h in board.get_towers()
+               if board.is_tower_movable(i, j))
+
+
+class TimeManager:
+
+    """Split the time credit of an agent between its moves.
+
+    Usage: call start_move at the beginning of each play, give the deadlines
+    to the search (or the manager itself, see minimax.search) and call
+    iteration_done after each completed iteration of an iterative deepening
+    search.  should_deepen then tells whether one more iteration is expected
+    to finish before the hard limit.
+
+    The per-move budget is the remaining time credit divided by the
+    estimated number of moves left for the agent, which is derived from the
+    number of movable towers (every move removes one tower).  The soft limit
+    is that budget: no new iteration is started after it.  The hard limit,
+    a multiple of the budget, is the time at which the search is aborted.
+
+    The effective branching factor, i.e. the ratio between the durations of
+    two successive iterations, is learnt over the whole game and used to
+    predict the duration of the next iteration.
+
+    Only super_agent uses a time manager.  The other agents search to a
+    fixed depth and serve as unchanged reference opponents (e.g. for
+    tournament.py and sprt.py); super_agent_hardcode keeps its own
+    hand-written depth schedule for the same reason.
+
+    """
+
+    def __init__(self, reserve=1.0, moves_per_tower=0.75, min_moves=4,
+                 hard_ratio=3.0, max_fraction=0.3, ebf=8.0, smoothing=0.3):
+        """Create a time manager.
+
+        Arguments:
+        reserve -- seconds of the credit never allocated (safety margin)
+        moves_per_tower -- estimated number of moves still to be played
+            (by both players) per movable tower
+        min_moves -- minimal number of moves assumed to be left
+        hard_ratio -- hard limit as a multiple of the per-move budget
+        max_fraction -- maximal fraction of the remaining credit that may be
+            spent on one move
+        ebf -- initial guess of the effective branching factor
+        smoothing -- weight of a new observation of the branching factor in
+            its moving average
+
+        """
+        self.reserve = reserve
+        self.moves_per_tower = moves_per_tower
+        self.min_moves = min_moves
+        self.hard_ratio = hard_ratio
+        self.max_fraction = max_fraction
+        self.ebf = ebf
+        self.smoothing = smoothing
+        self.start = None
+        self.budget = None
+        self.soft_deadline = None
+        self.deadline = None
+        self.iterations = []
+
+    def moves_left(self, board):
+        """Return the estimated number of moves left for the agent."""
+        moves = count_movable_towers(board) * self.moves_per_tower
+        return max(self.min_moves, moves / 2)
+
+    def start_move(self, time_left, step, board):
+        """Allocate the time of a new move and return the hard deadline.
+
+        Arguments:
+        time_left -- time credit left as given to Agent.play, or None for an
+            untimed game (no deadline is then set)
+        step -- the current step number
+        board -- the current board
+
+        """
+        self.start = time.time()
+        self.step = step
+        self.iterations = []
+        if time_left is None:
+            self.budget = self.soft_deadline = self.deadline = None
+            return None
+        available = max(0.0, time_left - self.reserve)
+        self.budget = available / self.moves_left(board)
+        hard = min(self.budget * self.hard_ratio,
+                   available * self.max_fraction)
+        hard = max(hard, self.budget)
+        self.soft_deadline = self.start + self.budget
+        self.deadline = self.start + min(hard, available)
+        return self.deadline
+
+    def iteration_done(self, depth, elapsed=None):
+        """Record the completion of an iteration.
+
+        Arguments:
+        depth -- depth of the completed iteration
+        elapsed -- its duration in seconds (default: time since the previous
+            iteration or the start of the move)
+
+        """
+        now = time.time()
+        if elapsed is None:
+            elapsed = now - self.start - sum(t for _, t in self.iterations)
+        if self.iterations:
+            previous = self.iterations[-1][1]
+            if previous > 0.001:  # shorter durations are mostly noise
+                ratio = elapsed / previous
+                self.ebf += self.smoothing * (ratio - self.ebf)
+        self.iterations.append((depth, elapsed))
+
+    def predict_next(self):
+        """Return the expected duration of the next iteration."""
+        if not self.iterations:
+            return 0.0
+        return self.iterations[-1][1] * self.ebf
+
+    def should_deepen(self):
+        """Return whether another iteration should be started."""
+        if self.deadline is None:
+            return True
+        now = time.time()
+        return now < self.soft_deadline and \
+            now + self.predict_next() <= self.deadline
+
+    def time_used(self):
+        """Return the time spent on the current move."""
+        return time.time() - self.start
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Headless tournaments between Avalam agents.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+The games are played with game.Game and no viewer by a pool of worker
+processes.  Each worker imports an agent file the first time it plays it
+and keeps the module for the next games; a new Agent is created for each
+game, so that the games stay independent.
+
+Usage: python3 tournament.py [options] AGENT1 AGENT2 [AGENT...]
+       (see --help)
+
+"""
+
+import itertools
+import logging
+import multiprocessing
+import random
+import time
+
+from avalam import Board
+from game import Game, import_from_path
+
+
+class GameResult:
+
+    """Result of a game of a tournament.
+
+    Attributes:
+    agents -- the paths of the agents of Player 1 and Player 2
+    winner -- the winner (>0: Player 1, <0: Player 2, 0: draw game), the
+        final score if the game went to its end
+    reason -- specific reason for victory or "" if standard
+    steps -- number of actions played
+    times -- the lists of the times taken by each player for his actions,
+        in seconds
+    elapsed -- duration of the whole game in seconds
+    trace -- the trace of the game (see game.Trace)
+
+    """
+
+    def __init__(self, agents, trace, elapsed):
+        self.agents = tuple(agents)
+        self.winner = trace.winner
+        self.reason = trace.reason
+        self.steps = len(trace.actions)
+        self.times = ([t for player, action, t in trace.actions
+                       if player > 0],
+                      [t for player, action, t in trace.actions
+                       if player < 0])
+        self.elapsed = elapsed
+        self.trace = trace
+
+    def points(self, agent):
+        """Return the points of the player agent (0 or 1) of this game: 1
+        for a win, 0.5 for a draw and 0 for a loss."""
+        winner = self.winner if agent == 0 else -self.winner
+        return 1.0 if winner > 0 else 0.5 if winner == 0 else 0.0
+
+
+def schedule(agents, games, mode="round-robin"):
+    """Return the list of the (agent1, agent2) pairs of the games of a
+    tournament, agent1 being Player 1.
+
+    Arguments:
+    agents -- the paths of the agents
+    games -- number of games of each pairing; the colours alternate, so an
+        even number gives both agents the same number of first moves
+    mode -- "round-robin" (every agent meets every other one) or "gauntlet"
+        (the first agent meets every other one)
+
+    """
+    if mode == "round-robin":
+        pairs = list(itertools.combinations(agents, 2))
+    elif mode == "gauntlet":
+        pairs = [(agents[0], agent) for agent in agents[1:]]
+    else:
+        raise ValueError("unknown tournament mode: %r" % mode)
+    return [(a, b) if k % 2 == 0 else (b, a)
+            for k in range(games) for a, b in pairs]
+
+
+# agent modules already imported by a worker process
+_modules = {}
+
+
+def load_agent(path):
+    """Return the module of the agent in file path, imported once per
+    process.
+
+    The agents searching in parallel (see minimax.SearchPool) are limited
+    to one process: the workers of a tournament cannot start processes of
+    their own, and the tournament already uses all the cores.
+    """
+    module = _modules.get(path)
+    if module is None:
+        module = import_from_path(path, "Player")
+        if getattr(module.Agent, "PROCESSES", 1) > 1:
+            module.Agent.PROCESSES = 1
+        _modules[path] = module
+    return module
+
+
+def play_game(task):
+    """Play one game and return its GameResult.
+
+    task is the tuple (agents, time_limit, seed): the paths of the agents
+    of Player 1 and Player 2, their time credit (None for an untimed game)
+    and the seed of the random module for the game (None: not seeded).
+    """
+    agents, time_limit, seed = task
+    if seed is not None:
+        random.seed(seed)
+    players = [load_agent(path).Agent("Player %d" % (k + 1))
+               for k, path in enumerate(agents)]
+    game = Game(players, Board(), None, [time_limit, time_limit])
+    start = time.perf_counter()
+    game.play()
+    return GameResult(agents, game.trace, time.perf_counter() - start)
+
+
+def play_games(games, time_limit=None, processes=None, seed=None):
+    """Play games in parallel and yield their GameResult as they finish.
+
+    The worker processes are stopped when the generator is closed, so the
+    caller can stop early, leaving the games in progress unfinished.
+
+    Arguments:
+    games -- sequence of the (agent1, agent2) pairs of paths of the games
+        (see schedule)
+    time_limit -- time credit of each player in seconds (None: untimed)
+    processes -- number of worker processes (default: number of CPUs)
+    seed -- if not None, game k is played with seed + k (see play_game)
+
+    """
+    tasks = [(agents, time_limit, None if seed is None else seed + k)
+             for k, agents in enumerate(games)]
+    pool = multiprocessing.get_context("fork").Pool(processes)
+    try:
+        yield from pool.imap_unordered(play_game, tasks)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def standings(results):
+    """Return the list of the (agent, points, wins, draws, losses, games)
+    tuples of the agents of results, best first."""
+    table = {}
+    for result in results:
+        for k, agent in enumerate(result.agents):
+            row = table.setdefault(agent, [0.0, 0, 0, 0])
+            points = result.points(k)
+            row[0] += points
+            row[1 if points == 1 else 2 if points == 0.5 else 3] += 1
+    rows = [(agent, points, wins, draws, losses, wins + draws + losses)
+            for agent, (points, wins, draws, losses) in table.items()]
+    rows.sort(key=lambda row: (-row[1] / row[5], row[0]))
+    return rows
+
+
+def report(results, elapsed, processes):
+    """Return a text summary of a tournament.
+
+    Arguments:
+    results -- the GameResult of the games
+    elapsed -- duration of the tournament in seconds
+    processes -- number of worker processes used
+
+    """
+    lines = ["%-30s %7s %5s %5s %5s %6s" %
+             ("Agent", "Points", "Win", "Draw", "Loss", "Score")]
+    for agent, points, wins, draws, losses, games in standings(results):
+        lines.append("%-30s %7.1f %5d %5d %5d %5.1f%%" %
+                     (agent, points, wins, draws, losses,
+                      100 * points / games))
+    times = {}
+    for result in results:
+        for agent, agent_times in zip(result.agents, result.times):
+            times.setdefault(agent, []).extend(agent_times)
+    lines.append("")
+    for agent in sorted(times):
+        agent_times = times[agent]
+        if agent_times:
+            lines.append("%s: %d moves, %.3fs per move on average,"
+                         " longest %.3fs" %
+                         (agent, len(agent_times),
+                          sum(agent_times) / len(agent_times),
+                          max(agent_times)))
+    if results:
+        lines.append("%d games, %.1f steps per game on average" %
+                     (len(results),
+                      sum(r.steps for r in results) / len(results)))
+    if elapsed > 0:
+        lines.append("%.1fs with %d processes: %.2f games per minute per"
+                     " core" % (elapsed, processes,
+                                60 * len(results) / elapsed / processes))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def posfloatarg(string):
+        value = float(string)
+        if value <= 0:
+            raise argparse.ArgumentTypeError("%s is not strictly positive" %
+                                             string)
+        return value
+
+    parser = argparse.ArgumentParser(
+        description="Play a headless tournament between Avalam agents.")
+    parser.add_argument("agents", nargs="+", metavar="AGENT",
+                        help="path to an agent")
+    parser.add_argument("-g", "--games", type=int, default=2,
+                        help="number of games of each pairing, the colours"
+                             " alternating (default: %(default)s)")
+    parser.add_argument("--gauntlet", action="store_const",
+                        const="gauntlet", default="round-robin", dest="mode",
+                        help="only play the games of the first agent"
+                             " (default: round-robin)")
+    parser.add_argument("-t", "--time", type=posfloatarg,
+                        help="set the time credit per player (default:"
+                             " untimed games)",
+                        metavar="SECONDS")
+    parser.add_argument("-j", "--processes", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="number of games played in parallel (default:"
+                             " %(default)s)")
+    parser.add_argument("-s", "--seed", type=int,
+                        help="seed the random module of game k with SEED + k")
+    parser.add_argument("-d", "--database", metavar="FILE",
+                        help="write the traces of the games to the trace"
+                             " database FILE (see tracedb.py)")
+    parser.add_argument("-v", "--verbose", action="store_true", default=False,
+                        help="log every game")
+    args = parser.parse_args()
+    if len(args.agents) < 2:
+        parser.error("at least two agents are needed")
+    logging.basicConfig(format="%(asctime)s -- %(levelname)s: %(message)s",
+                        level=logging.WARNING)
+
+    games = schedule(args.agents, args.games, args.mode)
+    database = None
+    if args.database is not None:
+        from tracedb import TraceDatabaseWriter
+        database = TraceDatabaseWriter(args.database)
+    results = []
+    start = time.perf_counter()
+    try:
+        for result in play_games(games, args.time, args.processes,
+                                 args.seed):
+            results.append(result)
+            if database is not None:
+                database.add(result.trace, result.agents)
+            if args.verbose:
+                print("[%d/%d] %s vs %s: %s in %d steps (%.1fs)%s" %
+                      (len(results), len(games), result.agents[0],
+                       result.agents[1], result.winner, result.steps,
+                       result.elapsed,
+                       " -- " + result.reason if result.reason else ""))
+    except KeyboardInterrupt:
+        print("Interrupted after %d games" % len(results))
+    if database is not None:
+        database.close()
+    print(report(results, time.perf_counter() - start, args.processes))
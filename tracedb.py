@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Database of Avalam game traces with random access to any position.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+A database is a single file made of:
+- a header (HEADER): magic string, version, interval of the snapshots,
+  number of games and offset of the index;
+- the games one after the other, each being a trace in the format of
+  tracefile followed by its snapshots: the cells of the board, one signed
+  byte per cell, before the actions 0, interval, 2 * interval, ...;
+- the index, one INDEX entry per game: offset and size of the trace,
+  number of steps, winner and the numbers of the agents of Player 1 and
+  Player 2 in the list of the agent names;
+- this list, in JSON, up to the end of the file.
+
+The file is memory-mapped, so that a position is rebuilt from the
+nearest snapshot before it and at most interval - 1 actions, whatever the
+number and the length of the games.
+
+Usage: python3 tracedb.py [options] -o FILE TRACE...  (see --help)
+
+"""
+
+import io
+import json
+import mmap
+import os
+import struct
+
+from avalam import Board
+from tracefile import ACTION, TraceWriter, parse_trace, read_header
+
+
+MAGIC = b"AVDB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")  # magic, version, interval, games, index
+INDEX = struct.Struct("<QIHhHH")  # offset, size, steps, winner, agents
+
+
+class InvalidDatabase(Exception):
+
+    """Raised when a file is not a trace database."""
+
+
+def _snapshot(board):
+    """Return the cells of board as bytes."""
+    return struct.pack("%db" % (board.rows * board.columns),
+                       *[x for row in board.m for x in row])
+
+
+class TraceDatabaseWriter:
+
+    """Write a new trace database.
+
+    The games are added with add and the index is written by close, which
+    must be called for the database to be readable.
+
+    """
+
+    def __init__(self, path, interval=8):
+        """Create the database in file path.
+
+        Arguments:
+        path -- name of the file, which is replaced when the database is
+            closed
+        interval -- number of steps between two snapshots
+
+        """
+        self.path = path
+        self.interval = interval
+        self.tmp = path + ".tmp"
+        self.f = open(self.tmp, "wb")
+        self.f.write(HEADER.pack(MAGIC, VERSION, interval, 0, 0))
+        self.index = []
+        self.names = {}
+
+    def _agent(self, name):
+        """Return the number of the agent name."""
+        return self.names.setdefault(name, len(self.names))
+
+    def add(self, trace, agents=("", "")):
+        """Add a game.
+
+        Arguments:
+        trace -- the trace of the game (see game.Trace)
+        agents -- the names of the agents of Player 1 and Player 2
+
+        """
+        data = io.BytesIO()
+        writer = TraceWriter(data, trace.initial_board, trace.time_limits)
+        for player, action, t in trace.actions:
+            writer.add_action(player, action, t)
+        writer.set_winner(trace.winner, trace.reason)
+        board = trace.initial_board.clone()
+        snapshots = [_snapshot(board)]
+        for step, (player, action, t) in enumerate(trace.actions, 1):
+            board.play_action(action)
+            if step % self.interval == 0:
+                snapshots.append(_snapshot(board))
+        offset = self.f.tell()
+        self.f.write(data.getvalue())
+        self.f.write(b"".join(snapshots))
+        self.index.append((offset, len(data.getvalue()), len(trace.actions),
+                           trace.winner, self._agent(agents[0]),
+                           self._agent(agents[1])))
+
+    def close(self):
+        """Write the index and move the database to its file."""
+        offset = self.f.tell()
+        for entry in self.index:
+            self.f.write(INDEX.pack(*entry))
+        names = sorted(self.names, key=self.names.get)
+        self.f.write(json.dumps(names).encode("utf-8"))
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, self.interval,
+                                 len(self.index), offset))
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+
+class GameEntry:
+
+    """Entry of a game in the index of a database.
+
+    Attributes:
+    number -- the number of the game in the database
+    steps -- number of actions played
+    winner -- the winner (>0: Player 1, <0: Player 2, 0: draw game)
+    agents -- the names of the agents of Player 1 and Player 2
+
+    """
+
+    def __init__(self, number, entry, names):
+        self.number = number
+        self.offset, self.size, self.steps, self.winner, a1, a2 = entry
+        self.agents = (names[a1], names[a2])
+
+    def result(self, agent=None):
+        """Return 1, 0 or -1 if the game is won, drawn or lost by the agent
+        named agent (Player 1 if None)."""
+        winner = self.winner
+        if agent is not None and agent != self.agents[0]:
+            winner = -winner
+        return (winner > 0) - (winner < 0)
+
+
+class TraceDatabase:
+
+    """Read-only access to a trace database."""
+
+    def __init__(self, path):
+        """Open the database in file path."""
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = None
+        try:
+            size = os.fstat(self.file.fileno()).st_size
+            if size < HEADER.size:
+                raise InvalidDatabase("%s: truncated header" % path)
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            magic, version, self.interval, count, offset = \
+                HEADER.unpack_from(self.map)
+            if magic != MAGIC or version != VERSION:
+                raise InvalidDatabase("%s: not a trace database of version"
+                                      " %d" % (path, VERSION))
+            end = offset + count * INDEX.size
+            if end > size:
+                raise InvalidDatabase("%s: truncated index" % path)
+            try:
+                names = json.loads(self.map[end:].decode("utf-8"))
+            except ValueError as e:
+                raise InvalidDatabase("%s: invalid agent names: %s" %
+                                      (path, e))
+            self.entries = [GameEntry(k, entry, names) for k, entry in
+                            enumerate(INDEX.iter_unpack(self.map[offset:end]))]
+        except InvalidDatabase:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, number):
+        """Return the GameEntry of game number."""
+        return self.entries[number]
+
+    def close(self):
+        """Release the file."""
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def select(self, agent=None, result=None, min_steps=0):
+        """Yield the GameEntry of the games matching all the criteria.
+
+        Arguments:
+        agent -- name of an agent who played the game (None: any)
+        result -- 1, 0 or -1 to select the games won, drawn or lost by
+            agent, or by Player 1 if agent is None (None: any)
+        min_steps -- minimum number of steps of the game
+
+        """
+        for entry in self.entries:
+            if agent is not None and agent not in entry.agents:
+                continue
+            if result is not None and entry.result(agent) != result:
+                continue
+            if entry.steps >= min_steps:
+                yield entry
+
+    def trace(self, number):
+        """Return the parse_trace tuple (header, board, actions, end) of
+        game number (see tracefile.parse_trace)."""
+        entry = self.entries[number]
+        return parse_trace(self.map[entry.offset:entry.offset + entry.size])
+
+    def board(self, number, step):
+        """Return the board of game number after step actions (0: the
+        initial board), rebuilt from the nearest snapshot."""
+        entry = self.entries[number]
+        if not 0 <= step <= entry.steps:
+            raise IndexError("game %d has no step %d" % (number, step))
+        header, initial, pos = read_header(
+            self.map[entry.offset:entry.offset + entry.size])
+        cells = initial.rows * initial.columns
+        k = step // self.interval
+        start = entry.offset + entry.size + k * cells
+        values = struct.unpack_from("%db" % cells, self.map, start)
+        board = Board([list(values[i:i + initial.columns])
+                       for i in range(0, cells, initial.columns)],
+                      initial.max_height)
+        pos += entry.offset
+        for s in range(k * self.interval, step):
+            player, i1, j1, i2, j2, t = ACTION.unpack_from(
+                self.map, pos + s * ACTION.size)
+            board.play_action((i1, j1, i2, j2))
+        return board
+
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+    import pickle
+
+    from game import load_trace
+    from tracefile import InvalidTrace
+
+    parser = argparse.ArgumentParser(
+        description="Pack game traces into a trace database.")
+    parser.add_argument("traces", nargs="+", metavar="TRACE",
+                        help="trace file written by game.py -w")
+    parser.add_argument("-o", "--output", required=True, metavar="FILE",
+                        help="write the database to FILE")
+    parser.add_argument("-i", "--interval", type=int, default=8,
+                        help="number of steps between two snapshots"
+                             " (default: %(default)s)")
+    parser.add_argument("-a", "--agents", nargs=2,
+                        metavar=("AGENT1", "AGENT2"), default=("", ""),
+                        help="names of the agents of all the games")
+    parser.add_argument("--legacy-pickle", action="store_true",
+                        default=False,
+                        help="accept traces pickled by a previous version of"
+                             " game.py (only from trusted sources)")
+    args = parser.parse_args()
+    if args.interval <= 0:
+        parser.error("the interval must be positive")
+
+    writer = TraceDatabaseWriter(args.output, args.interval)
+    for path in args.traces:
+        try:
+            with open(path, "rb") as f:
+                writer.add(load_trace(f, args.legacy_pickle), args.agents)
+        except (IOError, pickle.UnpicklingError, InvalidTrace) as e:
+            logging.error("Unable to load trace '%s'. Reason: %s", path, e)
+    writer.close()
+    print("%d games written to %s" % (len(writer.index), args.output))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming file format for the traces of Avalam games.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+A trace file is written while the game is played, so that it is readable
+at any moment, and is made of:
+- the magic string MAGIC and the length of the header (HEADER);
+- the header, a JSON object with the initial board ("board", its matrix,
+  and "max_height") and the time limits of the players ("time_limits");
+- one ACTION record per action: the player (1 or -1), the action and the
+  time taken in seconds;
+- when the game is over, an END record: a 0 byte, the winner and the
+  length of the reason, followed by the reason encoded in UTF-8.
+
+A file without END record is the trace of an unfinished game.  Unlike a
+pickle, reading a trace never executes code from the file.
+
+"""
+
+import json
+import struct
+
+from avalam import Board
+
+
+MAGIC = b"AVTR"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")  # magic, version, length of the JSON header
+ACTION = struct.Struct("<b4bd")  # player, action, time
+END = struct.Struct("<biH")  # 0, winner, length of the reason
+
+
+# headers already decoded, as (header, initial board) pairs by raw header;
+# most traces start from the same board
+_headers = {}
+
+
+class InvalidTrace(Exception):
+
+    """Raised when a file is not a valid trace."""
+
+
+class TraceWriter:
+
+    """Write a trace to a binary file as the game goes.
+
+    Every record is flushed as soon as it is written, so that the actions
+    played are kept if the program is interrupted.
+
+    """
+
+    def __init__(self, f, board, time_limits):
+        """Write the header of a trace.
+
+        Arguments:
+        f -- binary file open for writing
+        board -- the initial board
+        time_limits -- a sequence of 2 elements containing the time limits
+            in seconds for each agent, or None for a time-unlimitted agent
+
+        """
+        self.f = f
+        header = json.dumps({"board": board.get_percepts(False),
+                             "max_height": board.max_height,
+                             "time_limits": list(time_limits)},
+                            separators=(",", ":")).encode("utf-8")
+        f.write(HEADER.pack(MAGIC, VERSION, len(header)) + header)
+        f.flush()
+
+    def add_action(self, player, action, t):
+        """Write the record of an action (see game.Trace.add_action)."""
+        self.f.write(ACTION.pack(player, *action, t))
+        self.f.flush()
+
+    def set_winner(self, winner, reason):
+        """Write the end record (see game.Trace.set_winner)."""
+        reason = reason.encode("utf-8")
+        self.f.write(END.pack(0, winner, len(reason)) + reason)
+        self.f.flush()
+
+
+def is_trace(prefix):
+    """Return whether the bytes prefix are the start of a trace file."""
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def read_header(data):
+    """Decode the header of a trace file.
+
+    Arguments:
+    data -- the content of the file (bytes)
+
+    Return the tuple (header, board, pos): header is the dictionary of the
+    JSON header, board the initial board and pos the offset of the first
+    record.  header and board are shared between the traces with the same
+    header and must not be modified.
+
+    """
+    if len(data) < HEADER.size:
+        raise InvalidTrace("truncated header")
+    magic, version, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise InvalidTrace("not a trace of version %d" % VERSION)
+    pos = HEADER.size + length
+    raw = data[HEADER.size:pos]
+    cached = _headers.get(raw)
+    if cached is None:
+        try:
+            header = json.loads(raw.decode("utf-8"))
+            board = Board(header["board"], header["max_height"])
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            raise InvalidTrace("invalid header: %s" % e)
+        if len(_headers) >= 64:
+            _headers.clear()
+        cached = _headers[raw] = (header, board)
+    return cached + (pos,)
+
+
+def parse_trace(data):
+    """Decode a trace file.
+
+    Arguments:
+    data -- the content of the file (bytes)
+
+    Return the tuple (header, board, actions, end): header is the
+    dictionary of the JSON header, board the initial board, actions the
+    list of the (player, action, time) tuples and end the (winner, reason)
+    pair, or None for an unfinished game (see read_header for header and
+    board).
+
+    """
+    header, board, pos = read_header(data)
+    # the player of an action is never 0, so the END record is in the
+    # first record slot starting with 0
+    size = len(data)
+    count = data[pos::ACTION.size].find(0)
+    if count < 0:
+        count = (size - pos) // ACTION.size
+    data = memoryview(data)
+    actions = [(player, (i1, j1, i2, j2), t)
+               for player, i1, j1, i2, j2, t in ACTION.iter_unpack(
+                   data[pos:pos + count * ACTION.size])]
+    pos += count * ACTION.size
+    end = None
+    if pos + END.size <= size and data[pos] == 0:
+        zero, winner, length = END.unpack_from(data, pos)
+        pos += END.size
+        end = (winner, bytes(data[pos:pos + length]).decode("utf-8"))
+    return header, board, actions, end
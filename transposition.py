@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Transposition table for the MiniMax/AlphaBeta search.
+Copyright (C) 2015, Hauet Alexandre & Vaessen Tanguy
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; version 2 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+EXACT = 0
+LOWER = 1  # the value is a lower bound (the search failed high)
+UPPER = 2  # the value is an upper bound (the search failed low)
+
+# approximate number of bytes taken by one entry (tuple and its items)
+ENTRY_SIZE = 200
+
+
+class TranspositionTable:
+
+    """Fixed-size transposition table with a two-tier replacement scheme.
+
+    Each bucket has two slots: a depth-preferred slot, which is only
+    replaced by an entry searched at least as deep (i.e. with a bigger
+    subtree) or by an entry of a newer search, and an always-replace slot
+    receiving every other entry.
+
+    Entries are tuples (key, value, bound, depth, move, generation):
+    key -- hash of the position
+    value -- value found by the search
+    bound -- EXACT, LOWER or UPPER
+    depth -- depth searched below the position: the bigger, the more
+        reliable the value
+    move -- best move found, or None
+    generation -- number of the search that stored the entry
+
+    A search (e.g. the iterative deepening of one move) calls new_search
+    once, so that the entries of the previous searches are replaced first;
+    its successive passes share the entries.
+
+    Attributes (counters):
+    probes -- number of lookups
+    hits -- lookups finding an entry with the same key
+    misses -- lookups finding nothing
+    collisions -- misses for which the bucket held other positions
+    stores -- number of stored entries
+    overwrites -- stores that evicted an entry of another position
+
+    """
+
+    def __init__(self, size=16 * 1024 * 1024):
+        """Create a table using approximately size bytes."""
+        self.buckets = max(1, size // (2 * ENTRY_SIZE))
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the counters."""
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """Start a new search, aging the stored entries."""
+        self.generation += 1
+
+    def probe(self, key):
+        """Return the entry of position key or None."""
+        self.probes += 1
+        i = key % self.buckets
+        entry = self.deep[i]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        other = self.recent[i]
+        if other is not None and other[0] == key:
+            self.hits += 1
+            return other
+        self.misses += 1
+        if entry is not None or other is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key, value, bound, depth, move):
+        """Store the result of the search of position key."""
+        self.stores += 1
+        i = key % self.buckets
+        entry = (key, value, bound, depth, move, self.generation)
+        deep = self.deep[i]
+        if deep is None or deep[0] == key or deep[5] != self.generation or \
+                depth >= deep[3]:
+            if deep is not None and deep[0] != key:
+                self.overwrites += 1
+            self.deep[i] = entry
+        else:
+            recent = self.recent[i]
+            if recent is not None and recent[0] != key:
+                self.overwrites += 1
+            self.recent[i] = entry
+
+    def get_move(self, key):
+        """Return the best move stored for position key or None."""
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        return entry[4]
+
+    def usage(self):
+        """Return the fraction of used slots."""
+        used = sum(1 for e in self.deep if e is not None) + \
+            sum(1 for e in self.recent if e is not None)
+        return used / (2 * self.buckets)
+
+    def __str__(self):
+        return ("probes: %d, hits: %d, misses: %d, collisions: %d, "
+                "stores: %d, overwrites: %d" %
+                (self.probes, self.hits, self.misses, self.collisions,
+                 self.stores, self.overwrites))